@@ -0,0 +1,15 @@
+"""
+Component benchmarks which run offline against local stand-ins, see `python -m benchmarks --help`.
+
+The query and CDN suites need a PostgreSQL database to create temporary schemas in, for example
+`ARTEMIS_BENCHMARK_DSN=postgres://postgres@localhost/benchmarks python -m benchmarks --output results.json`.
+"""
+
+import os
+import pathlib
+
+
+ROOT: pathlib.Path = pathlib.Path(__file__).parent.parent
+
+# The bot's modules read the configuration when imported, the example configuration is enough for everything benchmarked
+os.environ.setdefault('ARTEMIS_CONFIG', str(ROOT / 'example_config.yaml'))
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import sys
+
+from .harness import Result, commit
+
+
+SUITES: list[str] = ['plaques', 'queries', 'cdn']
+
+
+async def run(args: argparse.Namespace) -> tuple[list[Result], list[str]]:
+    results: list[Result] = []
+    skipped: list[str] = []
+
+    for suite in args.suites:
+        if suite in ('queries', 'cdn') and args.dsn is None:
+            print(f'Skipping {suite}, no database given through --dsn or ARTEMIS_BENCHMARK_DSN.', file=sys.stderr)
+            skipped.append(suite)
+            continue
+
+        print(f'Running {suite}...', file=sys.stderr)
+
+        # Suites are imported when run, so the others still work without the fonts used for plaques
+        if suite == 'plaques':
+            from . import plaques
+
+            results += plaques.run(args.iterations, args.warmup)
+        elif suite == 'queries':
+            from . import queries
+
+            results += await queries.run(args.dsn, args.iterations, args.warmup, args.rows, args.seed)
+        elif suite == 'cdn':
+            from . import cdn
+
+            results += await cdn.run(args.dsn, args.iterations, args.warmup)
+
+    return results, skipped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmarks the components of the bot in isolation.')
+    parser.add_argument('suites', nargs='*', choices=SUITES, default=SUITES, help='the suites to run, all by default')
+    parser.add_argument('--dsn', default=os.environ.get('ARTEMIS_BENCHMARK_DSN'), help='PostgreSQL database to create temporary schemas in')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help='table sizes to run the queries against')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0, help='seed for the randomly chosen query parameters')
+    parser.add_argument('--output', type=argparse.FileType('w', encoding='utf-8'), default=sys.stdout, help='where to write the JSON results')
+    args = parser.parse_args()
+
+    results, skipped = asyncio.run(run(args))
+
+    report: dict = {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'skipped': skipped,
+        'results': results,
+    }
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
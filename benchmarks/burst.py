@@ -0,0 +1,368 @@
+"""
+Simulates the burst of submissions after a prompt reveal against stand-ins for Discord, the CDN and a temporary schema.
+
+Run with `python -m benchmarks.burst --dsn postgres://postgres@localhost/benchmarks`, see `--help` for the knobs.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import traceback
+from typing import Any
+
+import asyncpg
+import discord
+
+from src import Artemis, config
+from src.http_client import HTTPClient
+from src.metrics import LOCK_WAIT, STAGE_DURATION, STAGE_ERRORS
+
+from .cdn import StandInCDN
+from .discord_api import StandInDiscord, queue_post_url
+from .harness import commit, temporary_database
+
+
+# Only the cogs taking part in handling submissions, nothing which would need the gateway, in the same order as the bot loads them
+EXTENSIONS: list[str] = [
+    'src.cogs.event_data',
+    'src.cogs.file_utils',
+    'src.cogs.members',
+    'src.cogs.prompts',
+    'src.cogs.statistics',
+    'src.cogs.gallery',
+    'src.cogs.queue',
+]
+
+ACTIONS: list[str] = ['approve', 'reject', 'dismiss']
+
+
+class LoadTestBot(Artemis):
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        super().__init__()
+
+        self.pool = pool
+        self.http_client = HTTPClient({})
+
+    async def setup_hook(self) -> None:
+        for extension in EXTENSIONS:
+            await self.load_extension(extension)
+
+
+class Simulation:
+    def __init__(self, args: argparse.Namespace, bot: LoadTestBot, discord_api: StandInDiscord, cdn_url: str) -> None:
+        self.args: argparse.Namespace = args
+        self.bot: LoadTestBot = bot
+        self.discord_api: StandInDiscord = discord_api
+        self.cdn_url: str = cdn_url
+
+        # Only importable once the bot loaded it as extension, importing it earlier would leave it with stale copies of the other cogs
+        from src.cogs.queue import Queue, QueueInterface
+
+        self.rng: random.Random = random.Random(args.seed)
+        self.state: Any = bot._connection
+        self.queue: Queue = bot.get_cog(Queue)
+        self.view: QueueInterface = QueueInterface(self.queue)
+
+        self.members: list[dict[str, Any]] = []
+        self.moderator: dict[str, Any] = {}
+
+        # When each URL was posted or edited into the submission channel, and whether it arrived through an edit
+        self.submitted_at: dict[str, float] = {}
+        self.edited: set[str] = set()
+
+        self.queue_latencies: dict[str, list[float]] = {'message': [], 'edit': []}
+        self.moderation_latencies: dict[str, list[float]] = {action: [] for action in ACTIONS}
+        self.moderation_errors: int = 0
+
+    def member(self, user: dict[str, Any]) -> dict[str, Any]:
+        return {'user': user, 'roles': [], 'joined_at': discord.utils.utcnow().isoformat(), 'deaf': False, 'mute': False, 'flags': 0}
+
+    def add_guild(self) -> None:
+        """Puts the event guild into the cache the same way the gateway would, with every simulated user as member."""
+
+        channel_ids: list[int] = [
+            config.settings.queue_channel_id,
+            config.settings.submission_channel_id,
+            config.settings.gallery_channel_id,
+        ]
+
+        users: list[dict[str, Any]] = [StandInDiscord.user(next(self.discord_api.ids), f'artist{i}') for i in range(self.args.users)]
+        self.members = [self.member(user) for user in users]
+        self.moderator = self.member(StandInDiscord.user(next(self.discord_api.ids), 'moderator'))
+
+        guild_id: str = str(config.settings.event_guild_id)
+        guild: discord.Guild = discord.Guild(
+            data={
+                'id': guild_id,
+                'name': config.settings.event_name,
+                'owner_id': self.moderator['user']['id'],
+                'member_count': len(self.members) + 2,
+                'roles': [
+                    {'id': guild_id, 'name': '@everyone', 'permissions': '0', 'position': 0, 'color': 0},
+                    {'id': str(config.settings.event_role_id), 'name': 'Event', 'permissions': '0', 'position': 1, 'color': 0},
+                ],
+                'channels': [
+                    {'id': str(channel_id), 'type': 0, 'name': f'channel-{position}', 'position': position, 'permission_overwrites': []}
+                    for position, channel_id in enumerate(channel_ids)
+                ],
+                'members': [*self.members, self.moderator, self.member(self.discord_api.bot_user)],
+                'emojis': [],
+                'stickers': [],
+                'features': [],
+                'premium_tier': 0,
+            },  # type: ignore
+            state=self.state,
+        )
+
+        self.state._add_guild(guild)
+
+    def message_data(self, message_id: int, member: dict[str, Any], urls: list[str]) -> dict[str, Any]:
+        return {
+            **self.discord_api.message(config.settings.submission_channel_id, message_id, {'content': ' '.join(urls)}),
+            'author': member['user'],
+            'member': {key: value for key, value in member.items() if key != 'user'},
+        }
+
+    def submission_url(self, number: int) -> str:
+        # Some artists post the same link twice, which contends on the per URL lock
+        if self.submitted_at and self.rng.random() < self.args.duplicates:
+            return self.rng.choice(list(self.submitted_at))
+
+        return f'{self.cdn_url}/artwork/{self.args.payload_size}/unique.png?submission={number}'
+
+    async def submit(self, number: int) -> None:
+        message_id: int = next(self.discord_api.ids)
+        member: dict[str, Any] = self.rng.choice(self.members)
+        url: str = self.submission_url(number)
+
+        data: dict[str, Any] = self.message_data(message_id, member, [url])
+        message: discord.Message = discord.Message(state=self.state, channel=self.bot.submission_channel, data=data)  # type: ignore
+
+        self.submitted_at.setdefault(url, time.perf_counter())
+        await self.queue.on_message(message)
+
+        if self.rng.random() < self.args.edits:
+            await asyncio.sleep(self.args.edit_delay)
+            await self.edit(data, number)
+
+    async def edit(self, data: dict[str, Any], number: int) -> None:
+        url: str = f'{self.cdn_url}/artwork/{self.args.payload_size}/unique.png?submission={number}&edit=1'
+
+        self.submitted_at[url] = time.perf_counter()
+        self.edited.add(url)
+
+        # Edits go through the gateway parser, which dispatches them to Queue.on_raw_message_edit
+        self.state.parse_message_update({**data, 'content': f'{data["content"]} {url}', 'edited_timestamp': discord.utils.utcnow().isoformat()})
+
+        while int(data['id']) not in self.queue.edit_tasks:
+            await asyncio.sleep(0)
+
+        await self.queue.edit_tasks[int(data['id'])]
+
+    def interaction_data(self, action: str, message: dict[str, Any]) -> dict[str, Any]:
+        return {
+            'id': str(next(self.discord_api.ids)),
+            'application_id': str(self.discord_api.application_id),
+            'type': 3,
+            'token': 'token',
+            'version': 1,
+            'guild_id': str(config.settings.event_guild_id),
+            'channel_id': str(config.settings.queue_channel_id),
+            'channel': {'id': str(config.settings.queue_channel_id), 'type': 0, 'guild_id': str(config.settings.event_guild_id)},
+            'member': {**self.moderator, 'permissions': '8'},
+            'message': message,
+            'data': {'custom_id': action, 'component_type': 2},
+            'app_permissions': '8',
+            'locale': 'en-US',
+            'entitlements': [],
+            'attachment_size_limit': discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES,
+            'authorizing_integration_owners': {},
+        }
+
+    async def click(self, action: str, message: dict[str, Any]) -> None:
+        interaction: discord.Interaction = discord.Interaction(data=self.interaction_data(action, message), state=self.state)  # type: ignore
+        await getattr(self.view, action).callback(interaction)
+
+    async def moderate(self) -> None:
+        """Acts on queue messages as they are posted, like a moderator watching the queue channel."""
+
+        while True:
+            posted_at, message = await self.discord_api.queue_posts.get()
+
+            try:
+                url: str | None = queue_post_url(message)
+                if url is not None and url in self.submitted_at:
+                    self.queue_latencies['edit' if url in self.edited else 'message'].append(posted_at - self.submitted_at[url])
+
+                await asyncio.sleep(self.args.moderation_delay)
+
+                action: str = self.rng.choices(ACTIONS, weights=self.args.moderation_weights)[0]
+                clicks: int = 2 if self.rng.random() < self.args.double_clicks else 1
+
+                start: float = time.perf_counter()
+                await asyncio.gather(*(self.click(action, message) for _ in range(clicks)))
+                self.moderation_latencies[action].append(time.perf_counter() - start)
+            except Exception:
+                traceback.print_exc()
+                self.moderation_errors += 1
+            finally:
+                self.discord_api.queue_posts.task_done()
+
+    async def gallery_drained(self) -> None:
+        """Waits until the gallery publisher posted every approved submission."""
+
+        while await self.bot.pool.fetchval('SELECT count(*) FROM gallery_outbox'):
+            await asyncio.sleep(0.1)
+
+    async def run(self) -> dict[str, Any]:
+        self.add_guild()
+
+        # There is no gateway connection to become ready through, but the background publishers wait for it
+        self.bot._ready.set()
+
+        moderators: list[asyncio.Task] = [asyncio.create_task(self.moderate()) for _ in range(self.args.moderators)]
+        submissions: list[asyncio.Task] = []
+
+        start: float = time.perf_counter()
+
+        for number in range(self.args.submissions):
+            submissions.append(asyncio.create_task(self.submit(number)))
+
+            if self.args.rate > 0:
+                await asyncio.sleep(self.rng.expovariate(self.args.rate))
+
+        await asyncio.gather(*submissions)
+        intake: float = time.perf_counter() - start
+
+        await self.discord_api.queue_posts.join()
+        moderated: float = time.perf_counter() - start
+
+        await self.gallery_drained()
+        total: float = time.perf_counter() - start
+
+        for task in moderators:
+            task.cancel()
+
+        queued: int = sum(map(len, self.queue_latencies.values()))
+
+        return {
+            'submissions': {
+                'posted': self.args.submissions,
+                'unique_urls': len(self.submitted_at),
+                'queued': queued,
+                'intake_seconds': intake,
+                'moderated_seconds': moderated,
+                'gallery_drained_seconds': total,
+                'queued_per_second': queued / intake if intake else None,
+            },
+            'queue_post_latency_seconds': {kind: percentiles(latencies) for kind, latencies in self.queue_latencies.items()},
+            'moderation_latency_seconds': {action: percentiles(latencies) for action, latencies in self.moderation_latencies.items()},
+            'moderation_errors': self.moderation_errors,
+            'lock_contention': lock_contention(),
+            'stages': stage_summary(),
+            'discord_requests': dict(self.discord_api.requests),
+        }
+
+
+def percentiles(values: list[float]) -> dict[str, float | int] | None:
+    if not values:
+        return None
+
+    cuts: list[float] = statistics.quantiles(values, n=100, method='inclusive') if len(values) > 1 else values * 99
+
+    return {'count': len(values), 'p50': cuts[49], 'p90': cuts[89], 'p99': cuts[98], 'max': max(values)}
+
+
+def lock_contention() -> dict[str, float | int]:
+    """Summarises the keyed lock waits, where waits beyond the first bucket of the histogram count as contended."""
+
+    counts: list[int] = LOCK_WAIT.counts.get((), [0])
+    acquisitions: int = sum(counts)
+
+    return {
+        'acquisitions': acquisitions,
+        'contended': acquisitions - counts[0],
+        'total_wait_seconds': LOCK_WAIT.sums.get((), 0),
+    }
+
+
+def stage_summary() -> dict[str, dict[str, float | int]]:
+    return {
+        stage: {
+            'count': sum(counts),
+            'mean_seconds': STAGE_DURATION.sums[(stage,)] / sum(counts),
+            'errors': int(STAGE_ERRORS.values.get((stage,), 0)),
+        }
+        for (stage,), counts in STAGE_DURATION.counts.items()
+    }
+
+
+async def simulate(args: argparse.Namespace) -> dict[str, Any]:
+    discord_api: StandInDiscord = StandInDiscord(config.settings.event_guild_id, config.settings.queue_channel_id, args.discord_latency)
+    cdn: StandInCDN = StandInCDN([args.payload_size], args.cdn_latency)
+
+    async with discord_api.serve(), cdn.serve() as cdn_url, temporary_database(args.dsn) as pool:
+        previous: config.Config = config.settings
+        config.settings = dataclasses.replace(
+            config.settings,
+            image_uploading_endpoint=f'{cdn_url}/upload',
+            image_uploading_authorization='benchmark',
+            statistics_authorization=None,
+            max_download_size=args.payload_size + 1024,
+        )
+
+        bot: LoadTestBot = LoadTestBot(pool)
+
+        try:
+            await bot.login(config.settings.token)
+            return await Simulation(args, bot, discord_api, cdn_url).run()
+        finally:
+            await bot.close()
+            config.settings = previous
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.burst', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default=os.environ.get('ARTEMIS_BENCHMARK_DSN'), help='PostgreSQL database to create a temporary schema in')
+    parser.add_argument('--submissions', type=int, default=500)
+    parser.add_argument('--rate', type=float, default=0, help='submissions per second on average, 0 posts all of them at once')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--payload-size', type=int, default=512 * 1024, help='size of every artwork in bytes')
+    parser.add_argument('--duplicates', type=float, default=0.05, help='share of submissions reposting an earlier URL')
+    parser.add_argument('--edits', type=float, default=0.1, help='share of submission messages which get another URL edited in')
+    parser.add_argument('--edit-delay', type=float, default=1, help='seconds between posting and editing a message')
+    parser.add_argument('--moderators', type=int, default=3, help='moderators acting on the queue at the same time')
+    parser.add_argument('--moderation-delay', type=float, default=0.5, help='seconds a moderator takes to decide')
+    parser.add_argument('--moderation-weights', type=float, nargs=3, default=[0.8, 0.1, 0.1], metavar=('APPROVE', 'REJECT', 'DISMISS'))
+    parser.add_argument('--double-clicks', type=float, default=0.05, help='share of moderation clicks which are sent twice')
+    parser.add_argument('--discord-latency', type=float, default=0.05, help='seconds every Discord API request takes')
+    parser.add_argument('--cdn-latency', type=float, default=0.02, help='seconds every CDN request takes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=argparse.FileType('w', encoding='utf-8'), default=sys.stdout, help='where to write the JSON report')
+    args = parser.parse_args()
+
+    if args.dsn is None:
+        parser.error('a database is required, pass --dsn or set ARTEMIS_BENCHMARK_DSN')
+
+    results: dict[str, Any] = asyncio.run(simulate(args))
+
+    report: dict[str, Any] = {
+        'commit': commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('dsn', 'output')},
+        'results': results,
+    }
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
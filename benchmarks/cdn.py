@@ -0,0 +1,118 @@
+import asyncio
+import contextlib
+import dataclasses
+import hashlib
+import io
+import itertools
+import math
+import os
+from typing import AsyncIterator, cast
+
+import discord
+from aiohttp import web
+from PIL import Image
+
+from src import Artemis, config
+from src.cogs.file_utils import FileUtils, Reupload, close_file
+from src.http_client import HTTPClient
+
+from .harness import Result, StandInBot, measure_async, temporary_database
+
+
+# Sizes of the served artwork, around the usual range of submissions up to just below the download limit
+PAYLOAD_SIZES: list[int] = [64 * 1024, 1024 * 1024, 8 * 1024 * 1024, 24 * 1024 * 1024]
+
+
+def noise_png(size: int) -> bytes:
+    """A PNG of random pixels just below `size` bytes, noise doesn't compress so it is the worst case for transcoding as well."""
+
+    # Leaves room for the PNG's filter bytes and headers, which add about 0.03%
+    side: int = max(1, math.isqrt(size * 999 // 1000 // 3))
+    data: io.BytesIO = io.BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(data, format='png', compress_level=1)
+
+    return data.getvalue()
+
+
+class StandInCDN:
+    """Serves generated artwork and accepts uploads like the CDN does, without storing anything."""
+
+    def __init__(self, sizes: list[int] = PAYLOAD_SIZES, latency: float = 0) -> None:
+        self.payloads: dict[int, bytes] = {size: noise_png(size) for size in sizes}
+        self.latency: float = latency
+        self.nonces: itertools.count = itertools.count()
+
+        self.app: web.Application = web.Application()
+        self.app.router.add_get('/artwork/{size}/{variant}.png', self.artwork)
+        self.app.router.add_post('/upload', self.upload)
+
+    async def artwork(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+
+        body: bytes = self.payloads[int(request.match_info['size'])]
+
+        # Unique artwork changes its content hash, so every download has to be uploaded again. Decoders ignore data after the image
+        if request.match_info['variant'] == 'unique':
+            body += next(self.nonces).to_bytes(8, 'big')
+
+        return web.Response(body=body, content_type='image/png')
+
+    async def upload(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+
+        digest = hashlib.sha256()
+
+        async for chunk in request.content.iter_chunked(64 * 1024):
+            digest.update(chunk)
+
+        return web.json_response({'url': f'https://cdn.example.com/{digest.hexdigest()}.png'})
+
+    @contextlib.asynccontextmanager
+    async def serve(self) -> AsyncIterator[str]:
+        runner: web.AppRunner = web.AppRunner(self.app, access_log=None)
+        await runner.setup()
+
+        try:
+            site: web.TCPSite = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+
+            host, port = runner.addresses[0][:2]
+            yield f'http://{host}:{port}'
+        finally:
+            await runner.cleanup()
+
+
+async def run(dsn: str, iterations: int, warmup: int) -> list[Result]:
+    results: list[Result] = []
+    cdn: StandInCDN = StandInCDN()
+
+    async with cdn.serve() as base_url, temporary_database(dsn) as pool:
+        http_client: HTTPClient = HTTPClient({})
+        file_utils: FileUtils = FileUtils(cast(Artemis, StandInBot(pool, http_client)))
+        previous: config.Config = config.settings
+        config.settings = dataclasses.replace(
+            config.settings,
+            image_uploading_endpoint=f'{base_url}/upload',
+            image_uploading_authorization='benchmark',
+            max_download_size=max(PAYLOAD_SIZES) + 1024,
+        )
+
+        try:
+            for size in PAYLOAD_SIZES:
+                for variant in ('unique', 'repeated'):
+                    url: str = f'{base_url}/artwork/{size}/{variant}.png'
+
+                    async def reupload() -> None:
+                        artwork: Reupload = await file_utils.attempt_double_reupload('artwork', url, None)
+
+                        if artwork.file is not discord.utils.MISSING:
+                            close_file(artwork.file)
+
+                    params: dict = {'payload_bytes': size, 'artwork': variant}
+                    results.append(await measure_async('cdn.attempt_double_reupload', params, reupload, iterations, warmup))
+        finally:
+            config.settings = previous
+            file_utils.cog_unload()
+            await http_client.close()
+
+    return results
@@ -0,0 +1,181 @@
+import asyncio
+import collections
+import contextlib
+import itertools
+import json
+import re
+import time
+from typing import Any, AsyncIterator
+
+import discord
+from aiohttp import web
+
+
+API_PREFIX: str = '/api/v10'
+
+
+def json_response(data: Any) -> web.Response:
+    # discord.py only decodes responses whose content type is exactly application/json, without a charset
+    return web.Response(body=json.dumps(data).encode(), headers={'Content-Type': 'application/json'})
+
+
+class StandInDiscord:
+    """
+    Answers the REST requests the bot makes while handling submissions, like Discord would but without rate limits.
+
+    Messages sent to the queue channel are handed to `queue_posts` together with the time they arrived,
+    so a simulated moderator can act on them.
+    """
+
+    def __init__(self, guild_id: int, queue_channel_id: int, latency: float = 0) -> None:
+        self.guild_id: int = guild_id
+        self.queue_channel_id: int = queue_channel_id
+        self.latency: float = latency
+
+        self.ids: itertools.count = itertools.count(discord.utils.time_snowflake(discord.utils.utcnow()))
+
+        self.bot_user: dict[str, Any] = self.user(next(self.ids), 'Artemis', bot=True)
+        self.application_id: int = next(self.ids)
+
+        self.requests: collections.Counter[str] = collections.Counter()
+        self.queue_posts: asyncio.Queue[tuple[float, dict[str, Any]]] = asyncio.Queue()
+
+        api: web.Application = web.Application(middlewares=[self.middleware])
+        api.router.add_get('/users/@me', self.get_bot_user)
+        api.router.add_get('/oauth2/applications/@me', self.get_application)
+        api.router.add_post('/channels/{channel_id}/messages', self.create_message)
+        api.router.add_post('/channels/{channel_id}/messages/bulk-delete', self.no_content)
+        api.router.add_patch('/channels/{channel_id}/messages/{message_id}', self.edit_message)
+        api.router.add_delete('/channels/{channel_id}/messages/{message_id}', self.no_content)
+        api.router.add_put('/guilds/{guild_id}/members/{user_id}/roles/{role_id}', self.no_content)
+        api.router.add_post('/users/@me/channels', self.create_dm)
+        api.router.add_post('/interactions/{interaction_id}/{token}/callback', self.interaction_callback)
+
+        self.app: web.Application = web.Application()
+        self.app.add_subapp(API_PREFIX, api)
+
+    @staticmethod
+    def user(id: int, name: str, *, bot: bool = False) -> dict[str, Any]:
+        return {'id': str(id), 'username': name, 'global_name': None, 'discriminator': '0', 'avatar': None, 'bot': bot}
+
+    def message(self, channel_id: int, message_id: int, payload: dict[str, Any]) -> dict[str, Any]:
+        return {
+            'id': str(message_id),
+            'channel_id': str(channel_id),
+            'guild_id': str(self.guild_id),
+            'author': self.bot_user,
+            'content': payload.get('content') or '',
+            'timestamp': discord.utils.snowflake_time(message_id).isoformat(),
+            'edited_timestamp': None,
+            'tts': False,
+            'mention_everyone': False,
+            'mentions': [],
+            'mention_roles': [],
+            'attachments': [],
+            'embeds': payload.get('embeds') or [],
+            'components': payload.get('components') or [],
+            'pinned': False,
+            'type': 0,
+            'flags': 0,
+        }
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler: Any) -> web.StreamResponse:
+        self.requests[f'{request.method} {request.match_info.route.resource.canonical}'] += 1  # type: ignore
+
+        await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    async def payload(self, request: web.Request) -> dict[str, Any]:
+        if not request.content_type.startswith('multipart/'):
+            return await request.json()
+
+        payload: dict[str, Any] = {}
+
+        # Attached files are only read, the messages they end up on don't list them
+        async for part in await request.multipart():
+            if part.name == 'payload_json':
+                payload = json.loads(await part.text())  # type: ignore
+            else:
+                while await part.read_chunk():  # type: ignore
+                    pass
+
+        return payload
+
+    async def no_content(self, request: web.Request) -> web.Response:
+        await request.read()
+        return web.Response(status=204)
+
+    async def get_bot_user(self, request: web.Request) -> web.Response:
+        return json_response(self.bot_user)
+
+    async def get_application(self, request: web.Request) -> web.Response:
+        return json_response(
+            {
+                'id': str(self.application_id),
+                'name': 'Artemis',
+                'icon': None,
+                'description': '',
+                'summary': '',
+                'verify_key': '',
+                'bot_public': False,
+                'bot_require_code_grant': False,
+                'owner': self.user(next(self.ids), 'Owner'),
+                'flags': 0,
+            }
+        )
+
+    async def create_message(self, request: web.Request) -> web.Response:
+        channel_id: int = int(request.match_info['channel_id'])
+        message: dict[str, Any] = self.message(channel_id, next(self.ids), await self.payload(request))
+
+        if channel_id == self.queue_channel_id:
+            self.queue_posts.put_nowait((time.perf_counter(), message))
+
+        return json_response(message)
+
+    async def edit_message(self, request: web.Request) -> web.Response:
+        message_id: int = int(request.match_info['message_id'])
+        return json_response(self.message(int(request.match_info['channel_id']), message_id, await self.payload(request)))
+
+    async def create_dm(self, request: web.Request) -> web.Response:
+        recipient: int = int((await request.json())['recipient_id'])
+        return json_response({'id': str(next(self.ids)), 'type': 1, 'recipients': [self.user(recipient, str(recipient))]})
+
+    async def interaction_callback(self, request: web.Request) -> web.Response:
+        response_type: int = (await request.json())['type']
+
+        return json_response(
+            {
+                'interaction': {'id': request.match_info['interaction_id'], 'type': 3},
+                'resource': {'type': response_type},
+            }
+        )
+
+    @contextlib.asynccontextmanager
+    async def serve(self) -> AsyncIterator[str]:
+        """Serves the API and points discord.py at it while the context is active."""
+
+        runner: web.AppRunner = web.AppRunner(self.app, access_log=None)
+        await runner.setup()
+
+        base: str = discord.http.Route.BASE
+
+        try:
+            site: web.TCPSite = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+
+            host, port = runner.addresses[0][:2]
+            discord.http.Route.BASE = f'http://{host}:{port}{API_PREFIX}'  # type: ignore
+
+            yield discord.http.Route.BASE
+        finally:
+            discord.http.Route.BASE = base  # type: ignore
+            await runner.cleanup()
+
+
+def queue_post_url(message: dict[str, Any]) -> str | None:
+    """The submitted URL on a queue message, which is the last line of its content."""
+
+    match = re.search(r'(https?://\S+)$', message['content'])
+    return match and match.group(1)
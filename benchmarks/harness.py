@@ -0,0 +1,131 @@
+import contextlib
+import secrets
+import statistics
+import subprocess
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, TypedDict
+
+import asyncpg
+import discord
+
+from src.http_client import HTTPClient
+from src.migrations import apply_migrations
+
+from . import ROOT
+
+
+SCHEMA_PATH = ROOT / 'schema' / 'calendar.sql'
+
+
+class Timings(TypedDict):
+    min: float
+    mean: float
+    median: float
+    p95: float
+    max: float
+    stdev: float
+
+
+class Result(TypedDict):
+    benchmark: str
+    params: dict[str, Any]
+    iterations: int
+    seconds: Timings
+
+
+def commit() -> str | None:
+    """The commit results were measured at, so they can be compared across commits."""
+
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StandInBot:
+    """Carries the resources cogs read from the bot, so a single cog can be benchmarked without connecting to Discord."""
+
+    pool: asyncpg.Pool
+    http_client: HTTPClient
+
+    def __init__(self, pool: asyncpg.Pool, http_client: HTTPClient = discord.utils.MISSING) -> None:
+        self.pool = pool
+        self.http_client = http_client
+
+
+def summarize(benchmark: str, params: dict[str, Any], timings: list[float]) -> Result:
+    return {
+        'benchmark': benchmark,
+        'params': params,
+        'iterations': len(timings),
+        'seconds': {
+            'min': min(timings),
+            'mean': statistics.fmean(timings),
+            'median': statistics.median(timings),
+            'p95': statistics.quantiles(timings, n=20, method='inclusive')[-1] if len(timings) > 1 else timings[0],
+            'max': max(timings),
+            'stdev': statistics.stdev(timings) if len(timings) > 1 else 0,
+        },
+    }
+
+
+def measure(benchmark: str, params: dict[str, Any], func: Callable[[], Any], iterations: int, warmup: int) -> Result:
+    for _ in range(warmup):
+        func()
+
+    timings: list[float] = []
+    for _ in range(iterations):
+        start: float = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return summarize(benchmark, params, timings)
+
+
+async def measure_async(
+    benchmark: str,
+    params: dict[str, Any],
+    func: Callable[[], Awaitable[Any]],
+    iterations: int,
+    warmup: int,
+) -> Result:
+    for _ in range(warmup):
+        await func()
+
+    timings: list[float] = []
+    for _ in range(iterations):
+        start: float = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+
+    return summarize(benchmark, params, timings)
+
+
+@contextlib.asynccontextmanager
+async def temporary_database(dsn: str) -> AsyncIterator[asyncpg.Pool]:
+    """
+    Yields a pool whose connections use a new schema with the bot's tables, dropping the schema afterwards.
+
+    Nothing outside of the schema is touched, but a dedicated database is still recommended as seeding is heavy.
+    """
+
+    schema: str = f'benchmark_{secrets.token_hex(4)}'
+
+    admin: asyncpg.Connection = await asyncpg.connect(dsn)
+    await admin.execute(f'CREATE SCHEMA {schema}')
+
+    try:
+        pool: asyncpg.Pool = await asyncpg.create_pool(dsn, server_settings={'search_path': schema})  # type: ignore
+
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute(SCHEMA_PATH.read_text(encoding='utf-8'))
+
+            await apply_migrations(pool)
+
+            yield pool
+        finally:
+            await pool.close()
+    finally:
+        await admin.execute(f'DROP SCHEMA {schema} CASCADE')
+        await admin.close()
@@ -0,0 +1,29 @@
+import io
+
+from src.plaques import create_plaque, encode_plaque
+
+from .harness import Result, measure
+
+
+# Characters per line, from a short username up to an unusually long prompt
+LINE_LENGTHS: list[int] = [8, 32, 128]
+
+
+def plaque_lines(length: int) -> list[str]:
+    return [f'@{"a" * (length - 1)}', ('Blob ' * length)[:length]]
+
+
+def run(iterations: int, warmup: int) -> list[Result]:
+    results: list[Result] = []
+
+    for length in LINE_LENGTHS:
+        lines: list[str] = plaque_lines(length)
+        params: dict = {'line_length': length, 'lines': len(lines)}
+
+        results.append(measure('plaques.create_plaque', params, lambda: create_plaque(lines, [0]), iterations, warmup))
+        results.append(measure('plaques.encode_plaque', params, lambda: encode_plaque(lines, [0]), iterations, warmup))
+
+        image = create_plaque(lines, [0])
+        results.append(measure('plaques.png_encode', params, lambda: image.save(io.BytesIO(), format='png'), iterations, warmup))
+
+    return results
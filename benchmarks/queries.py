@@ -0,0 +1,214 @@
+import hashlib
+import random
+import time
+from typing import Any, Awaitable, Callable, cast
+
+import asyncpg
+
+from src import Artemis
+from src.cogs.event_data import EventData, FullSubmission, SubmissionStatus
+from src.cogs.information import LEADERBOARD_PAGE_SIZE
+from src.cogs.queue import NEAR_DUPLICATE_DISTANCE, NEAR_DUPLICATE_WINDOW
+
+from .harness import Result, StandInBot, summarize, temporary_database
+
+
+SUBMISSIONS_PER_USER: int = 10
+PROMPT_COUNT: int = 30
+
+# Keeps the seeded message IDs of the different kinds apart
+QUEUE_MESSAGE_OFFSET: int = 10**12
+GALLERY_MESSAGE_OFFSET: int = 2 * 10**12
+
+# Submissions sampled per table size to pick query parameters from
+SAMPLE_SIZE: int = 1000
+
+# Same as the statistics pushes and backfill pages
+USER_BATCH_SIZE: int = 50
+URL_BATCH_SIZE: int = 100
+
+# Seven in ten submissions are approved, two pending and one denied
+SEED_SUBMISSIONS: str = """
+INSERT INTO submissions (user_id, image_url, prompt_id, status, message_id, queue_message_id, content_hash, perceptual_hash)
+SELECT
+    i / $3,
+    'https://cdn.example.com/' || i || '.png',
+    i % $4,
+    (CASE WHEN i % 10 < 7 THEN 'approved' WHEN i % 10 < 9 THEN 'pending' ELSE 'denied' END)::submission_status,
+    i,
+    $5 + i,
+    md5(i::text),
+    hashtextextended(i::text, 0)
+FROM generate_series($1::BIGINT, $2::BIGINT) AS i
+"""
+
+# Every approval posts a plaque and the artwork
+SEED_GALLERY: str = """
+INSERT INTO gallery (submission_id, message_id)
+SELECT id, $3 + message_id * 2 + kinds.kind
+FROM submissions, (VALUES (0), (1)) AS kinds (kind)
+WHERE status = 'approved' AND message_id BETWEEN $1 AND $2
+"""
+
+SAMPLE_SUBMISSIONS: str = """
+SELECT id, user_id, image_url, prompt_id, status, message_id, queue_message_id, content_hash, perceptual_hash
+FROM submissions
+WHERE status = ANY($1::submission_status[])
+ORDER BY random()
+LIMIT $2
+"""
+
+RESTORE_IMAGE_URLS: str = """
+UPDATE submissions
+SET image_url = 'https://cdn.example.com/' || message_id || '.png', thumbnail_url = NULL
+WHERE id = ANY($1)
+"""
+
+Case = Callable[[asyncpg.Record, asyncpg.pool.PoolConnectionProxy], Awaitable[Any]]
+
+
+async def seed(pool: asyncpg.Pool, start: int, end: int) -> None:
+    async with pool.acquire() as conn:
+        await conn.execute(SEED_SUBMISSIONS, start, end, SUBMISSIONS_PER_USER, PROMPT_COUNT, QUEUE_MESSAGE_OFFSET)
+        await conn.execute(SEED_GALLERY, start, end, GALLERY_MESSAGE_OFFSET)
+        await conn.execute('ANALYZE submissions, gallery, user_submission_counts, prompt_submission_counts')
+
+
+def cases(event_data: EventData, rng: random.Random, rows: int) -> dict[str, Case]:
+    """Every EventData query besides record_gallery_post, called with parameters taken from a random sampled submission."""
+
+    def random_ids(count: int) -> list[int]:
+        return [rng.randint(1, rows) for _ in range(count)]
+
+    return {
+        'submission_by_id': lambda row, conn: event_data.submission_by_id(row['id'], conn=conn),
+        'submission_by_image': lambda row, conn: event_data.submission_by_image(row['image_url'], conn=conn),
+        'submission_by_content': lambda row, conn: event_data.submission_by_content(row['content_hash'], conn=conn),
+        'similar_submissions': lambda row, conn: event_data.similar_submissions(
+            row['perceptual_hash'], NEAR_DUPLICATE_DISTANCE, NEAR_DUPLICATE_WINDOW, conn=conn
+        ),
+        'submission_by_prompt': lambda row, conn: event_data.submission_by_prompt(row['user_id'], row['prompt_id'], conn=conn),
+        'submission_from_queue': lambda row, conn: event_data.submission_from_queue(row['queue_message_id'], conn=conn),
+        'submissions_with_status': lambda row, conn: event_data.submissions_with_status(SubmissionStatus.PENDING, row['user_id'], conn=conn),
+        'approved_submissions_for_users': lambda row, conn: event_data.approved_submissions_for_users(
+            [i // SUBMISSIONS_PER_USER for i in random_ids(USER_BATCH_SIZE)], conn=conn
+        ),
+        'approved_count': lambda row, conn: event_data.approved_count(row['user_id'], conn=conn),
+        'card_summary': lambda row, conn: event_data.card_summary(row['user_id'], row['prompt_id'], conn=conn),
+        'leaderboard': lambda row, conn: event_data.leaderboard(LEADERBOARD_PAGE_SIZE, rng.randrange(100) * LEADERBOARD_PAGE_SIZE, conn=conn),
+        'leaderboard_size': lambda row, conn: event_data.leaderboard_size(conn=conn),
+        'prompt_counts': lambda row, conn: event_data.prompt_counts(row['prompt_id'], conn=conn),
+        'insert_submission': lambda row, conn: event_data.insert_submission(
+            row['user_id'],
+            f'https://cdn.example.com/new/{rng.getrandbits(64)}.png',
+            row['prompt_id'],
+            rows + 1,
+            QUEUE_MESSAGE_OFFSET + rows + 1,
+            hashlib.md5(rng.randbytes(8)).hexdigest(),
+            rng.getrandbits(63),
+            conn=conn,
+        ),
+        'approve_submission': lambda row, conn: event_data.approve_submission(row['id'], conn=conn),
+        'update_status': lambda row, conn: event_data.update_status(row['id'], SubmissionStatus.DENIED, conn=conn),
+        'bulk_update_status.user': lambda row, conn: event_data.bulk_update_status(
+            SubmissionStatus.DISMISSED, user_id=row['user_id'], conn=conn
+        ),
+        'bulk_update_status.prompt': lambda row, conn: event_data.bulk_update_status(
+            SubmissionStatus.DISMISSED, prompt_id=row['prompt_id'], conn=conn
+        ),
+        'update_prompt': lambda row, conn: event_data.update_prompt(row['id'], rng.randrange(PROMPT_COUNT), conn=conn),
+        'existing_image_urls': lambda row, conn: event_data.existing_image_urls(
+            [f'https://cdn.example.com/{i}.png' for i in random_ids(URL_BATCH_SIZE)], conn=conn
+        ),
+        'due_gallery_posts': lambda row, conn: event_data.due_gallery_posts(5, conn=conn),
+        'seconds_until_gallery_post': lambda row, conn: event_data.seconds_until_gallery_post(conn=conn),
+        'channel_cursor': lambda row, conn: event_data.channel_cursor(row['user_id'], conn=conn),
+        'advance_channel_cursor': lambda row, conn: event_data.advance_channel_cursor(row['user_id'], row['message_id'], conn=conn),
+    }
+
+
+async def measure_case(
+    pool: asyncpg.Pool,
+    case: Case,
+    samples: list[asyncpg.Record],
+    rng: random.Random,
+    iterations: int,
+    warmup: int,
+) -> list[float]:
+    """Times a case on one connection, rolling back after every call so writes neither pile up nor leak into later cases."""
+
+    timings: list[float] = []
+
+    async with pool.acquire() as conn:
+        for iteration in range(warmup + iterations):
+            transaction = conn.transaction()
+            await transaction.start()
+
+            try:
+                start: float = time.perf_counter()
+                await case(rng.choice(samples), conn)
+                elapsed: float = time.perf_counter() - start
+            finally:
+                await transaction.rollback()
+
+            if iteration >= warmup:
+                timings.append(elapsed)
+
+    return timings
+
+
+async def measure_record_gallery_post(pool: asyncpg.Pool, event_data: EventData, iterations: int, warmup: int) -> list[float]:
+    # record_gallery_post manages its own transaction, so it changes real approved submissions which are restored afterwards
+    async with pool.acquire() as conn:
+        approved: list[asyncpg.Record] = await conn.fetch(SAMPLE_SUBMISSIONS, ['approved'], warmup + iterations)
+
+    timings: list[float] = []
+
+    try:
+        for iteration, submission in enumerate(approved):
+            message_id: int = GALLERY_MESSAGE_OFFSET * 2 + submission['message_id'] * 2
+
+            start: float = time.perf_counter()
+            await event_data.record_gallery_post(
+                cast(FullSubmission, submission),
+                f'https://cdn.example.com/approved/{submission["id"]}.png',
+                f'https://cdn.example.com/thumbnails/{submission["id"]}.webp',
+                [message_id],
+            )
+            elapsed: float = time.perf_counter() - start
+
+            if iteration >= warmup:
+                timings.append(elapsed)
+    finally:
+        ids: list[int] = [submission['id'] for submission in approved]
+
+        async with pool.acquire() as conn:
+            await conn.execute('DELETE FROM gallery WHERE submission_id = ANY($1) AND message_id >= $2', ids, GALLERY_MESSAGE_OFFSET * 2)
+            await conn.execute(RESTORE_IMAGE_URLS, ids)
+
+    return timings
+
+
+async def run(dsn: str, iterations: int, warmup: int, row_counts: list[int], seed_value: int = 0) -> list[Result]:
+    results: list[Result] = []
+    rng: random.Random = random.Random(seed_value)
+
+    async with temporary_database(dsn) as pool:
+        event_data: EventData = EventData(cast(Artemis, StandInBot(pool)))
+        seeded: int = 0
+
+        for rows in sorted(row_counts):
+            await seed(pool, seeded + 1, rows)
+            seeded = rows
+
+            async with pool.acquire() as conn:
+                samples: list[asyncpg.Record] = await conn.fetch(SAMPLE_SUBMISSIONS, ['pending', 'approved', 'denied'], SAMPLE_SIZE)
+
+            for name, case in cases(event_data, rng, rows).items():
+                timings: list[float] = await measure_case(pool, case, samples, rng, iterations, warmup)
+                results.append(summarize(f'queries.{name}', {'rows': rows}, timings))
+
+            timings = await measure_record_gallery_post(pool, event_data, iterations, warmup)
+            results.append(summarize('queries.record_gallery_post', {'rows': rows}, timings))
+
+    return results
@@ -0,0 +1,12 @@
+-- Every lookup EventData performs on the submissions table gets a matching index.
+
+ALTER TABLE submissions ADD CONSTRAINT submissions_image_url_key UNIQUE (image_url);
+
+-- Queue buttons only ever act on submissions which are still waiting for a moderator.
+CREATE UNIQUE INDEX submissions_pending_queue_message_id_key ON submissions (queue_message_id) WHERE status = 'pending';
+
+CREATE INDEX submissions_user_id_prompt_id_idx ON submissions (user_id, prompt_id);
+CREATE INDEX submissions_user_id_status_idx ON submissions (user_id, status);
+
+-- Supports the ON DELETE CASCADE from submissions.
+CREATE INDEX gallery_submission_id_idx ON gallery (submission_id);
@@ -0,0 +1,14 @@
+-- Content addressed record of everything uploaded to the CDN, so identical files are only ever uploaded once.
+
+CREATE TABLE cdn_uploads (
+    content_hash TEXT PRIMARY KEY,
+    url TEXT NOT NULL
+);
+
+-- Maps where a file was downloaded from (an URL or an avatar key) to its content.
+CREATE TABLE cdn_sources (
+    source TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL REFERENCES cdn_uploads (content_hash) ON DELETE CASCADE
+);
+
+CREATE INDEX cdn_sources_content_hash_idx ON cdn_sources (content_hash);
@@ -0,0 +1,5 @@
+-- SHA-256 of the submitted file and a 64 bit difference hash of the image, NULL for submissions which aren't images.
+
+ALTER TABLE submissions ADD COLUMN content_hash TEXT, ADD COLUMN perceptual_hash BIGINT;
+
+CREATE INDEX submissions_content_hash_idx ON submissions (content_hash) WHERE content_hash IS NOT NULL;
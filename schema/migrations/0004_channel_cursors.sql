@@ -0,0 +1,6 @@
+-- The newest message of a channel which has been processed, used to catch up on messages sent while the bot was offline.
+
+CREATE TABLE channel_cursors (
+    channel_id BIGINT PRIMARY KEY,
+    last_message_id BIGINT NOT NULL
+);
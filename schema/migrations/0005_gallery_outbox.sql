@@ -0,0 +1,13 @@
+-- Approved submissions waiting to be posted to the gallery, written together with the approval and removed once posted.
+
+CREATE TABLE gallery_outbox (
+    submission_id INT PRIMARY KEY REFERENCES submissions (id) ON DELETE CASCADE,
+
+    attempts INT NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    -- Set while an attempt is in progress, an attempt which never finished might have posted already
+    attempt_started_at TIMESTAMPTZ
+);
+
+CREATE INDEX gallery_outbox_next_attempt_at_idx ON gallery_outbox (next_attempt_at);
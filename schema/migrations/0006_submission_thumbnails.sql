@@ -0,0 +1,3 @@
+-- CDN URL of a small version of the artwork, NULL for submissions posted before thumbnails were created or which aren't images.
+
+ALTER TABLE submissions ADD COLUMN thumbnail_url TEXT;
@@ -0,0 +1,99 @@
+-- Submissions per status for every user and every prompt, kept up to date by a trigger in the same transaction as the
+-- submissions they count, so counts are primary key lookups instead of scans of the submissions table.
+
+CREATE TABLE user_submission_counts (
+    user_id BIGINT PRIMARY KEY,
+
+    pending INT NOT NULL DEFAULT 0,
+    approved INT NOT NULL DEFAULT 0,
+    denied INT NOT NULL DEFAULT 0,
+    dismissed INT NOT NULL DEFAULT 0
+);
+
+-- Ranks and pages of the leaderboard
+CREATE INDEX user_submission_counts_approved_idx ON user_submission_counts (approved DESC, user_id);
+
+CREATE TABLE prompt_submission_counts (
+    prompt_id INT PRIMARY KEY,
+
+    pending INT NOT NULL DEFAULT 0,
+    approved INT NOT NULL DEFAULT 0,
+    denied INT NOT NULL DEFAULT 0,
+    dismissed INT NOT NULL DEFAULT 0
+);
+
+CREATE FUNCTION adjust_submission_counts(user_id BIGINT, prompt_id INT, status submission_status, delta INT) RETURNS void
+LANGUAGE sql AS $$
+    INSERT INTO user_submission_counts AS counts (user_id, pending, approved, denied, dismissed)
+    VALUES (
+        $1,
+        CASE WHEN $3 = 'pending' THEN $4 ELSE 0 END,
+        CASE WHEN $3 = 'approved' THEN $4 ELSE 0 END,
+        CASE WHEN $3 = 'denied' THEN $4 ELSE 0 END,
+        CASE WHEN $3 = 'dismissed' THEN $4 ELSE 0 END
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        pending = counts.pending + EXCLUDED.pending,
+        approved = counts.approved + EXCLUDED.approved,
+        denied = counts.denied + EXCLUDED.denied,
+        dismissed = counts.dismissed + EXCLUDED.dismissed;
+
+    INSERT INTO prompt_submission_counts AS counts (prompt_id, pending, approved, denied, dismissed)
+    VALUES (
+        $2,
+        CASE WHEN $3 = 'pending' THEN $4 ELSE 0 END,
+        CASE WHEN $3 = 'approved' THEN $4 ELSE 0 END,
+        CASE WHEN $3 = 'denied' THEN $4 ELSE 0 END,
+        CASE WHEN $3 = 'dismissed' THEN $4 ELSE 0 END
+    )
+    ON CONFLICT (prompt_id) DO UPDATE SET
+        pending = counts.pending + EXCLUDED.pending,
+        approved = counts.approved + EXCLUDED.approved,
+        denied = counts.denied + EXCLUDED.denied,
+        dismissed = counts.dismissed + EXCLUDED.dismissed;
+$$;
+
+CREATE FUNCTION count_submission_change() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Updates which set the counted columns to the values they already had, like approving twice, change nothing
+    IF TG_OP = 'UPDATE' AND (OLD.user_id, OLD.prompt_id, OLD.status) IS NOT DISTINCT FROM (NEW.user_id, NEW.prompt_id, NEW.status) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM adjust_submission_counts(OLD.user_id, OLD.prompt_id, OLD.status, -1);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM adjust_submission_counts(NEW.user_id, NEW.prompt_id, NEW.status, 1);
+    END IF;
+
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER submissions_count_change
+AFTER INSERT OR DELETE OR UPDATE OF user_id, prompt_id, status ON submissions
+FOR EACH ROW EXECUTE FUNCTION count_submission_change();
+
+-- Creating the trigger locked submissions against writes until the migration commits, so no change is missed or counted twice
+INSERT INTO user_submission_counts (user_id, pending, approved, denied, dismissed)
+SELECT
+    user_id,
+    count(*) FILTER (WHERE status = 'pending'),
+    count(*) FILTER (WHERE status = 'approved'),
+    count(*) FILTER (WHERE status = 'denied'),
+    count(*) FILTER (WHERE status = 'dismissed')
+FROM submissions
+GROUP BY user_id;
+
+INSERT INTO prompt_submission_counts (prompt_id, pending, approved, denied, dismissed)
+SELECT
+    prompt_id,
+    count(*) FILTER (WHERE status = 'pending'),
+    count(*) FILTER (WHERE status = 'approved'),
+    count(*) FILTER (WHERE status = 'denied'),
+    count(*) FILTER (WHERE status = 'dismissed')
+FROM submissions
+GROUP BY prompt_id;
@@ -0,0 +1,30 @@
+-- Lets the raffle stream approved submissions in ticket order without sorting them first.
+CREATE INDEX submissions_approved_user_id_id_idx ON submissions (user_id, id) WHERE status = 'approved';
+
+-- Every raffle draw with everything needed to repeat it, the digest covers the tickets it counted.
+CREATE TABLE raffle_draws (
+    id SERIAL PRIMARY KEY,
+
+    seed TEXT NOT NULL,
+    winner_count INT NOT NULL,
+    ticket_cap INT,
+
+    entrants INT NOT NULL,
+    tickets BIGINT NOT NULL,
+    tickets_digest TEXT NOT NULL,
+
+    drawn_by BIGINT NOT NULL,
+    drawn_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Submissions aren't referenced, so the record of a draw outlives them.
+CREATE TABLE raffle_winners (
+    draw_id INT NOT NULL REFERENCES raffle_draws (id) ON DELETE CASCADE,
+    place INT NOT NULL,
+
+    user_id BIGINT NOT NULL,
+    submission_id INT NOT NULL,
+    tickets INT NOT NULL,
+
+    PRIMARY KEY (draw_id, place)
+);
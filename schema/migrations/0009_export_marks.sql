@@ -0,0 +1,17 @@
+-- Incremental exports continue after the transactions they covered instead of the newest ID they saw.
+-- IDs are assigned before commit, so a row with a lower ID can become visible after a higher one was already exported.
+-- Every transaction older than the oldest one still running when an export starts has finished, so the rows they inserted
+-- are either all visible to the export or rolled back, and the next export continues from that transaction.
+CREATE TABLE export_marks (
+    export TEXT PRIMARY KEY,
+    last_transaction BIGINT NOT NULL
+);
+
+ALTER TABLE submissions ADD COLUMN export_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+ALTER TABLE gallery ADD COLUMN export_xid xid8 NOT NULL DEFAULT pg_current_xact_id();
+
+CREATE INDEX submissions_export_xid_idx ON submissions (export_xid);
+CREATE INDEX gallery_export_xid_idx ON gallery (export_xid);
+
+-- Date ranges of exports are message ID ranges, as message IDs encode when they were sent.
+CREATE INDEX submissions_message_id_idx ON submissions (message_id);
@@ -1,5 +1,7 @@
 from . import Artemis, setup_logging
 
 
-with setup_logging():
-    Artemis().run()
+# Transcoding workers are spawned processes, which import this module again under another name
+if __name__ == '__main__':
+    with setup_logging():
+        Artemis().run()
@@ -1,11 +1,13 @@
 import typing
 
-import aiohttp
 import asyncpg
 import discord
 from discord.ext import commands
 
-from .config import EventBot, token
+from . import config
+from .config import EventBot
+from .http_client import HTTPClient
+from .migrations import apply_migrations
 
 
 C = typing.TypeVar('C', bound=commands.Cog)
@@ -13,17 +15,28 @@ C = typing.TypeVar('C', bound=commands.Cog)
 
 class Artemis(EventBot):
     pool: asyncpg.Pool
-    session: aiohttp.ClientSession
+    # Not called http, discord.py uses that name for its own client
+    http_client: HTTPClient
 
     def __init__(self) -> None:
         intents: discord.Intents = discord.Intents(guilds=True, members=True, guild_messages=True, message_content=True)
-        super().__init__(command_prefix='f!', intents=intents)
+
+        if config.settings.lazy_members:
+            # Members are resolved on demand by the Members cog instead of chunking the whole guild at startup
+            super().__init__(
+                command_prefix='f!',
+                intents=intents,
+                chunk_guilds_at_startup=False,
+                member_cache_flags=discord.MemberCacheFlags.none(),
+            )
+        else:
+            super().__init__(command_prefix='f!', intents=intents)
 
         self.pool = discord.utils.MISSING
-        self.session = discord.utils.MISSING
+        self.http_client = discord.utils.MISSING
 
     def run(self) -> None:
-        super().run(token)
+        super().run(config.settings.token)
 
     def get_cog(self, cog_type: type[C]) -> C:
         cog: cog_type | typing.Any = super().get_cog(cog_type.__name__)
@@ -33,16 +46,35 @@ class Artemis(EventBot):
 
         return cog
 
+    def reload_config(self) -> config.Config:
+        """Swaps in the configuration file's current contents without reconnecting, and notifies cogs through on_config_reload."""
+
+        old, new = config.reload()
+        self.dispatch('config_reload', old, new)
+
+        return new
+
     async def setup_hook(self) -> None:
         self.pool = await asyncpg.create_pool(user='postgres', host='db')  # type: ignore # This function is not properly typed in asyncpg, but does work properly.
-        self.session = aiohttp.ClientSession(headers={'User-Agent': 'Artemis/2.0 (+https://blobs.gg)'})
+        await apply_migrations(self.pool)
 
+        self.http_client = HTTPClient(headers={'User-Agent': 'Artemis/2.0 (+https://blobs.gg)'})
+
+        # Loading an extension executes its module again, so cogs have to be loaded after the cogs they import
         cogs: list[str] = [
+            'src.cogs.configuration',
             'src.cogs.event_data',
             'src.cogs.file_utils',
-            'src.cogs.information',
+            'src.cogs.members',
+            'src.cogs.monitoring',
             'src.cogs.prompts',
+            'src.cogs.information',
+            'src.cogs.raffle',
+            'src.cogs.export',
+            'src.cogs.statistics',
+            'src.cogs.gallery',
             'src.cogs.queue',
+            'src.cogs.backfill',
             'src.cogs.tasks',
             'jishaku',
         ]
@@ -50,7 +82,7 @@ class Artemis(EventBot):
             await self.load_extension(cog)
 
     async def close(self) -> None:
-        await self.session.close()
+        await self.http_client.close()
 
         await super().close()
 
@@ -0,0 +1,56 @@
+import collections
+from typing import Callable, Generic, Hashable, TypeVar
+
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Mapping which evicts its least recently used entries once the total weight of its values exceeds `max_weight`.
+
+    By default every value weighs 1, which bounds the number of entries instead.
+    """
+
+    def __init__(self, max_weight: int, *, weigher: Callable[[V], int] = lambda _: 1) -> None:
+        self.max_weight: int = max_weight
+        self.weigher: Callable[[V], int] = weigher
+
+        self.weight: int = 0
+        self._entries: collections.OrderedDict[K, V] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def get(self, key: K) -> V | None:
+        if key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self.pop(key)
+
+        self._entries[key] = value
+        self.weight += self.weigher(value)
+
+        while self.weight > self.max_weight and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.weight -= self.weigher(evicted)
+
+    def pop(self, key: K) -> V | None:
+        value: V | None = self._entries.pop(key, None)
+
+        if value is not None:
+            self.weight -= self.weigher(value)
+
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.weight = 0
@@ -0,0 +1,145 @@
+import asyncio
+import itertools
+import logging
+
+import discord
+from discord.ext import commands
+
+from .. import Artemis, ArtemisCog
+from .event_data import EventData
+from .queue import Queue
+
+
+log = logging.getLogger(__name__)
+
+# Messages are checked against the database one history page at a time
+PAGE_SIZE: int = 100
+
+BACKFILL_CONCURRENCY: int = 4
+
+# Seconds before an incomplete backfill is attempted again, doubling after every attempt
+RETRY_BASE_DELAY: float = 5
+RETRY_MAX_DELAY: float = 600
+
+
+class Backfill(ArtemisCog):
+    """Catches up on submissions which were posted while the bot was offline or disconnected."""
+
+    def __init__(self, bot: Artemis) -> None:
+        super().__init__(bot)
+
+        self.lock: asyncio.Lock = asyncio.Lock()
+
+        # Live messages only move the cursor once everything before them has been processed
+        self.caught_up: bool = False
+
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        if self.lock.locked():
+            return
+
+        async with self.lock:
+            self.caught_up = False
+            delay: float = RETRY_BASE_DELAY
+
+            # Until the backfill completes, live messages must not move the cursor past the messages it still has to process
+            while True:
+                try:
+                    if await self.backfill_submissions():
+                        break
+                except Exception:
+                    log.exception('Failed to backfill submissions.')
+
+                log.info(f'Retrying the backfill in {delay} seconds.')
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RETRY_MAX_DELAY)
+
+            self.caught_up = True
+
+    @commands.Cog.listener()
+    async def on_submission_message_stored(self, message: discord.Message) -> None:
+        # Dispatched by Queue once the submissions of a live message are stored, so a restart before that still backfills it
+        if self.caught_up:
+            await self.bot.get_cog(EventData).advance_channel_cursor(message.channel.id, message.id)
+
+    async def backfill_submissions(self) -> bool:
+        """Processes the submissions posted after the channel cursor, returning whether all of them were processed."""
+
+        channel: discord.TextChannel = self.bot.submission_channel
+        event_data: EventData = self.bot.get_cog(EventData)
+
+        last_message_id: int | None = await event_data.channel_cursor(channel.id)
+
+        if last_message_id is None:
+            # Nothing has been tracked yet, so there is nothing to catch up on either
+            if channel.last_message_id is not None:
+                await event_data.advance_channel_cursor(channel.id, channel.last_message_id)
+
+            return True
+
+        page: list[discord.Message] = []
+        submitted: int = 0
+        failed: int = 0
+
+        async def finish_page() -> None:
+            nonlocal submitted, failed
+
+            # The cursor stays before the first failure, so the next attempt processes everything after it again
+            page_submitted, page_failed = await self.backfill_page(page, advance_cursor=not failed)
+            submitted += page_submitted
+            failed += page_failed
+
+        async for message in channel.history(limit=None, after=discord.Object(last_message_id), oldest_first=True):
+            page.append(message)
+
+            if len(page) == PAGE_SIZE:
+                await finish_page()
+                page = []
+
+        if page:
+            await finish_page()
+
+        log.info(f'Backfilled {submitted - failed} submissions posted after message {last_message_id}, {failed} failed.')
+        return not failed
+
+    async def backfill_page(self, messages: list[discord.Message], *, advance_cursor: bool = True) -> tuple[int, int]:
+        """
+        Processes the new submissions of a page of messages, returning how many there were and how many of them failed.
+
+        A failing submission doesn't stop the others, but the channel cursor only moves up to the message before it.
+        """
+
+        queue: Queue = self.bot.get_cog(Queue)
+        event_data: EventData = self.bot.get_cog(EventData)
+
+        candidates: list[tuple[discord.Message, str]] = [(message, url) for message in messages for url in queue.submission_urls(message)]
+        existing: set[str] = await event_data.existing_image_urls([url for _, url in candidates])
+
+        new_submissions: list[tuple[discord.Message, str]] = [(message, url) for message, url in candidates if url not in existing]
+
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+
+        failed_messages: set[int] = set()
+        failed: int = 0
+
+        async def process(message: discord.Message, url: str) -> None:
+            nonlocal failed
+
+            async with semaphore:
+                try:
+                    await queue.process_submission(message.author, message.id, url)
+                except Exception:
+                    log.exception(f'Failed to backfill {url} from message {message.id}.')
+                    failed_messages.add(message.id)
+                    failed += 1
+
+        await asyncio.gather(*(process(message, url) for message, url in new_submissions))
+
+        processed: list[discord.Message] = list(itertools.takewhile(lambda message: message.id not in failed_messages, messages))
+        if advance_cursor and processed:
+            await event_data.advance_channel_cursor(processed[-1].channel.id, processed[-1].id)
+
+        return len(new_submissions), failed
+
+
+setup = Backfill.setup
@@ -0,0 +1,59 @@
+import asyncio
+import dataclasses
+import logging
+import signal
+
+from discord.ext import commands
+from ruamel.yaml import YAMLError
+
+from .. import ArtemisCog, config
+from ..errors import InvalidConfig
+
+
+log = logging.getLogger(__name__)
+
+# Values which are only read while starting up, changing them requires a restart
+RESTART_REQUIRED: set[str] = {'token', 'event_guild_id', 'lazy_members', 'metrics_host', 'metrics_port'}
+
+
+class Configuration(ArtemisCog):
+    async def cog_load(self) -> None:
+        # Lets the configuration be reloaded with `docker kill --signal=HUP`
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.reload_from_signal)
+
+    async def cog_unload(self) -> None:
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+
+    def reload(self) -> list[str]:
+        """Reloads the configuration, returning the names of the changed values."""
+
+        old: config.Config = config.settings
+        new: config.Config = self.bot.reload_config()
+
+        changed: list[str] = [field.name for field in dataclasses.fields(new) if getattr(old, field.name) != getattr(new, field.name)]
+
+        for name in RESTART_REQUIRED.intersection(changed):
+            log.warning(f'{name} was changed, this only takes effect after a restart.')
+
+        log.info(f'Reloaded configuration, changed values: {", ".join(changed) or "none"}.')
+        return changed
+
+    def reload_from_signal(self) -> None:
+        try:
+            self.reload()
+        except (OSError, YAMLError, InvalidConfig) as e:
+            log.error(f'Failed to reload configuration: {e}')
+
+    @commands.command(name='reload-config')
+    @commands.is_owner()
+    async def reload_config(self, ctx: commands.Context) -> None:
+        try:
+            changed: list[str] = self.reload()
+        except (OSError, YAMLError, InvalidConfig) as e:
+            await ctx.send(f'Failed to reload configuration, keeping the current one: {e}')
+            return
+
+        await ctx.send(f'Reloaded configuration, changed values: {", ".join(f"`{name}`" for name in changed) or "none"}.')
+
+
+setup = Configuration.setup
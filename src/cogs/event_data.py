@@ -1,11 +1,15 @@
+import contextlib
+import datetime
 import enum
 import logging
-from typing import TypedDict, cast
+from typing import AsyncIterator, Awaitable, Callable, NamedTuple, ParamSpec, TypedDict, TypeVar, cast
 
 import asyncpg
-import discord
 
-from .. import ArtemisCog, config
+from .. import ArtemisCog
+from ..exporting import ExportFormat, ndjson_line
+from ..metrics import QUERY_DURATION
+from ..raffle import RaffleResult, Ticket, Winner
 
 
 class SubmissionStatus(enum.Enum):
@@ -27,6 +31,25 @@ class BasicSubmissionInfo(TypedDict):
     image_url: str
 
 
+class CardSummary(TypedDict):
+    approved: int
+    current_status: str | None
+
+
+class SubmissionCounts(TypedDict):
+    pending: int
+    approved: int
+    denied: int
+    dismissed: int
+
+
+class LeaderboardEntry(TypedDict):
+    # Users with as many approved submissions share a rank
+    rank: int
+    user_id: int
+    approved: int
+
+
 class FullSubmission(BasicSubmissionInfo):
     id: int
     user_id: int
@@ -34,11 +57,360 @@ class FullSubmission(BasicSubmissionInfo):
     status: str
 
     message_id: int
+    queue_message_id: int
+
+
+class GalleryPost(FullSubmission):
+    attempts: int
+    attempt_started_at: datetime.datetime | None
+
+
+class RaffleDraw(TypedDict):
+    id: int
+    seed: str
+    winner_count: int
+    ticket_cap: int | None
+    entrants: int
+    tickets: int
+    tickets_digest: str
+    drawn_by: int
+    drawn_at: datetime.datetime
+
+
+class ExportResult(NamedTuple):
+    rows: int
+    # The oldest transaction the export might not have seen, where the next incremental export continues
+    high_water: int
 
 
 log = logging.getLogger(__name__)
 
-SUBMISSION_FIELDS: str = 'id, user_id, image_url, prompt_id, status, message_id'
+P = ParamSpec('P')
+R = TypeVar('R')
+
+Connection = asyncpg.Connection | asyncpg.pool.PoolConnectionProxy
+
+SUBMISSION_FIELDS: str = 'id, user_id, image_url, prompt_id, status, message_id, queue_message_id'
+
+# Queries are kept as constant strings so asyncpg's per connection statement cache prepares each of them only once.
+
+SUBMISSION_BY_ID: str = f"""
+SELECT {SUBMISSION_FIELDS}
+FROM submissions
+WHERE id = $1
+"""
+
+SUBMISSION_BY_IMAGE: str = f"""
+SELECT {SUBMISSION_FIELDS}
+FROM submissions
+WHERE image_url = $1
+"""
+
+SUBMISSION_BY_CONTENT: str = f"""
+SELECT {SUBMISSION_FIELDS}
+FROM submissions
+WHERE content_hash = $1
+LIMIT 1
+"""
+
+# Hamming distances can't use an index, this is a scan over the (narrow) hash column of the newest $3 submissions,
+# found through the primary key so the scan doesn't grow with the table
+SIMILAR_SUBMISSIONS: str = f"""
+SELECT {SUBMISSION_FIELDS}
+FROM submissions
+WHERE id > (SELECT coalesce(max(id), 0) FROM submissions) - $3
+AND perceptual_hash IS NOT NULL
+AND length(replace((perceptual_hash # $1)::bit(64)::text, '0', '')) <= $2
+ORDER BY id DESC
+LIMIT $4
+"""
+
+SUBMISSION_BY_PROMPT: str = f"""
+SELECT {SUBMISSION_FIELDS}
+FROM submissions
+WHERE user_id = $1 AND prompt_id = $2
+"""
+
+SUBMISSION_FROM_QUEUE: str = f"""
+SELECT {SUBMISSION_FIELDS}
+FROM submissions
+WHERE queue_message_id = $1 AND status = 'pending'
+"""
+
+SUBMISSIONS_WITH_STATUS: str = f"""
+SELECT {SUBMISSION_FIELDS}
+FROM submissions
+WHERE user_id = $1 AND status = $2
+"""
+
+APPROVED_SUBMISSIONS_FOR_USERS: str = """
+SELECT user_id, prompt_id, image_url
+FROM submissions
+WHERE user_id = ANY($1) AND status = 'approved'
+"""
+
+# The counts tables are maintained by a trigger on submissions, see the 0007_submission_counts migration
+
+APPROVED_COUNT: str = """
+SELECT coalesce((SELECT approved FROM user_submission_counts WHERE user_id = $1), 0)
+"""
+
+CARD_SUMMARY: str = f"""
+SELECT ({APPROVED_COUNT}) AS approved,
+(SELECT status FROM submissions WHERE user_id = $1 AND prompt_id = $2 LIMIT 1) AS current_status
+"""
+
+# Users ahead are only counted once per page: users tied with the first user of the page share its rank,
+# all users before the page are ahead of anyone with fewer approvals, so the others' ranks follow from the offset
+LEADERBOARD: str = """
+WITH page AS (
+    SELECT user_id, approved
+    FROM user_submission_counts
+    WHERE approved > 0
+    ORDER BY approved DESC, user_id
+    LIMIT $1 OFFSET $2
+), first_rank AS (
+    SELECT count(*) + 1 AS rank
+    FROM user_submission_counts
+    WHERE approved > (SELECT max(approved) FROM page)
+)
+SELECT
+    CASE WHEN approved = max(approved) OVER () THEN first_rank.rank ELSE $2 + rank() OVER (ORDER BY approved DESC) END AS rank,
+    user_id,
+    approved
+FROM page, first_rank
+ORDER BY approved DESC, user_id
+"""
+
+LEADERBOARD_SIZE: str = """
+SELECT count(*)
+FROM user_submission_counts
+WHERE approved > 0
+"""
+
+PROMPT_COUNTS: str = """
+SELECT pending, approved, denied, dismissed
+FROM prompt_submission_counts
+WHERE prompt_id = $1
+"""
+
+INSERT_SUBMISSION: str = f"""
+INSERT INTO submissions (user_id, image_url, prompt_id, status, message_id, queue_message_id, content_hash, perceptual_hash)
+VALUES ($1, $2, $3, 'pending', $4, $5, $6, $7)
+ON CONFLICT (image_url) DO NOTHING
+RETURNING {SUBMISSION_FIELDS}
+"""
+
+# Only pending submissions are moderated, so a rejection racing an approval can't undo it after it was queued for the gallery
+UPDATE_STATUS: str = """
+UPDATE submissions
+SET status = $2
+WHERE id = $1 AND status = 'pending'
+RETURNING id
+"""
+
+# Approvals are queued for the gallery in the same statement, so an approved submission can never miss its gallery post
+APPROVE_SUBMISSION: str = """
+WITH approved AS (
+    UPDATE submissions
+    SET status = 'approved'
+    WHERE id = $1 AND status = 'pending'
+    RETURNING id
+)
+INSERT INTO gallery_outbox (submission_id)
+SELECT id FROM approved
+RETURNING submission_id
+"""
+
+BULK_UPDATE_STATUS: str = f"""
+WITH updated AS (
+    UPDATE submissions
+    SET status = $1
+    WHERE status = 'pending'
+    AND ($2::INT IS NULL OR prompt_id = $2)
+    AND ($3::BIGINT IS NULL OR user_id = $3)
+    AND ($4::BIGINT IS NULL OR message_id < $4)
+    RETURNING {SUBMISSION_FIELDS}
+), queued AS (
+    INSERT INTO gallery_outbox (submission_id)
+    SELECT id FROM updated WHERE $1 = 'approved'
+)
+SELECT {SUBMISSION_FIELDS} FROM updated
+"""
+
+UPDATE_PROMPT: str = """
+UPDATE submissions
+SET prompt_id = $2
+WHERE id = $1
+"""
+
+# Identical artwork shares its CDN URL, so submissions made before content hashing could collide on image_url
+RECORD_GALLERY_IMAGE: str = """
+UPDATE submissions
+SET image_url = CASE WHEN EXISTS (SELECT 1 FROM submissions WHERE image_url = $2 AND id <> $1) THEN image_url ELSE $2 END,
+    thumbnail_url = $3
+WHERE id = $1
+"""
+
+INSERT_GALLERY_MESSAGE: str = """
+INSERT INTO gallery (submission_id, message_id)
+VALUES ($1, $2)
+"""
+
+DUE_GALLERY_POSTS: str = f"""
+SELECT {SUBMISSION_FIELDS}, attempts, attempt_started_at
+FROM gallery_outbox JOIN submissions ON id = submission_id
+WHERE next_attempt_at <= now()
+ORDER BY next_attempt_at, submission_id
+LIMIT $1
+"""
+
+SECONDS_UNTIL_GALLERY_POST: str = """
+SELECT GREATEST(EXTRACT(EPOCH FROM min(next_attempt_at) - now()), 0)::FLOAT
+FROM gallery_outbox
+"""
+
+START_GALLERY_ATTEMPT: str = """
+UPDATE gallery_outbox
+SET attempt_started_at = now()
+WHERE submission_id = $1
+"""
+
+# Counts the failed attempt and backs off exponentially from its base delay $2 up to $3, the exponent is capped so it can't overflow.
+# Attempts which might have posted already stay started, so the next one looks for their message first.
+RETRY_GALLERY_POST: str = """
+UPDATE gallery_outbox
+SET attempts = attempts + 1,
+    attempt_started_at = CASE WHEN $4 THEN attempt_started_at END,
+    next_attempt_at = now() + make_interval(secs => least($2 * 2 ^ least(attempts, 30), $3))
+WHERE submission_id = $1
+"""
+
+DELETE_GALLERY_POST: str = """
+DELETE FROM gallery_outbox
+WHERE submission_id = $1
+"""
+
+EXISTING_IMAGE_URLS: str = """
+SELECT image_url
+FROM submissions
+WHERE image_url = ANY($1)
+"""
+
+CHANNEL_CURSOR: str = """
+SELECT last_message_id
+FROM channel_cursors
+WHERE channel_id = $1
+"""
+
+ADVANCE_CHANNEL_CURSOR: str = """
+INSERT INTO channel_cursors (channel_id, last_message_id)
+VALUES ($1, $2)
+ON CONFLICT (channel_id) DO UPDATE SET last_message_id = GREATEST(channel_cursors.last_message_id, EXCLUDED.last_message_id)
+"""
+
+# Every approved submission is a raffle ticket, streamed in the order the raffle expects them
+APPROVED_TICKETS: str = """
+SELECT user_id, id
+FROM submissions
+WHERE status = 'approved'
+ORDER BY user_id, id
+"""
+
+# Rows fetched from the server at once while streaming tickets
+TICKET_PREFETCH: int = 10_000
+
+INSERT_RAFFLE_DRAW: str = """
+INSERT INTO raffle_draws (seed, winner_count, ticket_cap, entrants, tickets, tickets_digest, drawn_by)
+VALUES ($1, $2, $3, $4, $5, $6, $7)
+RETURNING id
+"""
+
+INSERT_RAFFLE_WINNER: str = """
+INSERT INTO raffle_winners (draw_id, place, user_id, submission_id, tickets)
+VALUES ($1, $2, $3, $4, $5)
+"""
+
+RAFFLE_DRAW: str = """
+SELECT id, seed, winner_count, ticket_cap, entrants, tickets, tickets_digest, drawn_by, drawn_at
+FROM raffle_draws
+WHERE id = $1
+"""
+
+RAFFLE_WINNERS: str = """
+SELECT user_id, submission_id, tickets
+FROM raffle_winners
+WHERE draw_id = $1
+ORDER BY place
+"""
+
+# Message IDs are Discord snowflakes, which start with the milliseconds since the Discord epoch
+SNOWFLAKE_TIME: str = "to_timestamp(((({} >> 22) + 1420070400000) / 1000.0)::DOUBLE PRECISION)"
+
+# Exports only filter on what was asked for. COPY can't take parameters, asyncpg inlines them and can't inline NULL,
+# so unlike the other queries these are assembled per export, with `{conditions}` filled in by `EventData.export`.
+EXPORT_QUERIES: dict[str, str] = {
+    'submissions': f"""
+SELECT
+    s.id, s.user_id, s.prompt_id, s.status, s.image_url, s.thumbnail_url, s.content_hash, s.perceptual_hash,
+    s.message_id, s.queue_message_id, {SNOWFLAKE_TIME.format('s.message_id')} AS submitted_at
+FROM submissions s
+WHERE {{conditions}}
+ORDER BY s.id
+""",
+    'gallery': f"""
+SELECT
+    g.submission_id, g.message_id, {SNOWFLAKE_TIME.format('g.message_id')} AS posted_at,
+    s.user_id, s.prompt_id, s.image_url, s.thumbnail_url
+FROM gallery g
+JOIN submissions s ON s.id = g.submission_id
+WHERE {{conditions}}
+ORDER BY g.message_id
+""",
+}
+
+# The transaction which inserted each exported row, incremental exports continue after the transactions they covered.
+# Unlike IDs these can't become visible out of order below the mark, see the 0009_export_marks migration.
+EXPORT_TRANSACTIONS: dict[str, str] = {
+    'submissions': 's.export_xid',
+    'gallery': 'g.export_xid',
+}
+
+# Rows of the transactions from the previous high water mark up to the current one, which arrive as BIGINT arguments
+EXPORT_TRANSACTION_RANGE: str = '{column} >= {after}::BIGINT::TEXT::xid8 AND {column} < {before}::BIGINT::TEXT::xid8'
+
+# Every transaction before the oldest one still running has finished, so whatever they inserted is visible to the export.
+# Read in the export's snapshot, it is where the next incremental export continues.
+EXPORT_HIGH_WATER_MARK: str = """
+SELECT pg_snapshot_xmin(pg_current_snapshot())::TEXT::BIGINT
+"""
+
+# Filters on the exported submissions, by the name of the argument to `EventData.export`
+EXPORT_FILTERS: dict[str, str] = {
+    'status': 's.status = {}',
+    'prompt_id': 's.prompt_id = {}',
+    'after_message_id': 's.message_id >= {}',
+    'before_message_id': 's.message_id < {}',
+}
+
+# Rows fetched from the server at once while streaming an export which isn't produced by COPY
+EXPORT_PREFETCH: int = 5_000
+
+EXPORT_MARK: str = """
+SELECT last_transaction
+FROM export_marks
+WHERE export = $1
+"""
+
+ADVANCE_EXPORT_MARK: str = """
+INSERT INTO export_marks (export, last_transaction)
+VALUES ($1, $2)
+ON CONFLICT (export) DO UPDATE SET last_transaction = GREATEST(export_marks.last_transaction, EXCLUDED.last_transaction)
+"""
+
+
+def timed_query(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+    return QUERY_DURATION.time(query=func.__name__)(func)
 
 
 class EventData(ArtemisCog):
@@ -46,113 +418,369 @@ class EventData(ArtemisCog):
     def pool(self) -> asyncpg.Pool:
         return self.bot.pool
 
-    async def submission_by_id(self, id: int) -> FullSubmission | None:
-        async with self.pool.acquire() as conn:
-            submission: asyncpg.Record | None = await conn.fetchrow(
-                f"""
-                SELECT {SUBMISSION_FIELDS}
-                FROM submissions
-                WHERE id = $1
-                """,
-                id,
-            )
+    @contextlib.asynccontextmanager
+    async def connection(self, conn: Connection | None = None) -> AsyncIterator[Connection]:
+        """
+        Yields the given connection, or a connection from the pool if none is given.
 
-        return cast(FullSubmission | None, submission)
+        Every method of this cog accepts an optional connection, so callers can run several of them in one transaction.
+        """
+
+        if conn is not None:
+            yield conn
+            return
 
-    async def submission_by_image(self, image_url: str) -> FullSubmission | None:
         async with self.pool.acquire() as conn:
-            submission: asyncpg.Record | None = await conn.fetchrow(
-                f"""
-                SELECT {SUBMISSION_FIELDS}
-                FROM submissions
-                WHERE image_url = $1
-                """,
-                image_url,
-            )
+            yield conn
 
-        return cast(FullSubmission | None, submission)
+    @timed_query
+    async def submission_by_id(self, id: int, *, conn: Connection | None = None) -> FullSubmission | None:
+        async with self.connection(conn) as conn:
+            return cast(FullSubmission | None, await conn.fetchrow(SUBMISSION_BY_ID, id))
 
-    async def submission_by_prompt(self, user_id: int, prompt_id: int) -> FullSubmission | None:
-        async with self.pool.acquire() as conn:
-            submission: asyncpg.Record | None = await conn.fetchrow(
-                f"""
-                SELECT {SUBMISSION_FIELDS}
-                FROM submissions
-                WHERE user_id = $1 AND prompt_id = $2
-                """,
-                user_id,
-                prompt_id,
-            )
+    @timed_query
+    async def submission_by_image(self, image_url: str, *, conn: Connection | None = None) -> FullSubmission | None:
+        async with self.connection(conn) as conn:
+            return cast(FullSubmission | None, await conn.fetchrow(SUBMISSION_BY_IMAGE, image_url))
 
-        return cast(FullSubmission | None, submission)
+    @timed_query
+    async def submission_by_content(self, content_hash: str, *, conn: Connection | None = None) -> FullSubmission | None:
+        async with self.connection(conn) as conn:
+            return cast(FullSubmission | None, await conn.fetchrow(SUBMISSION_BY_CONTENT, content_hash))
 
-    async def submission_from_queue(self, message_id):
-        async with self.pool.acquire() as conn:
-            submission: asyncpg.Record | None = await conn.fetchrow(
-                f"""
-                SELECT {SUBMISSION_FIELDS}
-                FROM submissions
-                WHERE queue_message_id = $1
-                """,
-                message_id,
-            )
+    @timed_query
+    async def similar_submissions(
+        self,
+        perceptual_hash: int,
+        max_distance: int,
+        window: int,
+        limit: int = 5,
+        *,
+        conn: Connection | None = None,
+    ) -> list[FullSubmission]:
+        """Returns the newest submissions among the last `window` ones whose hash differs in at most `max_distance` bits."""
 
-        return cast(FullSubmission | None, submission)
+        async with self.connection(conn) as conn:
+            return cast(list[FullSubmission], await conn.fetch(SIMILAR_SUBMISSIONS, perceptual_hash, max_distance, window, limit))
+
+    @timed_query
+    async def submission_by_prompt(self, user_id: int, prompt_id: int, *, conn: Connection | None = None) -> FullSubmission | None:
+        async with self.connection(conn) as conn:
+            return cast(FullSubmission | None, await conn.fetchrow(SUBMISSION_BY_PROMPT, user_id, prompt_id))
+
+    @timed_query
+    async def submission_from_queue(self, message_id: int, *, conn: Connection | None = None) -> FullSubmission | None:
+        async with self.connection(conn) as conn:
+            return cast(FullSubmission | None, await conn.fetchrow(SUBMISSION_FROM_QUEUE, message_id))
 
+    @timed_query
     async def submissions_with_status(
         self,
         status: SubmissionStatus,
         user_id: int,
+        *,
+        conn: Connection | None = None,
     ) -> list[FullSubmission]:
-        async with self.pool.acquire() as conn:
-            submissions: list[asyncpg.Record] = await conn.fetch(
-                f"""
-                SELECT {SUBMISSION_FIELDS}
-                FROM submissions
-                WHERE user_id = $1 AND status = $2
-                """,
-                user_id,
-                status.value,
+        async with self.connection(conn) as conn:
+            return cast(list[FullSubmission], await conn.fetch(SUBMISSIONS_WITH_STATUS, user_id, status.value))
+
+    @timed_query
+    async def approved_submissions_for_users(
+        self,
+        user_ids: list[int],
+        *,
+        conn: Connection | None = None,
+    ) -> dict[int, list[BasicSubmissionInfo]]:
+        async with self.connection(conn) as conn:
+            records: list[asyncpg.Record] = await conn.fetch(APPROVED_SUBMISSIONS_FOR_USERS, user_ids)
+
+        submissions: dict[int, list[BasicSubmissionInfo]] = {}
+        for record in records:
+            submissions.setdefault(record['user_id'], []).append({'prompt_id': record['prompt_id'], 'image_url': record['image_url']})
+
+        return submissions
+
+    @timed_query
+    async def approved_count(self, user_id: int, *, conn: Connection | None = None) -> int:
+        async with self.connection(conn) as conn:
+            return await conn.fetchval(APPROVED_COUNT, user_id)
+
+    @timed_query
+    async def card_summary(self, user_id: int, prompt_id: int, *, conn: Connection | None = None) -> CardSummary:
+        async with self.connection(conn) as conn:
+            record: asyncpg.Record = await conn.fetchrow(CARD_SUMMARY, user_id, prompt_id)
+
+        return {'approved': record['approved'], 'current_status': record['current_status']}
+
+    @timed_query
+    async def leaderboard(self, limit: int, offset: int = 0, *, conn: Connection | None = None) -> list[LeaderboardEntry]:
+        """Users with approved submissions, most approvals first."""
+
+        async with self.connection(conn) as conn:
+            return cast(list[LeaderboardEntry], await conn.fetch(LEADERBOARD, limit, offset))
+
+    @timed_query
+    async def leaderboard_size(self, *, conn: Connection | None = None) -> int:
+        async with self.connection(conn) as conn:
+            return await conn.fetchval(LEADERBOARD_SIZE)
+
+    @timed_query
+    async def prompt_counts(self, prompt_id: int, *, conn: Connection | None = None) -> SubmissionCounts:
+        async with self.connection(conn) as conn:
+            record: asyncpg.Record | None = await conn.fetchrow(PROMPT_COUNTS, prompt_id)
+
+        if record is None:
+            return {'pending': 0, 'approved': 0, 'denied': 0, 'dismissed': 0}
+
+        return cast(SubmissionCounts, dict(record))
+
+    @timed_query
+    async def insert_submission(
+        self,
+        user_id: int,
+        image_url: str,
+        prompt_id: int,
+        message_id: int,
+        queue_message_id: int,
+        content_hash: str | None = None,
+        perceptual_hash: int | None = None,
+        *,
+        conn: Connection | None = None,
+    ) -> FullSubmission | None:
+        """Inserts a pending submission, returning None if a submission with the same image URL already exists."""
+
+        async with self.connection(conn) as conn:
+            submission: asyncpg.Record | None = await conn.fetchrow(
+                INSERT_SUBMISSION, user_id, image_url, prompt_id, message_id, queue_message_id, content_hash, perceptual_hash
             )
 
+        return cast(FullSubmission | None, submission)
+
+    @timed_query
+    async def update_status(self, submission_id: int, status: SubmissionStatus, *, conn: Connection | None = None) -> bool:
+        """Moderates a pending submission, returning False if it wasn't pending anymore."""
+
+        async with self.connection(conn) as conn:
+            return await conn.fetchval(UPDATE_STATUS, submission_id, status.value) is not None
+
+    @timed_query
+    async def bulk_update_status(
+        self,
+        status: SubmissionStatus,
+        *,
+        prompt_id: int | None = None,
+        user_id: int | None = None,
+        before_message_id: int | None = None,
+        conn: Connection | None = None,
+    ) -> list[FullSubmission]:
+        """Changes the status of every pending submission matching all given filters, returning the changed submissions."""
+
+        async with self.connection(conn) as conn:
+            submissions: list[asyncpg.Record] = await conn.fetch(BULK_UPDATE_STATUS, status.value, prompt_id, user_id, before_message_id)
+
         return cast(list[FullSubmission], submissions)
 
-    async def post_statistics(self, link: str, data: UserData | list[BasicSubmissionInfo]) -> None:
-        headers: dict = {
-            'Authorization': config.statistics_authorization,
-        }
+    @timed_query
+    async def update_prompt(self, submission_id: int, prompt_id: int, *, conn: Connection | None = None) -> None:
+        async with self.connection(conn) as conn:
+            await conn.execute(UPDATE_PROMPT, submission_id, prompt_id)
+
+    @timed_query
+    async def approve_submission(self, submission_id: int, *, conn: Connection | None = None) -> bool:
+        """Approves a pending submission and queues it for the gallery, returning False if it wasn't pending anymore."""
+
+        async with self.connection(conn) as conn:
+            return await conn.fetchval(APPROVE_SUBMISSION, submission_id) is not None
+
+    @timed_query
+    async def due_gallery_posts(self, limit: int, *, conn: Connection | None = None) -> list[GalleryPost]:
+        async with self.connection(conn) as conn:
+            return cast(list[GalleryPost], await conn.fetch(DUE_GALLERY_POSTS, limit))
+
+    @timed_query
+    async def seconds_until_gallery_post(self, *, conn: Connection | None = None) -> float | None:
+        """Returns how long until the next queued gallery post is due, or None if nothing is queued."""
+
+        async with self.connection(conn) as conn:
+            return await conn.fetchval(SECONDS_UNTIL_GALLERY_POST)
+
+    @timed_query
+    async def start_gallery_attempt(self, submission_id: int, *, conn: Connection | None = None) -> None:
+        async with self.connection(conn) as conn:
+            await conn.execute(START_GALLERY_ATTEMPT, submission_id)
+
+    @timed_query
+    async def retry_gallery_post(
+        self, submission_id: int, base_delay: float, max_delay: float, may_have_posted: bool = False, *, conn: Connection | None = None
+    ) -> None:
+        """Counts a failed attempt and schedules the next one, the delay doubles with every failed attempt."""
+
+        async with self.connection(conn) as conn:
+            await conn.execute(RETRY_GALLERY_POST, submission_id, base_delay, max_delay, may_have_posted)
+
+    @timed_query
+    async def delete_gallery_post(self, submission_id: int, *, conn: Connection | None = None) -> None:
+        async with self.connection(conn) as conn:
+            await conn.execute(DELETE_GALLERY_POST, submission_id)
+
+    @timed_query
+    async def record_gallery_post(
+        self, submission: FullSubmission, image_url: str, thumbnail_url: str | None, gallery_message_ids: list[int]
+    ) -> int:
+        """
+        Stores the gallery messages of an approved submission and removes it from the gallery outbox in one transaction.
+
+        Returns
+        -------
+        int
+            The amount of approved submissions of the submission's author, including this one.
+        """
 
-        async with self.bot.session.post(link, headers=headers, json=data) as resp:
-            text: str = await resp.text()
-            log.info(f'Updated statistics: {resp.status} - {text}.')
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(RECORD_GALLERY_IMAGE, submission['id'], image_url, thumbnail_url)
+                await conn.executemany(INSERT_GALLERY_MESSAGE, [(submission['id'], message_id) for message_id in gallery_message_ids])
+                await conn.execute(DELETE_GALLERY_POST, submission['id'])
 
-    async def update_user_statistics(self, user: discord.Member) -> None:
-        if config.statistics_authorization is None:
-            return
+                return await self.approved_count(submission['user_id'], conn=conn)
 
-        link: str = f'{config.statistics_endpoint}/v1/users/{user.id}'
+    @timed_query
+    async def existing_image_urls(self, image_urls: list[str], *, conn: Connection | None = None) -> set[str]:
+        async with self.connection(conn) as conn:
+            records: list[asyncpg.Record] = await conn.fetch(EXISTING_IMAGE_URLS, image_urls)
 
-        data: UserData = {
-            "username": user.name,
-            "discriminator": user.discriminator,
-            "avatar": user.avatar and user.avatar.key,  # type: ignore
-        }
+        return {record['image_url'] for record in records}
 
-        await self.post_statistics(link, data)
+    @timed_query
+    async def channel_cursor(self, channel_id: int, *, conn: Connection | None = None) -> int | None:
+        async with self.connection(conn) as conn:
+            return await conn.fetchval(CHANNEL_CURSOR, channel_id)
 
-    async def update_submission_info(self, user: discord.Member) -> None:
-        if config.statistics_authorization is None:
-            return
+    @timed_query
+    async def advance_channel_cursor(self, channel_id: int, message_id: int, *, conn: Connection | None = None) -> None:
+        async with self.connection(conn) as conn:
+            await conn.execute(ADVANCE_CHANNEL_CURSOR, channel_id, message_id)
 
-        link: str = f'{config.statistics_endpoint}/v1/events/drawfest/{config.start_day.year}/submissions/{user.id}'
+    async def approved_tickets(self) -> AsyncIterator[Ticket]:
+        """Streams every approved submission as raffle ticket through a server side cursor, all from one snapshot."""
 
-        approved_submissions: list[FullSubmission] = await self.bot.get_cog(EventData).submissions_with_status(
-            SubmissionStatus.APPROVED, user.id
-        )
+        async with self.pool.acquire() as conn:
+            async with conn.transaction(isolation='repeatable_read', readonly=True):
+                async for record in conn.cursor(APPROVED_TICKETS, prefetch=TICKET_PREFETCH):
+                    yield Ticket(record['user_id'], record['id'])
 
-        await self.post_statistics(
-            link, [{'prompt_id': submission['prompt_id'], 'image_url': submission['image_url']} for submission in approved_submissions]
-        )
+    @timed_query
+    async def record_raffle_draw(
+        self,
+        seed: str,
+        winner_count: int,
+        ticket_cap: int | None,
+        result: RaffleResult,
+        drawn_by: int,
+    ) -> int:
+        """Stores a draw and its winners, returning the draw's ID."""
+
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                draw_id: int = await conn.fetchval(
+                    INSERT_RAFFLE_DRAW, seed, winner_count, ticket_cap, result.entrants, result.tickets, result.digest, drawn_by
+                )
+                await conn.executemany(
+                    INSERT_RAFFLE_WINNER,
+                    [(draw_id, place, *winner) for place, winner in enumerate(result.winners, start=1)],
+                )
+
+        return draw_id
+
+    @timed_query
+    async def raffle_draw(self, draw_id: int, *, conn: Connection | None = None) -> RaffleDraw | None:
+        async with self.connection(conn) as conn:
+            return cast(RaffleDraw | None, await conn.fetchrow(RAFFLE_DRAW, draw_id))
+
+    @timed_query
+    async def raffle_winners(self, draw_id: int, *, conn: Connection | None = None) -> list[Winner]:
+        async with self.connection(conn) as conn:
+            records: list[asyncpg.Record] = await conn.fetch(RAFFLE_WINNERS, draw_id)
+
+        return [Winner(*record) for record in records]
+
+    async def export(
+        self,
+        table: str,
+        format: ExportFormat,
+        write: Callable[[bytes], Awaitable[None]],
+        *,
+        status: SubmissionStatus | None = None,
+        prompt_id: int | None = None,
+        after_message_id: int | None = None,
+        before_message_id: int | None = None,
+        after_transaction: int | None = None,
+    ) -> ExportResult:
+        """
+        Streams the rows of an export table to `write` as they arrive, so memory use doesn't depend on the number of rows.
+
+        Parameters
+        ----------
+        table : str
+            One of the keys of `EXPORT_QUERIES`.
+        format : ExportFormat
+            CSV is produced by Postgres through COPY, NDJSON is encoded from rows read through a server side cursor.
+        write : Callable[[bytes], Awaitable[None]]
+            Receives the output in chunks.
+        after_transaction : int | None
+            Makes the export incremental, with only the rows inserted from this transaction up to the returned high water mark.
+        """
+
+        filters: dict[str, object] = {
+            'status': status.value if status is not None else None,
+            'prompt_id': prompt_id,
+            'after_message_id': after_message_id,
+            'before_message_id': before_message_id,
+        }
+
+        args: list[object] = []
+        conditions: list[str] = []
+
+        for name, value in filters.items():
+            if value is not None:
+                args.append(value)
+                conditions.append(EXPORT_FILTERS[name].format(f'${len(args)}'))
+
+        async with self.pool.acquire() as conn:
+            # The high water mark and the rows come from the same snapshot
+            async with conn.transaction(isolation='repeatable_read', readonly=True):
+                high_water: int = await conn.fetchval(EXPORT_HIGH_WATER_MARK)
+
+                if after_transaction is not None:
+                    args += [after_transaction, high_water]
+                    conditions.append(
+                        EXPORT_TRANSACTION_RANGE.format(column=EXPORT_TRANSACTIONS[table], after=f'${len(args) - 1}', before=f'${len(args)}')
+                    )
+
+                query: str = EXPORT_QUERIES[table].format(conditions='\n    AND '.join(conditions) or 'TRUE')
+
+                if format is ExportFormat.CSV:
+                    # Completes with a status like "COPY 42"
+                    copied: str = await conn.copy_from_query(query, *args, output=write, format='csv', header=True)
+                    rows: int = int(copied.split()[-1])
+                else:
+                    rows = 0
+
+                    async for record in conn.cursor(query, *args, prefetch=EXPORT_PREFETCH):
+                        await write(ndjson_line(record))
+                        rows += 1
+
+        return ExportResult(rows, high_water)
+
+    @timed_query
+    async def export_mark(self, export: str, *, conn: Connection | None = None) -> int:
+        async with self.connection(conn) as conn:
+            return await conn.fetchval(EXPORT_MARK, export) or 0
+
+    @timed_query
+    async def advance_export_mark(self, export: str, transaction: int, *, conn: Connection | None = None) -> None:
+        async with self.connection(conn) as conn:
+            await conn.execute(ADVANCE_EXPORT_MARK, export, transaction)
 
 
 setup = EventData.setup
@@ -0,0 +1,124 @@
+import asyncio
+import datetime
+import logging
+import pathlib
+from typing import Literal
+
+import discord
+from discord import app_commands
+
+from .. import Artemis, ArtemisCog, config
+from ..exporting import ExportFile, ExportFormat
+from .event_data import EventData, ExportResult, SubmissionStatus
+from .file_utils import FileUtils
+from .prompts import Prompts
+
+
+log = logging.getLogger(__name__)
+
+
+def parse_day(value: str | None) -> datetime.date | None:
+    return datetime.date.fromisoformat(value.strip()) if value is not None else None
+
+
+class Export(ArtemisCog):
+    """Streams the event data into files, for archiving it once an event is over or for processing it elsewhere."""
+
+    def __init__(self, bot: Artemis) -> None:
+        super().__init__(bot)
+
+        # Incremental exports running at once would export the same rows
+        self.lock: asyncio.Lock = asyncio.Lock()
+
+    @app_commands.command()
+    @app_commands.guild_only()
+    @app_commands.default_permissions(manage_guild=True)
+    @app_commands.describe(
+        table='What to export, gallery exports map submissions to their gallery posts',
+        format='CSV with a header row, or one JSON object per line',
+        status='Only submissions with this status',
+        prompt='Only submissions for this prompt number',
+        since='Only submissions posted on or after this day (YYYY-MM-DD, in the event timezone)',
+        until='Only submissions posted on or before this day (YYYY-MM-DD, in the event timezone)',
+        incremental='Only rows added since the last incremental export of the table',
+        compress='Compress the file with gzip',
+    )
+    async def export(
+        self,
+        interaction: discord.Interaction,
+        table: Literal['submissions', 'gallery'],
+        format: Literal['csv', 'ndjson'] = 'csv',
+        status: Literal['pending', 'approved', 'denied', 'dismissed'] | None = None,
+        prompt: app_commands.Range[int, 1] | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        incremental: bool = False,
+        compress: bool = True,
+    ) -> None:
+        """Export submissions or gallery posts to a file."""
+
+        try:
+            since_day: datetime.date | None = parse_day(since)
+            until_day: datetime.date | None = parse_day(until)
+        except ValueError:
+            await interaction.response.send_message('`since` and `until` have to be days like 2021-09-01.', ephemeral=True)
+            return
+
+        # Filtered rows before the mark would never be exported by a later incremental export
+        if incremental and any(value is not None for value in (status, prompt, since_day, until_day)):
+            await interaction.response.send_message(
+                'Incremental exports always contain every new row, so they can\'t be filtered.', ephemeral=True
+            )
+            return
+
+        if self.lock.locked():
+            await interaction.response.send_message('Another export is still running, try again once it finished.', ephemeral=True)
+            return
+
+        async with self.lock:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+
+            prompts: Prompts = self.bot.get_cog(Prompts)
+            event_data: EventData = self.bot.get_cog(EventData)
+
+            export_format: ExportFormat = ExportFormat(format)
+            after_transaction: int | None = await event_data.export_mark(table) if incremental else None
+
+            directory: pathlib.Path = pathlib.Path(config.settings.export_directory)
+            directory.mkdir(parents=True, exist_ok=True)
+
+            started_at: datetime.datetime = discord.utils.utcnow()
+            path: pathlib.Path = directory / f'{table}-{started_at:%Y%m%d-%H%M%S}.{export_format.value}{".gz" if compress else ""}'
+
+            async with ExportFile(path, compress) as file:
+                result: ExportResult = await event_data.export(
+                    table,
+                    export_format,
+                    file.write,
+                    status=SubmissionStatus(status) if status is not None else None,
+                    prompt_id=prompt - 1 if prompt is not None else None,
+                    after_message_id=discord.utils.time_snowflake(prompts.timeline.day_start(since_day)) if since_day is not None else None,
+                    before_message_id=(
+                        discord.utils.time_snowflake(prompts.timeline.day_start(until_day + datetime.timedelta(days=1)))
+                        if until_day is not None
+                        else None
+                    ),
+                    after_transaction=after_transaction,
+                )
+
+            # Only once the file is complete, a failed export is repeated in full by the next one
+            if incremental:
+                await event_data.advance_export_mark(table, result.high_water)
+
+            size: int = path.stat().st_size
+            log.info(f'{interaction.user} exported {result.rows} rows of {table} to {path} ({size} bytes).')
+
+            summary: str = f'Exported {result.rows} rows of `{table}` to `{path}`.'
+
+            if size <= self.bot.get_cog(FileUtils).filesize_limit(interaction.guild):
+                await interaction.followup.send(summary, file=discord.File(path), ephemeral=True)
+            else:
+                await interaction.followup.send(f'{summary} It is too large to attach, so it is only on the bot\'s host.', ephemeral=True)
+
+
+setup = Export.setup
@@ -1,14 +1,116 @@
+import asyncio
+import hashlib
 import io
+import logging
 import re
+import tempfile
+from typing import AsyncIterator, NamedTuple, TypedDict
 
 import discord
 from PIL import Image
 
-from .. import ArtemisCog, config
-from ..errors import FilesizeLimitException, NoExtensionFound
+from .. import Artemis, ArtemisCog, config
+from ..cache import LRUCache
+from ..errors import DownloadRejected, FilesizeLimitException, NoExtensionFound, UploadFailed
+from ..hashing import perceptual_hash
+from ..http_client import REQUEST_ERRORS
+from ..metrics import STAGE_DURATION
+from ..transcoding import Rendition, Renditions, Transcoder
+
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE: int = 64 * 1024
+
+# Downloads larger than this are spooled to a temporary file instead of being kept in memory
+SPOOL_MAX_MEMORY: int = 2 * 1024 * 1024
+
+# Number of sources and content hashes whose CDN URL is kept in memory in front of the database
+CDN_CACHE_SIZE: int = 4096
+
+# Intake only fingerprints files up to this many bytes, larger ones are queued without a fingerprint
+FINGERPRINT_MAX_SIZE: int = 10 * 1024 * 1024
+
+
+def thumbnail_source(url: str) -> str:
+    """The CDN source key of the thumbnail of the image at `url`."""
+
+    return f'thumbnail:{url}'
+
+
+def close_file(file: discord.File) -> None:
+    """Closes a file and its buffer, discord.py only closes the buffers of files it opened from a path itself."""
+
+    file.close()
+    file.fp.close()
+
+
+class ImageFingerprint(TypedDict):
+    content_hash: str
+    perceptual_hash: int | None
+
+
+class Reupload(NamedTuple):
+    url: str
+    # MISSING if the artwork can't be attached
+    file: discord.File
+    thumbnail_url: str | None
+
+
+class Download:
+    file: tempfile.SpooledTemporaryFile
+    size: int
+    content_type: str
+    content_hash: str
+
+    def __init__(self, file: tempfile.SpooledTemporaryFile, size: int, content_type: str, content_hash: str) -> None:
+        self.file = file
+        self.size = size
+        self.content_type = content_type
+        self.content_hash = content_hash
+
+    @classmethod
+    def from_rendition(cls, rendition: Rendition) -> 'Download':
+        file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        file.write(rendition.data)
+
+        return cls(file, len(rendition.data), f'image/{rendition.extension}', hashlib.sha256(rendition.data).hexdigest())
+
+    def read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        self.file.seek(0)
+
+        while chunk := self.file.read(CHUNK_SIZE):
+            yield chunk
+
+    def to_file(self, filename: str) -> discord.File:
+        self.file.seek(0)
+
+        # The returned file owns the buffer, it has to be closed through `close_file`
+        return discord.File(self.file, filename)  # type: ignore # SpooledTemporaryFile implements io.IOBase since 3.11
+
+    def close(self) -> None:
+        self.file.close()
 
 
 class FileUtils(ArtemisCog):
+    source_urls: LRUCache[str, str]
+    content_urls: LRUCache[str, str]
+
+    def __init__(self, bot: Artemis) -> None:
+        super().__init__(bot)
+
+        self.source_urls = LRUCache(CDN_CACHE_SIZE)
+        self.content_urls = LRUCache(CDN_CACHE_SIZE)
+
+        self.transcoder: Transcoder = Transcoder()
+
+    def cog_unload(self) -> None:
+        self.transcoder.shutdown()
+
     def get_file_extension(self, url: str) -> str:
         extension = re.match(r'.*\.([\w\d]+)', url)
 
@@ -17,51 +119,274 @@ class FileUtils(ArtemisCog):
 
         return extension.group(1)
 
-    async def upload_file_to_cdn(self, file_data: bytes, extension: str) -> str:
-        assert config.image_uploading_authorization is not None
+    @STAGE_DURATION.time(stage='download')
+    async def download(self, url: str, *, size_limit: int | None = None) -> Download:
+        """
+        Downloads an image into a temporary file, hashing it on the way.
+
+        Raises
+        ------
+        DownloadRejected
+            The file isn't an image, or is larger than `size_limit` bytes, which defaults to the configured maximum download size.
+            Files announcing a larger size in their headers are rejected before their body is read.
+        """
+
+        if size_limit is None or size_limit > config.settings.max_download_size:
+            size_limit = config.settings.max_download_size
+
+        async with self.bot.http_client.request('download', 'GET', url) as resp:
+            resp.raise_for_status()
+
+            if not resp.content_type.startswith('image/'):
+                raise DownloadRejected(url, f'unsupported content type {resp.content_type}')
+
+            if resp.content_length is not None and resp.content_length > size_limit:
+                raise DownloadRejected(url, f'content length {resp.content_length} exceeds {size_limit} bytes')
+
+            file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+            digest = hashlib.sha256()
+            size: int = 0
+
+            try:
+                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+
+                    if size > size_limit:
+                        raise DownloadRejected(url, f'body exceeds {size_limit} bytes')
+
+                    file.write(chunk)
+                    digest.update(chunk)
+            except BaseException:
+                file.close()
+                raise
+
+        return Download(file, size, resp.content_type, digest.hexdigest())
+
+    @STAGE_DURATION.time(stage='cdn_upload')
+    async def upload_file_to_cdn(self, download: Download, extension: str) -> str:
+        """
+        Uploads a file to the CDN and returns its URL.
+
+        Raises
+        ------
+        UploadFailed
+            The CDN accepted the request, but didn't respond with the file's URL.
+        """
+
+        assert config.settings.image_uploading_authorization is not None
 
         headers = {
             'Content-Type': f'image/{extension}',
-            'Authorization': config.image_uploading_authorization,
+            'Content-Length': str(download.size),
+            'Authorization': config.settings.image_uploading_authorization,
         }
 
-        async with self.bot.session.post(config.image_uploading_endpoint, headers=headers, data=file_data) as resp:
-            data = await resp.json()
+        async with self.bot.http_client.request(
+            'cdn', 'POST', config.settings.image_uploading_endpoint, headers=headers, data=download.chunks
+        ) as resp:
+            resp.raise_for_status()
+
+            try:
+                data = await resp.json()
+            except ValueError as e:
+                raise UploadFailed(f'invalid response, {e}') from e
+
+        if not isinstance(data, dict) or not isinstance(data.get('url'), str):
+            raise UploadFailed('the response has no URL')
 
         return data['url']
 
-    def upload_image_to_discord(self, file_data: bytes, filename: str, guild: discord.Guild | None) -> discord.File:
-        size_limit: int = guild.filesize_limit if guild is not None else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+    async def cdn_url_by_source(self, source: str) -> str | None:
+        url: str | None = self.source_urls.get(source)
+
+        if url is None:
+            async with self.bot.pool.acquire() as conn:
+                url = await conn.fetchval(
+                    """
+                    SELECT url
+                    FROM cdn_sources JOIN cdn_uploads USING (content_hash)
+                    WHERE source = $1
+                    """,
+                    source,
+                )
+
+            if url is not None:
+                self.source_urls[source] = url
+
+        return url
+
+    async def cdn_url_by_content(self, content_hash: str) -> str | None:
+        url: str | None = self.content_urls.get(content_hash)
+
+        if url is None:
+            async with self.bot.pool.acquire() as conn:
+                url = await conn.fetchval('SELECT url FROM cdn_uploads WHERE content_hash = $1', content_hash)
+
+            if url is not None:
+                self.content_urls[content_hash] = url
+
+        return url
+
+    async def remember_cdn_upload(self, source: str, content_hash: str, url: str) -> None:
+        async with self.bot.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    'INSERT INTO cdn_uploads (content_hash, url) VALUES ($1, $2) ON CONFLICT (content_hash) DO NOTHING', content_hash, url
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO cdn_sources (source, content_hash) VALUES ($1, $2)
+                    ON CONFLICT (source) DO UPDATE SET content_hash = EXCLUDED.content_hash
+                    """,
+                    source,
+                    content_hash,
+                )
+
+        self.source_urls[source] = url
+        self.content_urls[content_hash] = url
+
+    async def cached_upload_to_cdn(self, download: Download, extension: str, source: str) -> str:
+        url: str | None = await self.cdn_url_by_content(download.content_hash)
+
+        if url is None:
+            url = await self.upload_file_to_cdn(download, extension)
+
+        await self.remember_cdn_upload(source, download.content_hash, url)
+
+        return url
+
+    async def reupload_to_cdn(self, url: str, *, source: str | None = None) -> str:
+        """
+        Returns the CDN URL for the file at `url`, only downloading and uploading it if its source has not been seen before.
+
+        Parameters
+        ----------
+        url : str
+            Where to download the file from.
+        source : str | None
+            A key identifying the file which is stable across URL changes, for example an avatar's key. Defaults to the URL.
+        """
+
+        source = source or url
+
+        cdn_url: str | None = await self.cdn_url_by_source(source)
+        if cdn_url is not None:
+            return cdn_url
+
+        try:
+            download: Download = await self.download(url)
+        except (*REQUEST_ERRORS, DownloadRejected) as e:
+            log.info(f'Not reuploading {url}: {e}')
+            return url
+
+        try:
+            return await self.cached_upload_to_cdn(download, self.get_file_extension(url), source)
+        except NoExtensionFound:
+            return url
+        except (*REQUEST_ERRORS, UploadFailed) as e:
+            log.info(f'Failed to reupload {url}: {e}')
+            return url
+        finally:
+            download.close()
 
-        size = len(file_data)
-        if size > size_limit:
-            raise FilesizeLimitException(size, size_limit)
+    async def fingerprint(self, url: str) -> ImageFingerprint | None:
+        try:
+            download: Download = await self.download(url, size_limit=FINGERPRINT_MAX_SIZE)
+        except (*REQUEST_ERRORS, DownloadRejected) as e:
+            log.info(f'Not fingerprinting {url}: {e}')
+            return None
+
+        try:
+            download.file.seek(0)
+            image_hash: int | None = await asyncio.to_thread(perceptual_hash, download.file)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            image_hash = None
+        finally:
+            download.close()
+
+        return {'content_hash': download.content_hash, 'perceptual_hash': image_hash}
+
+    def filesize_limit(self, guild: discord.Guild | None) -> int:
+        return guild.filesize_limit if guild is not None else discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES
+
+    def upload_image_to_discord(self, download: Download, filename: str, guild: discord.Guild | None) -> discord.File:
+        size_limit: int = self.filesize_limit(guild)
+
+        if download.size > size_limit:
+            raise FilesizeLimitException(download.size, size_limit)
         else:
-            return discord.File(io.BytesIO(file_data), filename)
+            return download.to_file(filename)
+
+    async def create_renditions(self, download: Download, size_limit: int, thumbnail_key: str) -> Renditions:
+        """Shrinks artwork which is too large to attach and creates its thumbnail, unless the thumbnail was uploaded before."""
+
+        max_size: int | None = size_limit if download.size > size_limit else None
+        thumbnail_size: int | None = None if await self.cdn_url_by_source(thumbnail_key) else config.settings.thumbnail_size
+
+        if max_size is None and thumbnail_size is None:
+            return Renditions(None, None)
+
+        try:
+            return await self.transcoder.transcode(download.read(), max_size, thumbnail_size)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            log.info(f'Failed to transcode an image of {download.size} bytes: {e}')
+            return Renditions(None, None)
+
+    async def attempt_double_reupload(self, name: str, url: str, guild: discord.Guild | None) -> Reupload:
+        """
+        Uploads artwork to the CDN together with a thumbnail and prepares it as attachment, shrinking it if it is too large to attach.
+
+        The CDN receives the original artwork unless `keep_original_uploads` is disabled and the artwork had to be shrunk.
+        Falls back to the given URL and no attachment for anything which can't be reuploaded.
+        """
 
-    async def attempt_double_reupload(self, name: str, url: str, guild: discord.Guild | None) -> tuple[str, discord.File]:
         upload_url: str = url
         file: discord.File = discord.utils.MISSING
+        thumbnail_url: str | None = None
 
-        async with self.bot.session.get(url) as resp:
-            file_data: bytes = await resp.read()
+        try:
+            download: Download = await self.download(url)
+        except (*REQUEST_ERRORS, DownloadRejected) as e:
+            log.info(f'Not reuploading {url}: {e}')
+            return Reupload(upload_url, file, thumbnail_url)
+
+        downloads: list[Download] = [download]
+        thumbnail_key: str = thumbnail_source(url)
 
         try:
             extension: str = self.get_file_extension(url)
+            renditions: Renditions = await self.create_renditions(download, self.filesize_limit(guild), thumbnail_key)
+
+            attachment, attachment_extension = download, extension
+            if renditions.fitted is not None:
+                attachment, attachment_extension = Download.from_rendition(renditions.fitted), renditions.fitted.extension
+                downloads.append(attachment)
 
-            upload_url: str = await self.upload_file_to_cdn(file_data, extension)
-            file = self.upload_image_to_discord(file_data, f'{name}.{extension}', guild)
+                if not config.settings.keep_original_uploads:
+                    download, extension = attachment, attachment_extension
+
+            upload_url = await self.cached_upload_to_cdn(download, extension, url)
+
+            if renditions.thumbnail is not None:
+                downloads.append(Download.from_rendition(renditions.thumbnail))
+                thumbnail_url = await self.cached_upload_to_cdn(downloads[-1], renditions.thumbnail.extension, thumbnail_key)
+            else:
+                thumbnail_url = await self.cdn_url_by_source(thumbnail_key)
+
+            file = self.upload_image_to_discord(attachment, f'{name}.{attachment_extension}', guild)
+
+            # The attached file owns its buffer now
+            downloads.remove(attachment)
         except (NoExtensionFound, FilesizeLimitException):
             pass
+        finally:
+            for leftover in downloads:
+                leftover.close()
 
-        return (upload_url, file)
-
-    def upload_image(self, name: str, image: Image.Image) -> discord.File:
-        data: io.BytesIO = io.BytesIO()
-        image.save(data, format='png')
-        data.seek(0)
+        return Reupload(upload_url, file, thumbnail_url)
 
-        return discord.File(data, f'{name}.png')
+    def upload_image(self, name: str, png_data: bytes) -> discord.File:
+        return discord.File(io.BytesIO(png_data), f'{name}.png')
 
 
 setup = FileUtils.setup
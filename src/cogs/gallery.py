@@ -0,0 +1,213 @@
+import asyncio
+import datetime
+import logging
+
+import discord
+
+from .. import Artemis, ArtemisCog, config
+from ..metrics import STAGE_DURATION
+from ..plaques import render_plaque
+from .event_data import EventData, FullSubmission, GalleryPost
+from .file_utils import FileUtils, Reupload, close_file, thumbnail_source
+from .members import Members
+from .prompts import Prompts
+from .statistics import Statistics
+
+
+log = logging.getLogger(__name__)
+
+# Gallery posts loaded at once, their artwork and plaques are prepared concurrently but posted one after another
+BATCH_SIZE: int = 5
+
+# Seconds before a failed post is attempted again, doubling with every failed attempt
+RETRY_BASE_DELAY: float = 5
+RETRY_MAX_DELAY: float = 600
+
+# How many gallery messages after an interrupted attempt are searched for the post it might have made
+INTERRUPTED_POST_SEARCH_LIMIT: int = 100
+
+
+class Gallery(ArtemisCog):
+    """Posts approved submissions to the gallery from the outbox they are queued in when approved."""
+
+    def __init__(self, bot: Artemis) -> None:
+        super().__init__(bot)
+
+        self.wakeup: asyncio.Event = asyncio.Event()
+        self.task: asyncio.Task = asyncio.create_task(self.publish_loop())
+
+    def cog_unload(self) -> None:
+        self.task.cancel()
+
+    def wake(self) -> None:
+        """Lets the publisher know that new posts were queued."""
+
+        self.wakeup.set()
+
+    async def publish_loop(self) -> None:
+        await self.bot.wait_until_ready()
+
+        event_data: EventData = self.bot.get_cog(EventData)
+
+        while True:
+            self.wakeup.clear()
+
+            try:
+                posts: list[GalleryPost] = await event_data.due_gallery_posts(BATCH_SIZE)
+
+                if not posts:
+                    timeout: float | None = await event_data.seconds_until_gallery_post()
+
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+
+                    continue
+
+                await self.publish_batch(posts)
+            except Exception:
+                log.exception('Failed to publish gallery posts.')
+                await asyncio.sleep(RETRY_BASE_DELAY)
+
+    async def publish_batch(self, posts: list[GalleryPost]) -> None:
+        prepared: list[tuple[Reupload, list[discord.File]] | None | BaseException] = await asyncio.gather(
+            *map(self.prepare, posts), return_exceptions=True
+        )
+
+        try:
+            for post, message in zip(posts, prepared):
+                if isinstance(message, BaseException):
+                    log.error(f'Failed to prepare the gallery post of submission {post["id"]}.', exc_info=message)
+                    continue
+
+                if message is None:
+                    continue
+
+                # A failing post is retried on its own, without holding up the rest of the batch
+                try:
+                    await self.publish(post, *message)
+                except Exception:
+                    log.exception(f'Failed to publish submission {post["id"]} to the gallery.')
+                    await self.retry(post, may_have_posted=True)
+        finally:
+            # Also closes the files of posts which weren't reached because the batch was cancelled or the database failed
+            for message in prepared:
+                if isinstance(message, tuple):
+                    for file in message[1]:
+                        close_file(file)
+
+    def plaque_filename(self, submission: FullSubmission) -> str:
+        # Carries the submission ID, so posts of interrupted attempts can be recognised
+        return f'plaque-{submission["id"]}'
+
+    async def prepare(self, post: GalleryPost) -> tuple[Reupload, list[discord.File]] | None:
+        """Returns the reuploaded artwork and the files of the gallery message, or None if the submission won't be posted."""
+
+        event_data: EventData = self.bot.get_cog(EventData)
+
+        try:
+            if post['attempt_started_at'] is not None and await self.recover_interrupted_post(post):
+                return None
+
+            member: discord.Member | None = await self.bot.get_cog(Members).resolve(post['user_id'])
+            if member is None:
+                log.info(f'Not posting submission {post["id"]} to the gallery, its author left.')
+                await event_data.delete_gallery_post(post['id'])
+                return None
+
+            await event_data.start_gallery_attempt(post['id'])
+
+            file_utils: FileUtils = self.bot.get_cog(FileUtils)
+
+            # The artwork reupload and plaque rendering don't depend on each other, so they run concurrently.
+            # Both finish even if the other fails, so the artwork's temporary file can't be left open.
+            artwork, plaque_data = await asyncio.gather(
+                file_utils.attempt_double_reupload(f'artwork-{post["id"]}', post['image_url'], self.bot.event_guild),
+                render_plaque([f'@{member.name}', self.bot.get_cog(Prompts).prompt_text(post['prompt_id'])], bold_lines=[0]),
+                return_exceptions=True,
+            )
+
+            failure: BaseException | None = next((result for result in (artwork, plaque_data) if isinstance(result, BaseException)), None)
+
+            if failure is not None:
+                if isinstance(artwork, Reupload) and artwork.file is not discord.utils.MISSING:
+                    close_file(artwork.file)
+
+                raise failure
+        except Exception:
+            log.exception(f'Failed to prepare the gallery post of submission {post["id"]}.')
+            await self.retry(post)
+            return None
+
+        files: list[discord.File] = [file_utils.upload_image(self.plaque_filename(post), plaque_data)]
+        if artwork.file is not discord.utils.MISSING:
+            files.append(artwork.file)
+
+        return artwork, files
+
+    @STAGE_DURATION.time(stage='gallery_publish')
+    async def publish(self, post: GalleryPost, artwork: Reupload, files: list[discord.File]) -> None:
+        """Posts a prepared submission to the gallery, the caller closes its files."""
+
+        try:
+            with STAGE_DURATION.time(stage='gallery_send'):
+                # Rate limits are handled by discord.py, posting one message at a time keeps the gallery in approval order
+                message: discord.Message = await self.bot.gallery_channel.send(artwork.url if len(files) == 1 else '', files=files)
+        except discord.HTTPException:
+            log.exception(f'Failed to post submission {post["id"]} to the gallery.')
+            await self.retry(post)
+            return
+
+        await self.finish(post, artwork.url, artwork.thumbnail_url, message)
+
+    async def finish(self, post: GalleryPost, artwork_url: str, thumbnail_url: str | None, message: discord.Message) -> None:
+        approved_submissions: int = await self.bot.get_cog(EventData).record_gallery_post(post, artwork_url, thumbnail_url, [message.id])
+        self.bot.get_cog(Statistics).mark_dirty(post['user_id'])
+
+        if approved_submissions < config.settings.event_role_requirement:
+            return
+
+        # The post is recorded already, so failing to hand out the role must not fail the post
+        try:
+            member: discord.Member | None = await self.bot.get_cog(Members).resolve(post['user_id'])
+
+            if member is not None:
+                await member.add_roles(discord.Object(config.settings.event_role_id), reason='Event participation')
+        except discord.HTTPException:
+            log.exception(f'Failed to give the event role to user {post["user_id"]}.')
+
+    async def retry(self, post: GalleryPost, *, may_have_posted: bool = False) -> None:
+        await self.bot.get_cog(EventData).retry_gallery_post(post['id'], RETRY_BASE_DELAY, RETRY_MAX_DELAY, may_have_posted)
+
+    async def recover_interrupted_post(self, post: GalleryPost) -> bool:
+        """
+        Looks for the gallery message of an attempt which never finished, for example because the bot restarted while posting.
+
+        Returns
+        -------
+        bool
+            Whether the message was found and recorded, in which case the submission must not be posted again.
+        """
+
+        assert post['attempt_started_at'] is not None
+
+        started: datetime.datetime = post['attempt_started_at'] - datetime.timedelta(seconds=RETRY_BASE_DELAY)
+        filename: str = f'{self.plaque_filename(post)}.png'
+
+        async for message in self.bot.gallery_channel.history(after=started, limit=INTERRUPTED_POST_SEARCH_LIMIT, oldest_first=True):
+            if message.author == self.bot.user and any(attachment.filename == filename for attachment in message.attachments):
+                log.info(f'Found the gallery post of submission {post["id"]} from an interrupted attempt.')
+
+                file_utils: FileUtils = self.bot.get_cog(FileUtils)
+
+                artwork_url: str = await file_utils.cdn_url_by_source(post['image_url']) or post['image_url']
+                thumbnail_url: str | None = await file_utils.cdn_url_by_source(thumbnail_source(post['image_url']))
+                await self.finish(post, artwork_url, thumbnail_url, message)
+
+                return True
+
+        return False
+
+
+setup = Gallery.setup
@@ -2,10 +2,67 @@ import discord
 from discord import app_commands
 
 from .. import ArtemisCog, config
-from .event_data import EventData, FullSubmission, SubmissionStatus
+from ..timeline import TimelineSnapshot
+from .event_data import CardSummary, EventData, LeaderboardEntry, SubmissionCounts
 from .file_utils import FileUtils
 
 
+LEADERBOARD_PAGE_SIZE: int = 10
+
+# How long the leaderboard's buttons keep working, has to stay below the 15 minutes an interaction can be edited for
+LEADERBOARD_TIMEOUT: float = 300
+
+
+class LeaderboardView(discord.ui.View):
+    def __init__(self, event_data: EventData, interaction: discord.Interaction, pages: int) -> None:
+        super().__init__(timeout=LEADERBOARD_TIMEOUT)
+
+        self.event_data: EventData = event_data
+        self.interaction: discord.Interaction = interaction
+
+        self.page: int = 0
+        self.pages: int = pages
+
+        self.update_buttons()
+
+    def update_buttons(self) -> None:
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page >= self.pages - 1
+
+    async def embed(self) -> discord.Embed:
+        entries: list[LeaderboardEntry] = await self.event_data.leaderboard(LEADERBOARD_PAGE_SIZE, self.page * LEADERBOARD_PAGE_SIZE)
+
+        embed: discord.Embed = discord.Embed(
+            title=f'{config.settings.event_name} leaderboard',
+            description='\n'.join(f'**#{entry["rank"]}** <@{entry["user_id"]}>: {entry["approved"]}' for entry in entries)
+            or 'Nobody has an approved submission yet.',
+            color=config.settings.embed_color,
+        )
+        embed.set_footer(text=f'Page {self.page + 1}/{max(self.pages, 1)}')
+
+        return embed
+
+    async def show_page(self, interaction: discord.Interaction, page: int) -> None:
+        self.page = page
+        self.update_buttons()
+
+        await interaction.response.edit_message(embed=await self.embed(), view=self)
+
+    @discord.ui.button(label='Previous', style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.show_page(interaction, self.page - 1)
+
+    @discord.ui.button(label='Next', style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await self.show_page(interaction, self.page + 1)
+
+    async def on_timeout(self) -> None:
+        try:
+            await self.interaction.edit_original_response(view=None)
+        except discord.HTTPException:
+            pass
+
+
 class Information(ArtemisCog):
     @app_commands.command()
     async def card(self, interaction: discord.Interaction, user: discord.User | discord.Member | None = None) -> None:
@@ -17,26 +74,70 @@ class Information(ArtemisCog):
         prompts: Prompts = self.bot.get_cog(Prompts)
         event_data: EventData = self.bot.get_cog(EventData)
 
-        approved: int = len(await event_data.submissions_with_status(SubmissionStatus.APPROVED, user.id))
-        current_submission: FullSubmission | None = await event_data.submission_by_prompt(user.id, prompts.current_prompt_id)
+        summary: CardSummary = await event_data.card_summary(user.id, prompts.current_prompt_id)
 
         card: discord.Embed = discord.Embed(
-            title=f"{user.name}'s {config.event_name} stats",
-            description=f"{approved}/{len(config.prompts)}",
-            color=config.embed_color,
+            title=f"{user.name}'s {config.settings.event_name} stats",
+            description=f"{summary['approved']}/{len(config.settings.prompts)}",
+            color=config.settings.embed_color,
         )
 
-        avatar_url: str = user.display_avatar.with_static_format('png').url
+        avatar: discord.Asset = user.display_avatar.with_static_format('png')
 
-        file: discord.File
-        avatar_url, file = await self.bot.get_cog(FileUtils).attempt_double_reupload('avatar', avatar_url, interaction.guild)
+        # Avatar keys change whenever the avatar does, so they can be used to skip reuploading avatars which were uploaded before
+        avatar_url: str = await self.bot.get_cog(FileUtils).reupload_to_cdn(avatar.url, source=f'avatar:{avatar.key}')
 
         card.set_thumbnail(url=avatar_url)
 
-        latest_status: str = current_submission['status'] if current_submission is not None else 'unsubmitted'
+        latest_status: str = summary['current_status'] or 'unsubmitted'
         card.add_field(name='Current prompt progress', value=latest_status)
 
-        await interaction.response.send_message(embed=card, ephemeral=user != interaction.user, file=file)
+        await interaction.response.send_message(embed=card, ephemeral=user != interaction.user)
+
+    @app_commands.command()
+    async def leaderboard(self, interaction: discord.Interaction) -> None:
+        """Lists the participants with the most approved submissions."""
+
+        event_data: EventData = self.bot.get_cog(EventData)
+
+        pages: int = -(-await event_data.leaderboard_size() // LEADERBOARD_PAGE_SIZE)
+        view: LeaderboardView = LeaderboardView(event_data, interaction, pages)
+
+        await interaction.response.send_message(embed=await view.embed(), view=view, ephemeral=True)
+
+    @app_commands.command(name='prompt-stats')
+    @app_commands.describe(prompt='The number of the prompt, defaults to the newest one')
+    async def prompt_stats(self, interaction: discord.Interaction, prompt: app_commands.Range[int, 1] | None = None) -> None:
+        """Shows how many submissions a prompt received."""
+
+        from .prompts import Prompts
+
+        prompts: Prompts = self.bot.get_cog(Prompts)
+        snapshot: TimelineSnapshot = prompts.snapshot()
+
+        if snapshot.before_event:
+            await interaction.response.send_message(f'The event starts on {config.settings.start_day}.', ephemeral=True)
+            return
+
+        prompt_id: int = snapshot.current_prompt_id if prompt is None else prompt - 1
+
+        # Prompts which weren't revealed yet must not be leaked
+        if not 0 <= prompt_id <= snapshot.current_prompt_id:
+            await interaction.response.send_message(f'Prompt #{prompt} was not revealed yet.', ephemeral=True)
+            return
+
+        counts: SubmissionCounts = await self.bot.get_cog(EventData).prompt_counts(prompt_id)
+
+        embed: discord.Embed = discord.Embed(
+            title=f'Submissions for {prompts.prompt_text(prompt_id)}',
+            description=f'{sum(counts.values())} in total',
+            color=config.settings.embed_color,
+        )
+
+        for status, count in counts.items():
+            embed.add_field(name=status.capitalize(), value=str(count))
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
 setup = Information.setup
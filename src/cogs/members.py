@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import time
+
+import discord
+from discord.ext import commands
+
+from .. import Artemis, ArtemisCog
+from ..cache import LRUCache
+
+
+log = logging.getLogger(__name__)
+
+# Members fetched on demand which are kept around, only used when the guild isn't chunked
+MEMBER_CACHE_SIZE: int = 2048
+# Seconds after which a fetched member is fetched again, member updates aren't delivered for members outside the guild's cache
+MEMBER_CACHE_TTL: int = 900
+
+
+class Members(ArtemisCog):
+    """Resolves members of the event guild without requiring the whole guild to be chunked."""
+
+    cache: LRUCache[int, tuple[float, discord.Member]]
+    pending: dict[int, asyncio.Task[discord.Member | None]]
+
+    def __init__(self, bot: Artemis) -> None:
+        super().__init__(bot)
+
+        self.cache = LRUCache(MEMBER_CACHE_SIZE)
+        self.pending = {}
+
+    async def resolve(self, user_id: int) -> discord.Member | None:
+        """
+        Returns the event guild member with the given ID, or None if they aren't a member.
+
+        Looks in the guild's member cache first, then in the LRU cache of recently fetched members, and finally fetches the member.
+        Concurrent lookups of the same member share a single request.
+
+        Raises
+        ------
+        discord.HTTPException
+            The member couldn't be fetched, which says nothing about whether they are still a member.
+        """
+
+        member: discord.Member | None = self.bot.event_guild.get_member(user_id)
+        if member is not None:
+            return member
+
+        cached: tuple[float, discord.Member] | None = self.cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[0] < MEMBER_CACHE_TTL:
+            return cached[1]
+
+        task: asyncio.Task[discord.Member | None] | None = self.pending.get(user_id)
+
+        if task is None:
+            task = self.pending[user_id] = asyncio.create_task(self._fetch(user_id))
+            task.add_done_callback(lambda _: self.pending.pop(user_id, None))
+
+        return await asyncio.shield(task)
+
+    async def _fetch(self, user_id: int) -> discord.Member | None:
+        try:
+            member: discord.Member = await self.bot.event_guild.fetch_member(user_id)
+        except discord.NotFound:
+            return None
+
+        self.cache[user_id] = (time.monotonic(), member)
+        return member
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent) -> None:
+        self.cache.pop(payload.user.id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        self.cache.pop(after.id)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User) -> None:
+        self.cache.pop(after.id)
+
+
+setup = Members.setup
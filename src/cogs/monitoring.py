@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+
+from aiohttp import web
+from discord.ext import commands
+
+from .. import ArtemisCog, config
+from ..http_client import EndpointStats
+from ..metrics import EVENT_LOOP_LAG, HTTP_CIRCUIT, HTTP_REQUESTS, POOL_CONNECTIONS, LabelValues, render
+
+
+log = logging.getLogger(__name__)
+
+# How often the event loop lag is sampled, in seconds
+LAG_SAMPLE_INTERVAL: float = 1
+
+CIRCUIT_STATES: tuple[str, ...] = ('closed', 'open', 'half_open')
+
+
+def describe_endpoint(name: str, stats: EndpointStats) -> str:
+    def milliseconds(seconds: float | None) -> str:
+        return f'{seconds * 1000:.0f}ms' if seconds is not None else '-'
+
+    return (
+        f'`{name}`: {stats["in_flight"]}/{stats["concurrency"]} in flight, {stats["waiting"]} waiting, '
+        f'circuit {stats["circuit"]} ({stats["consecutive_failures"]} failures), '
+        f'p50 {milliseconds(stats["latency_p50"])}, p95 {milliseconds(stats["latency_p95"])}'
+    )
+
+
+class Monitoring(ArtemisCog):
+    runner: web.AppRunner | None = None
+
+    async def cog_load(self) -> None:
+        POOL_CONNECTIONS.set_callback(self.pool_connections)
+        HTTP_REQUESTS.set_callback(self.http_requests)
+        HTTP_CIRCUIT.set_callback(self.http_circuits)
+        self.lag_task: asyncio.Task = asyncio.create_task(self.measure_event_loop_lag())
+
+        if config.settings.metrics_port is None:
+            return
+
+        app: web.Application = web.Application()
+        app.router.add_get('/metrics', self.metrics)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, config.settings.metrics_host, config.settings.metrics_port).start()
+
+        log.info(f'Serving metrics on {config.settings.metrics_host}:{config.settings.metrics_port}.')
+
+    async def cog_unload(self) -> None:
+        POOL_CONNECTIONS.set_callback(None)
+        HTTP_REQUESTS.set_callback(None)
+        HTTP_CIRCUIT.set_callback(None)
+        self.lag_task.cancel()
+
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def pool_connections(self) -> dict[LabelValues, float]:
+        size: int = self.bot.pool.get_size()
+        idle: int = self.bot.pool.get_idle_size()
+
+        return {
+            ('total',): size,
+            ('idle',): idle,
+            ('in_use',): size - idle,
+            ('max',): self.bot.pool.get_max_size(),
+        }
+
+    def http_requests(self) -> dict[LabelValues, float]:
+        values: dict[LabelValues, float] = {}
+
+        for name, stats in self.bot.http_client.stats().items():
+            values[(name, 'in_flight')] = stats['in_flight']
+            values[(name, 'waiting')] = stats['waiting']
+
+        return values
+
+    def http_circuits(self) -> dict[LabelValues, float]:
+        return {
+            (name, state): stats['circuit'] == state
+            for name, stats in self.bot.http_client.stats().items()
+            if stats['circuit'] != 'none'
+            for state in CIRCUIT_STATES
+        }
+
+    async def measure_event_loop_lag(self) -> None:
+        # Anything blocking the loop delays waking up from the sleep, so the overshoot is how long callbacks had to wait
+        while True:
+            expected: float = time.perf_counter() + LAG_SAMPLE_INTERVAL
+            await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+
+            EVENT_LOOP_LAG.observe(max(time.perf_counter() - expected, 0))
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=render().encode(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    @commands.command(name='http-stats')
+    @commands.is_owner()
+    async def http_stats(self, ctx: commands.Context) -> None:
+        await ctx.send('\n'.join(describe_endpoint(name, stats) for name, stats in self.bot.http_client.stats().items()))
+
+
+setup = Monitoring.setup
@@ -1,14 +1,14 @@
-import datetime
-import math
-import time
+from discord.ext import commands
 
-from .. import ArtemisCog, config
+from .. import Artemis, ArtemisCog, config
+from ..timeline import Timeline, TimelineSnapshot
 
 
-info_message_format: str = f"""
-Welcome to {config.event_name} {config.start_day.year}!
+def info_message_format() -> str:
+    return f"""
+Welcome to {config.settings.event_name} {config.settings.start_day.year}!
 
-In this event, a pair of prompts are revealed every {config.days_per_prompt} days, \
+In this event, a pair of prompts are revealed every {config.settings.days_per_prompt} days, \
 and you may either pick one of them or mix them together to inspire your artwork. \
 Once created, you can submit it here in order to get it displayed in the gallery channel! \
 Each submission counts as one ticket for a raffle that will be done later.
@@ -16,71 +16,88 @@ Each submission counts as one ticket for a raffle that will be done later.
 
 
 class Prompts(ArtemisCog):
+    timeline: Timeline
+
+    def __init__(self, bot: Artemis) -> None:
+        super().__init__(bot)
+
+        self.timeline = Timeline.from_config()
+
+    @commands.Cog.listener()
+    async def on_config_reload(self, old: config.Config, new: config.Config) -> None:
+        self.timeline = Timeline.from_config()
+
+    def snapshot(self) -> TimelineSnapshot:
+        """Returns the state of the event right now, use a single snapshot when reading several values so they can't disagree."""
+
+        return self.timeline.snapshot()
+
     @property
     def current_day(self) -> int:
-        return (datetime.datetime.now().date() - config.start_day).days
+        return self.snapshot().current_day
 
     @property
     def final_prompt_id(self) -> int:
-        return len(config.prompts) - 1
+        return len(config.settings.prompts) - 1
 
     @property
     def has_new_prompt(self) -> bool:
-        return self.current_day // config.days_per_prompt <= self.final_prompt_id
+        return self.snapshot().has_new_prompt
 
     @property
     def current_prompt_id(self) -> int:
-        return min(self.current_day // config.days_per_prompt, self.final_prompt_id)
+        return self.snapshot().current_prompt_id
 
     @property
     def current_prompt_timestamp(self) -> int:
-        end_timestamp: int = math.floor(time.mktime(config.end_day.timetuple()))
-        prompt_timestamp: int = math.floor(time.mktime(config.start_day.timetuple())) + (
-            (86400 * config.days_per_prompt) * (self.current_prompt_id + 1)
-        )
-        return min(prompt_timestamp, end_timestamp)
+        return self.snapshot().next_prompt_timestamp
 
     @property
     def before_event(self) -> bool:
-        return datetime.datetime.now().date() < config.start_day
+        return self.snapshot().before_event
 
     @property
     def during_event(self) -> bool:
-        return config.start_day <= datetime.datetime.now().date() <= config.end_day
+        return self.snapshot().during_event
 
     @property
     def after_event(self) -> bool:
-        return config.end_day < datetime.datetime.now().date()
+        return self.snapshot().after_event
 
     def prompt_text(self, prompt_id: int):
-        return f'"{config.prompts[prompt_id]}" (#{prompt_id + 1})'
+        return f'"{config.settings.prompts[prompt_id]}" (#{prompt_id + 1})'
 
-    def get_topic(self) -> str:
+    def get_topic(self, snapshot: TimelineSnapshot | None = None) -> str:
+        snapshot = snapshot or self.snapshot()
         prompt_message: str
 
-        if self.before_event:
-            prompt_message = f'Event starts on {config.start_day}.'
-        elif self.during_event:
+        if snapshot.before_event:
+            prompt_message = f'Event starts on {config.settings.start_day}.'
+        elif snapshot.during_event:
             prompt_message = (
-                f'Newest Prompt: {self.prompt_text(self.current_prompt_id)}.\n'
-                f'The next prompt reveal is at <t:{self.current_prompt_timestamp}>'
+                f'Newest Prompt: {self.prompt_text(snapshot.current_prompt_id)}.\n'
+                f'The next prompt reveal is at <t:{snapshot.next_prompt_timestamp}>'
             )
         else:
             prompt_message = 'The event has ended. Thanks for participating!'
 
         return f'{prompt_message}\nCheck pins for more info.'
 
-    def get_info_message(self) -> str:
-        past_prompts: str = "\n".join(f'{i+1}. {config.prompts[i]}' for i in range(self.current_prompt_id) if i < len(config.prompts))
+    def get_info_message(self, snapshot: TimelineSnapshot | None = None) -> str:
+        snapshot = snapshot or self.snapshot()
+
+        past_prompts: str = "\n".join(
+            f'{i+1}. {config.settings.prompts[i]}' for i in range(snapshot.current_prompt_id) if i < len(config.settings.prompts)
+        )
 
-        info_message: str = info_message_format
+        info_message: str = info_message_format()
 
-        if self.before_event:
-            info_message += f'The event starts on {config.start_day}! Come back then!'
-        elif self.current_prompt_id <= self.final_prompt_id:
+        if snapshot.before_event:
+            info_message += f'The event starts on {config.settings.start_day}! Come back then!'
+        elif snapshot.current_prompt_id <= self.final_prompt_id:
             info_message += (
-                f'The newest prompt is {self.prompt_text(self.current_prompt_id)}!\n'
-                f'The next prompt reveal is at <t:{self.current_prompt_timestamp}>'
+                f'The newest prompt is {self.prompt_text(snapshot.current_prompt_id)}!\n'
+                f'The next prompt reveal is at <t:{snapshot.next_prompt_timestamp}>'
             )
         else:
             info_message += f'All prompts have been revealed!'
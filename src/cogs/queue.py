@@ -4,21 +4,49 @@ import asyncio
 import functools
 import logging
 import re
-from typing import Any, Callable, Coroutine
+import time
+from typing import Any, Callable, Coroutine, cast
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 from discord.ui.item import ItemCallbackType
 
 from .. import Artemis, ArtemisCog, config
-from ..plaques import create_plaque
+from ..cache import LRUCache
+from ..locks import KeyedLock
+from ..metrics import LOCK_WAIT, STAGE_DURATION
 from .event_data import EventData, FullSubmission, SubmissionStatus
-from .file_utils import FileUtils
+from .file_utils import FileUtils, ImageFingerprint
+from .gallery import Gallery
+from .members import Members
 from .prompts import Prompts
 
 
 log = logging.getLogger(__name__)
 
+# Submissions whose perceptual hashes differ in at most this many of their 64 bits are flagged as possible duplicates
+NEAR_DUPLICATE_DISTANCE: int = 8
+
+# Only this many of the newest submissions are compared against, so checking a submission takes the same time all event long
+NEAR_DUPLICATE_WINDOW: int = 20_000
+
+# How many submissions bulk moderation processes at once, and how often (in seconds) it reports its progress
+BULK_CONCURRENCY: int = 4
+BULK_PROGRESS_INTERVAL: float = 3
+
+# Edits of the same message within this many seconds are processed together
+EDIT_DEBOUNCE_DELAY: float = 3
+
+# Number of submission messages whose URLs are remembered, so edits only process newly added URLs
+SEEN_MESSAGES_CACHE_SIZE: int = 4096
+
+BULK_PARAMETER_DESCRIPTIONS: dict[str, str] = {
+    'prompt': 'Only submissions for this prompt number',
+    'user': 'Only submissions by this user',
+    'before': 'Only submissions posted before this message (ID or link)',
+}
+
 
 def autoload_queue_submission(
     button_callback: Callable[[QueueInterface, FullSubmission, discord.Message], Coroutine]
@@ -48,20 +76,21 @@ class QueueInterface(discord.ui.View):
     @discord.ui.button(label='Approve', custom_id='approve', style=discord.ButtonStyle.green)
     @autoload_queue_submission
     async def approve(self, submission: FullSubmission, queue_message: discord.Message) -> None:
-        await self.cog.approve_submission(submission)
-        await queue_message.delete()
+        # Only the click which actually approved the submission removes the queue message, further clicks are ignored
+        if await self.cog.approve_submission(submission):
+            await queue_message.delete()
 
     @discord.ui.button(label='Reject', custom_id='reject', style=discord.ButtonStyle.red)
     @autoload_queue_submission
     async def reject(self, submission: FullSubmission, queue_message: discord.Message) -> None:
-        await self.cog.reject_submission(submission)
-        await queue_message.delete()
+        if await self.cog.reject_submission(submission):
+            await queue_message.delete()
 
     @discord.ui.button(label='Dismiss', custom_id='dismiss', style=discord.ButtonStyle.gray)
     @autoload_queue_submission
     async def dismiss(self, submission: FullSubmission, queue_message: discord.Message) -> None:
-        await self.cog.dismiss_submission(submission)
-        await queue_message.delete()
+        if await self.cog.dismiss_submission(submission):
+            await queue_message.delete()
 
     @discord.ui.button(label='Previous Prompt', custom_id='previous', style=discord.ButtonStyle.primary, row=1)
     @autoload_queue_submission
@@ -76,7 +105,11 @@ class QueueInterface(discord.ui.View):
 
 class Queue(ArtemisCog):
     view: QueueInterface
-    lock: asyncio.Lock
+    locks: KeyedLock[str]
+
+    seen_urls: LRUCache[int, frozenset[str]]
+    pending_edits: dict[int, discord.RawMessageUpdateEvent]
+    edit_tasks: dict[int, asyncio.Task]
 
     def __init__(self, bot: Artemis) -> None:
         super().__init__(bot)
@@ -84,7 +117,18 @@ class Queue(ArtemisCog):
         view = QueueInterface(self)
         bot.add_view(view)
 
-        self.lock = asyncio.Lock()
+        self.locks = KeyedLock()
+
+        self.seen_urls = LRUCache(SEEN_MESSAGES_CACHE_SIZE)
+        self.pending_edits = {}
+        self.edit_tasks = {}
+
+        # Live submission messages which are still being processed
+        self.processing_messages: set[int] = set()
+
+    def cog_unload(self) -> None:
+        for task in self.edit_tasks.values():
+            task.cancel()
 
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
@@ -93,115 +137,240 @@ class Queue(ArtemisCog):
 
     @commands.Cog.listener()
     async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
-        if payload.channel_id != config.submission_channel_id:
+        if payload.channel_id != config.settings.submission_channel_id:
             return
 
-        edited_message: discord.Message = await self.bot.submission_channel.fetch_message(payload.message_id)
+        # Rapid successive edits only keep their latest version, which gets processed once the debounce delay has passed
+        self.pending_edits[payload.message_id] = payload
 
-        await self._process_message(edited_message)
+        if payload.message_id not in self.edit_tasks:
+            task: asyncio.Task = asyncio.create_task(self._debounce_edit(payload.message_id))
+            self.edit_tasks[payload.message_id] = task
+            task.add_done_callback(lambda task: self._log_edit_failure(payload.message_id, task))
 
-    async def _process_message(self, message: discord.Message) -> None:
-        if message.author.bot:
+    async def _debounce_edit(self, message_id: int) -> None:
+        try:
+            await asyncio.sleep(EDIT_DEBOUNCE_DELAY)
+        finally:
+            del self.edit_tasks[message_id]
+
+        await self._process_edit(self.pending_edits.pop(message_id))
+
+    @staticmethod
+    def _log_edit_failure(message_id: int, task: asyncio.Task) -> None:
+        # Nothing awaits the debounce tasks, so their failures would otherwise only surface once they're garbage collected
+        if not task.cancelled() and task.exception() is not None:
+            log.error(f'Failed to process the edit of submission message {message_id}.', exc_info=task.exception())
+
+    async def _process_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        data: dict[str, Any] = cast(dict[str, Any], payload.data)
+
+        # Updates without content only carry things like resolved embeds, which can't add new submissions
+        if 'content' not in data or data.get('author', {}).get('bot', False):
             return
 
-        urls: list[str] = re.findall(r'(https?://\S+)', message.content)
-        attachment_urls: list[str] = [a.url for a in message.attachments]
+        urls: list[str] = self.extract_urls(data['content'], [attachment['url'] for attachment in data.get('attachments', [])])
+
+        seen: frozenset[str] | None = self.seen_urls.get(payload.message_id)
+        if seen is None and payload.cached_message is not None:
+            seen = frozenset(self.submission_urls(payload.cached_message))
+
+        new_urls: list[str] = [url for url in urls if seen is None or url not in seen]
+        if seen is None and new_urls:
+            existing: set[str] = await self.bot.get_cog(EventData).existing_image_urls(new_urls)
+            new_urls = [url for url in new_urls if url not in existing]
+
+        self.seen_urls[payload.message_id] = frozenset(urls)
+
+        if not new_urls:
+            return
+
+        author: discord.User | discord.Member | None = None
+        if payload.cached_message is not None:
+            author = payload.cached_message.author
+        elif 'author' in data:
+            author = self.bot.get_user(int(data['author']['id']))
+
+        if author is None:
+            author = (await self.bot.submission_channel.fetch_message(payload.message_id)).author
+
+        for url in new_urls:
+            await self.process_submission(author, payload.message_id, url)
+
+    def extract_urls(self, content: str, attachment_urls: list[str]) -> list[str]:
+        urls: list[str] = re.findall(r'(https?://\S+)', content)
+
+        return urls + attachment_urls
+
+    def submission_urls(self, message: discord.Message) -> list[str]:
+        if message.author.bot:
+            return []
+
+        return self.extract_urls(message.content, [a.url for a in message.attachments])
+
+    async def _process_message(self, message: discord.Message) -> None:
+        urls: list[str] = self.submission_urls(message)
+        self.seen_urls[message.id] = frozenset(urls)
+
+        self.processing_messages.add(message.id)
+
+        try:
+            for url in urls:
+                await self.process_submission(message.author, message.id, url)
+        finally:
+            self.processing_messages.discard(message.id)
+
+        # Backfill moves the channel cursor past stored messages, which mustn't skip earlier ones that are still being processed
+        if all(other > message.id for other in self.processing_messages):
+            self.bot.dispatch('submission_message_stored', message)
+
+    async def process_submission(self, author: discord.User | discord.Member, message_id: int, url: str) -> None:
+        with STAGE_DURATION.time(stage='intake'):
+            if await self.bot.get_cog(EventData).submission_by_image(url) is not None:
+                return
 
-        for url in urls + attachment_urls:
-            async with self.lock:
-                await self._process_submission(message, url)
+            # Downloading and hashing happen before taking the lock, so a large file doesn't hold up other intake of its URL
+            fingerprint: ImageFingerprint | None = await self.bot.get_cog(FileUtils).fingerprint(url)
+
+            waiting_since: float = time.perf_counter()
+
+            # Only submissions of the same URL need to be serialised, the unique constraint on image_url covers anything else
+            async with self.locks(url):
+                LOCK_WAIT.observe(time.perf_counter() - waiting_since)
+
+                await self._process_submission(author, message_id, url, fingerprint)
 
     def queue_text(self, prompt_id: int, image_url: str, user: discord.User | discord.Member) -> str:
         return f'{self.bot.get_cog(Prompts).prompt_text(prompt_id)} submission by **{user}** {user.mention}\n\n{image_url}'
 
-    async def _process_submission(self, message: discord.Message, url: str) -> None:
-        prompts: Prompts = self.bot.get_cog(Prompts)
+    async def _process_submission(
+        self, author: discord.User | discord.Member, message_id: int, url: str, fingerprint: ImageFingerprint | None
+    ) -> None:
+        event_data: EventData = self.bot.get_cog(EventData)
 
-        submission_exists: bool = await self.bot.get_cog(EventData).submission_by_image(url) is not None
+        # Checked again now that the lock is held, the same URL may have been submitted while it was being fingerprinted
+        submission_exists: bool = await event_data.submission_by_image(url) is not None
 
         if submission_exists:
             return
 
-        prompt: discord.Message = await self.bot.queue_channel.send(
-            self.queue_text(prompts.current_prompt_id, url, message.author),
-            view=QueueInterface(self),
+        if fingerprint is None:
+            await self._enqueue_submission(author, message_id, url, None)
+            return
+
+        # The same file can arrive under different URLs, so submissions with identical content are serialised as well
+        async with self.locks(fingerprint['content_hash']):
+            duplicate: FullSubmission | None = await event_data.submission_by_content(fingerprint['content_hash'])
+
+            if duplicate is not None:
+                log.info(f'Skipping {url}, its content was already submitted as submission {duplicate["id"]}.')
+                return
+
+            await self._enqueue_submission(author, message_id, url, fingerprint)
+
+    def similar_submissions_embed(self, submissions: list[FullSubmission]) -> discord.Embed:
+        prompts: Prompts = self.bot.get_cog(Prompts)
+
+        return discord.Embed(
+            title='Possible duplicate',
+            description='\n'.join(
+                f'{prompts.prompt_text(submission["prompt_id"])} by <@{submission["user_id"]}> '
+                f'({submission["status"]}): {submission["image_url"]}'
+                for submission in submissions
+            ),
+            color=config.settings.embed_color,
         )
 
-        async with self.bot.pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO submissions (user_id, image_url, prompt_id, status, message_id, queue_message_id)
-                VALUES ($1, $2, $3, $4, $5, $6)
-                """,
-                message.author.id,
-                url,
-                prompts.current_prompt_id,
-                SubmissionStatus.PENDING.value,
-                message.id,
-                prompt.id,
-            )
+    async def _enqueue_submission(
+        self,
+        author: discord.User | discord.Member,
+        message_id: int,
+        url: str,
+        fingerprint: ImageFingerprint | None,
+    ) -> None:
+        prompts: Prompts = self.bot.get_cog(Prompts)
 
-    async def increment_prompt(self, amount: int, submission: FullSubmission, queue_message: discord.Message):
-        user: discord.User | None = self.bot.get_user(submission['user_id'])
-        if user is None:
-            return
+        # Backfilled and edited messages may be from before the current prompt was revealed
+        prompt_id: int = prompts.timeline.prompt_at(discord.utils.snowflake_time(message_id))
 
-        new_prompt_id: int = (submission['prompt_id'] + amount) % len(config.prompts)
+        similar: list[FullSubmission] = []
+        if fingerprint is not None and fingerprint['perceptual_hash'] is not None:
+            similar = await self.bot.get_cog(EventData).similar_submissions(
+                fingerprint['perceptual_hash'], NEAR_DUPLICATE_DISTANCE, NEAR_DUPLICATE_WINDOW
+            )
 
-        async with self.bot.pool.acquire() as conn:
-            await conn.execute('UPDATE submissions SET prompt_id = $1 WHERE id = $2', new_prompt_id, submission['id'])
+        prompt: discord.Message = await self.bot.queue_channel.send(
+            self.queue_text(prompt_id, url, author),
+            embed=self.similar_submissions_embed(similar) if similar else None,
+            view=QueueInterface(self),
+        )
 
-        await queue_message.edit(content=self.queue_text(new_prompt_id, submission['image_url'], user))
+        submission: FullSubmission | None = await self.bot.get_cog(EventData).insert_submission(
+            author.id,
+            url,
+            prompt_id,
+            message_id,
+            prompt.id,
+            fingerprint and fingerprint['content_hash'],
+            fingerprint and fingerprint['perceptual_hash'],
+        )
 
-    async def approve_submission(self, submission: FullSubmission) -> None:
-        await self._update_submission_status(submission['id'], SubmissionStatus.APPROVED)
+        if submission is None:
+            log.info(f'Submission of {url} raced with an existing one, removing its queue message.')
+            await prompt.delete()
 
-        member: discord.Member | None = self.bot.event_guild.get_member(submission['user_id'])
-        if member is None:
-            return
+    async def submission_author(self, submission: FullSubmission) -> discord.User | discord.Member | None:
+        """Returns the submission's author, as a user if they left or the member couldn't be fetched."""
 
-        prompt_id: int = submission['prompt_id']
+        try:
+            member: discord.Member | None = await self.bot.get_cog(Members).resolve(submission['user_id'])
+        except discord.HTTPException as e:
+            log.warning(f'Failed to fetch the author of submission {submission["id"]}: {e}')
+            member = None
 
-        file_utils = self.bot.get_cog(FileUtils)
+        return member or self.bot.get_user(submission['user_id'])
 
-        artwork_url, artwork = await file_utils.attempt_double_reupload('artwork', submission['image_url'], self.bot.event_guild)
+    async def increment_prompt(self, amount: int, submission: FullSubmission, queue_message: discord.Message):
+        user: discord.User | discord.Member | None = await self.submission_author(submission)
+        if user is None:
+            return
 
-        plaque = create_plaque([f'@{member.name}', self.bot.get_cog(Prompts).prompt_text(prompt_id)], bold_lines=[0])
-        plaque = file_utils.upload_image('plaque', plaque)
+        new_prompt_id: int = (submission['prompt_id'] + amount) % len(config.settings.prompts)
 
-        plaque_message: discord.Message = await self.bot.gallery_channel.send(file=plaque)
-        artwork_message: discord.Message = await self.bot.gallery_channel.send(
-            artwork_url if artwork is discord.utils.MISSING else '', file=artwork
-        )
+        await self.bot.get_cog(EventData).update_prompt(submission['id'], new_prompt_id)
 
-        event_data: EventData = self.bot.get_cog(EventData)
+        await queue_message.edit(content=self.queue_text(new_prompt_id, submission['image_url'], user))
 
-        async with self.bot.pool.acquire() as conn:
-            await conn.execute('UPDATE submissions SET image_url = $1 WHERE id = $2', artwork_url, submission['id'])
+    @STAGE_DURATION.time(stage='approve')
+    async def approve_submission(self, submission: FullSubmission) -> bool:
+        """Approves a submission and queues it for the gallery, returning False if it was already moderated."""
 
-            for gallery_message in (plaque_message, artwork_message):
-                await conn.execute('INSERT INTO gallery (submission_id, message_id) VALUES ($1, $2)', submission['id'], gallery_message.id)
+        if not await self.bot.get_cog(EventData).approve_submission(submission['id']):
+            return False
 
-        approved_submissions: int = len(await event_data.submissions_with_status(SubmissionStatus.APPROVED, member.id))
-        if approved_submissions >= config.event_role_requirement:
-            await member.add_roles(discord.Object(config.event_role_id), reason='Event participation')
+        self.bot.get_cog(Gallery).wake()
+        return True
 
-        await event_data.update_user_statistics(member)
-        await event_data.update_submission_info(member)
+    async def reject_submission(self, submission: FullSubmission) -> bool:
+        """Rejects a submission and notifies its author, returning False if it was already moderated."""
 
-    async def reject_submission(self, submission: FullSubmission) -> None:
-        await self._update_submission_status(submission['id'], SubmissionStatus.DENIED)
+        if not await self._update_submission_status(submission['id'], SubmissionStatus.DENIED):
+            return False
 
-        user = self.bot.get_user(submission['user_id'])
+        await self._notify_rejection(submission)
+        return True
+
+    async def _notify_rejection(self, submission: FullSubmission) -> None:
+        user: discord.User | discord.Member | None = await self.submission_author(submission)
 
         if user is None:
             return
 
-        prompt: str = config.prompts[submission['prompt_id']]
+        prompt: str = config.settings.prompts[submission['prompt_id']]
 
         try:
             await user.send(
-                f'Your {prompt} {config.event_name} submission has been denied by a staff member.\n\n'
+                f'Your {prompt} {config.settings.event_name} submission has been denied by a staff member.\n\n'
                 f'Please review that your submission was made according to our rules, '
                 f'if you\'re confused about the denial feel free to DM Blob Mail.',
                 allowed_mentions=discord.AllowedMentions(users=[user]),
@@ -209,12 +378,155 @@ class Queue(ArtemisCog):
         except discord.HTTPException:
             return
 
-    async def dismiss_submission(self, submission: FullSubmission) -> None:
-        await self._update_submission_status(submission['id'], SubmissionStatus.DISMISSED)
+    async def dismiss_submission(self, submission: FullSubmission) -> bool:
+        """Dismisses a submission without notifying anyone, returning False if it was already moderated."""
+
+        return await self._update_submission_status(submission['id'], SubmissionStatus.DISMISSED)
+
+    async def _update_submission_status(self, submission_id: int, status: SubmissionStatus) -> bool:
+        return await self.bot.get_cog(EventData).update_status(submission_id, status)
+
+    async def _delete_queue_messages(self, submissions: list[FullSubmission]) -> int:
+        """Deletes the queue messages of the given submissions, returning how many of them couldn't be deleted."""
+
+        failed: int = 0
+        messages: list[discord.PartialMessage] = [
+            self.bot.queue_channel.get_partial_message(submission['queue_message_id']) for submission in submissions
+        ]
+
+        for start in range(0, len(messages), 100):
+            chunk: list[discord.PartialMessage] = messages[start : start + 100]
+
+            try:
+                await self.bot.queue_channel.delete_messages(chunk, reason='Bulk moderation')
+            except discord.HTTPException:
+                # Bulk deletion refuses messages older than two weeks
+                for message in chunk:
+                    try:
+                        await message.delete()
+                    except discord.NotFound:
+                        pass
+                    except discord.HTTPException:
+                        log.exception(f'Failed to delete queue message {message.id}.')
+                        failed += 1
+
+        return failed
+
+    async def bulk_moderate(
+        self,
+        interaction: discord.Interaction,
+        status: SubmissionStatus,
+        prompt: int | None,
+        user: discord.User | None,
+        before: str | None,
+    ) -> None:
+        before_message_id: int | None = None
+
+        if before is not None:
+            match = re.search(r'(\d{15,20})/?$', before.strip())
+
+            if match is None:
+                await interaction.response.send_message('`before` has to be a message ID or link.', ephemeral=True)
+                return
+
+            before_message_id = int(match.group(1))
+
+        await interaction.response.send_message(f'Marking pending submissions as {status.value}...')
+        progress: discord.InteractionMessage = await interaction.original_response()
+
+        submissions: list[FullSubmission] = await self.bot.get_cog(EventData).bulk_update_status(
+            status,
+            prompt_id=prompt - 1 if prompt is not None else None,
+            user_id=user.id if user is not None else None,
+            before_message_id=before_message_id,
+        )
 
-    async def _update_submission_status(self, submission_id: int, status: SubmissionStatus) -> None:
-        async with self.bot.pool.acquire() as conn:
-            await conn.execute('UPDATE submissions SET status = $2 WHERE id = $1', submission_id, status.value)
+        total: int = len(submissions)
+        processed: int = 0
+        failed: int = 0
+        last_report: float = time.monotonic()
+
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+        async def process(submission: FullSubmission) -> None:
+            nonlocal processed, failed, last_report
+
+            async with semaphore:
+                try:
+                    if status is SubmissionStatus.DENIED:
+                        await self._notify_rejection(submission)
+                except Exception:
+                    log.exception(f'Failed to process bulk {status.value} of submission {submission["id"]}.')
+                    failed += 1
+
+            processed += 1
+
+            if time.monotonic() - last_report >= BULK_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                await progress.edit(content=f'Marked {total} submissions as {status.value}, processed {processed}/{total}...')
+
+        # Approved submissions were queued for the gallery together with their status change
+        if status is SubmissionStatus.APPROVED:
+            self.bot.get_cog(Gallery).wake()
+
+        await asyncio.gather(*map(process, submissions))
+        undeleted: int = await self._delete_queue_messages(submissions)
+
+        summary: str = f'Marked {total} submissions as {status.value}.'
+        if status is SubmissionStatus.APPROVED:
+            summary += ' They will be posted to the gallery shortly.'
+        if failed:
+            summary += f' {failed} of them failed to process, check the logs.'
+        if undeleted:
+            summary += f' {undeleted} of their queue messages couldn\'t be deleted.'
+
+        await progress.edit(content=summary)
+
+    bulk = app_commands.Group(
+        name='bulk',
+        description='Moderate many pending submissions at once.',
+        guild_only=True,
+        default_permissions=discord.Permissions(manage_messages=True),
+    )
+
+    @bulk.command(name='approve')
+    @app_commands.describe(**BULK_PARAMETER_DESCRIPTIONS)
+    async def bulk_approve(
+        self,
+        interaction: discord.Interaction,
+        prompt: app_commands.Range[int, 1] | None = None,
+        user: discord.User | None = None,
+        before: str | None = None,
+    ) -> None:
+        """Approve pending submissions and post them to the gallery."""
+
+        await self.bulk_moderate(interaction, SubmissionStatus.APPROVED, prompt, user, before)
+
+    @bulk.command(name='reject')
+    @app_commands.describe(**BULK_PARAMETER_DESCRIPTIONS)
+    async def bulk_reject(
+        self,
+        interaction: discord.Interaction,
+        prompt: app_commands.Range[int, 1] | None = None,
+        user: discord.User | None = None,
+        before: str | None = None,
+    ) -> None:
+        """Reject pending submissions and notify their authors."""
+
+        await self.bulk_moderate(interaction, SubmissionStatus.DENIED, prompt, user, before)
+
+    @bulk.command(name='dismiss')
+    @app_commands.describe(**BULK_PARAMETER_DESCRIPTIONS)
+    async def bulk_dismiss(
+        self,
+        interaction: discord.Interaction,
+        prompt: app_commands.Range[int, 1] | None = None,
+        user: discord.User | None = None,
+        before: str | None = None,
+    ) -> None:
+        """Dismiss pending submissions without notifying anyone."""
+
+        await self.bulk_moderate(interaction, SubmissionStatus.DISMISSED, prompt, user, before)
 
 
 setup = Queue.setup
@@ -0,0 +1,110 @@
+import logging
+import secrets
+
+import discord
+from discord import app_commands
+
+from .. import ArtemisCog, config
+from ..raffle import RaffleResult, Winner, draw
+from .event_data import EventData, RaffleDraw
+
+
+log = logging.getLogger(__name__)
+
+# Winners listed in one embed
+MAX_WINNERS: int = 25
+
+
+def describe_winners(winners: list[Winner]) -> str:
+    return '\n'.join(
+        f'**{place}.** <@{winner.user_id}>, submission {winner.submission_id} ({winner.tickets} tickets)'
+        for place, winner in enumerate(winners, start=1)
+    )
+
+
+class Raffle(ArtemisCog):
+    """Draws raffle winners among the authors of approved submissions, where every approved submission is a ticket."""
+
+    raffle = app_commands.Group(
+        name='raffle',
+        description='Draw and check raffle winners.',
+        guild_only=True,
+        default_permissions=discord.Permissions(manage_guild=True),
+    )
+
+    async def run_draw(self, winners: int, seed: str, cap: int | None) -> RaffleResult:
+        return await draw(self.bot.get_cog(EventData).approved_tickets(), winners, seed, cap)
+
+    @raffle.command(name='draw')
+    @app_commands.describe(
+        winners='How many users to draw',
+        cap='The most tickets counted per user, counting their earliest submissions',
+        seed='Makes the draw repeatable, a random one is used by default',
+    )
+    async def raffle_draw(
+        self,
+        interaction: discord.Interaction,
+        winners: app_commands.Range[int, 1, MAX_WINNERS],
+        cap: app_commands.Range[int, 1] | None = None,
+        seed: str | None = None,
+    ) -> None:
+        """Draw winners, each user's chance is proportional to their approved submissions."""
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        seed = seed or secrets.token_hex(16)
+        result: RaffleResult = await self.run_draw(winners, seed, cap)
+
+        draw_id: int = await self.bot.get_cog(EventData).record_raffle_draw(seed, winners, cap, result, interaction.user.id)
+        log.info(f'{interaction.user} drew raffle {draw_id} with seed {seed!r}: {result}')
+
+        embed: discord.Embed = discord.Embed(
+            title=f'{config.settings.event_name} raffle #{draw_id}',
+            description=describe_winners(result.winners) or 'There are no tickets yet.',
+            color=config.settings.embed_color,
+        )
+        embed.add_field(name='Entrants', value=str(result.entrants))
+        embed.add_field(name='Tickets', value=str(result.tickets))
+        embed.add_field(name='Cap', value=str(cap) if cap is not None else 'none')
+        embed.set_footer(text=f'Seed {seed}, tickets {result.digest[:16]}')
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @raffle.command(name='verify')
+    @app_commands.describe(draw_id='The number of the draw')
+    async def raffle_verify(self, interaction: discord.Interaction, draw_id: int) -> None:
+        """Repeat a previous draw and check that it still has the same tickets and winners."""
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        event_data: EventData = self.bot.get_cog(EventData)
+
+        recorded: RaffleDraw | None = await event_data.raffle_draw(draw_id)
+        if recorded is None:
+            await interaction.followup.send(f'There is no raffle draw #{draw_id}.', ephemeral=True)
+            return
+
+        winners: list[Winner] = await event_data.raffle_winners(draw_id)
+        result: RaffleResult = await self.run_draw(recorded['winner_count'], recorded['seed'], recorded['ticket_cap'])
+
+        if result.digest != recorded['tickets_digest']:
+            verdict: str = 'The tickets changed since this draw, so repeating it gives different winners.'
+        elif result.winners != winners:
+            verdict = 'The tickets are unchanged, but repeating the draw gives different winners. The recorded draw was tampered with.'
+        else:
+            verdict = 'Repeating the draw with the same tickets gives the same winners.'
+
+        embed: discord.Embed = discord.Embed(
+            title=f'{config.settings.event_name} raffle #{draw_id}',
+            description=f'{verdict}\n\n{describe_winners(winners) or "There were no tickets."}',
+            color=config.settings.embed_color,
+        )
+        embed.add_field(name='Drawn by', value=f'<@{recorded["drawn_by"]}>')
+        embed.add_field(name='Drawn at', value=discord.utils.format_dt(recorded['drawn_at']))
+        embed.add_field(name='Cap', value=str(recorded['ticket_cap']) if recorded['ticket_cap'] is not None else 'none')
+        embed.set_footer(text=f'Seed {recorded["seed"]}, tickets {recorded["tickets_digest"][:16]}')
+
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+
+setup = Raffle.setup
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from typing import Any
+
+import discord
+
+from .. import Artemis, ArtemisCog, config
+from ..metrics import STAGE_DURATION
+from .event_data import BasicSubmissionInfo, EventData, UserData
+from .members import Members
+
+
+log = logging.getLogger(__name__)
+
+# How long to wait for further approvals before pushing, so a burst of approvals for one user becomes a single push
+PUBLISH_DELAY: float = 10
+
+RETRY_BASE_DELAY: float = 5
+RETRY_MAX_DELAY: float = 600
+
+
+class Statistics(ArtemisCog):
+    dirty: set[int]
+
+    def __init__(self, bot: Artemis) -> None:
+        super().__init__(bot)
+
+        self.dirty = set()
+        self.failures: int = 0
+
+        self.wakeup: asyncio.Event = asyncio.Event()
+        self.task: asyncio.Task = asyncio.create_task(self.publish_loop())
+
+    def cog_unload(self) -> None:
+        self.task.cancel()
+
+    def mark_dirty(self, user_id: int) -> None:
+        if config.settings.statistics_authorization is None:
+            return
+
+        self.dirty.add(user_id)
+        self.wakeup.set()
+
+    async def publish_loop(self) -> None:
+        await self.bot.wait_until_ready()
+
+        while True:
+            await self.wakeup.wait()
+            await asyncio.sleep(PUBLISH_DELAY)
+
+            self.wakeup.clear()
+            user_ids, self.dirty = self.dirty, set()
+
+            try:
+                failed: set[int] = await self.publish(user_ids)
+            except Exception:
+                # Anything escaping would end the loop, and with it every further statistics update
+                log.exception('Failed to publish statistics.')
+                failed = user_ids
+
+            if not failed:
+                self.failures = 0
+                continue
+
+            self.dirty |= failed
+            self.wakeup.set()
+
+            delay: float = min(RETRY_BASE_DELAY * 2**self.failures, RETRY_MAX_DELAY)
+            self.failures += 1
+
+            log.warning(f'Failed to update statistics for {len(failed)} users, retrying in {delay} seconds.')
+            await asyncio.sleep(delay)
+
+    async def publish(self, user_ids: set[int]) -> set[int]:
+        """
+        Pushes the user info and approved submissions of every given user to the statistics endpoint.
+
+        Returns
+        -------
+        set[int]
+            The IDs of the users whose statistics could not be pushed.
+        """
+
+        try:
+            approved_submissions: dict[int, list[BasicSubmissionInfo]] = await self.bot.get_cog(EventData).approved_submissions_for_users(
+                list(user_ids)
+            )
+        except Exception:
+            log.exception('Failed to load approved submissions for statistics.')
+            return user_ids
+
+        try:
+            members: list[discord.Member | None] = await asyncio.gather(*map(self.bot.get_cog(Members).resolve, user_ids))
+        except discord.HTTPException:
+            log.exception('Failed to resolve members for statistics.')
+            return user_ids
+
+        users: dict[int, UserData] = {member.id: self.user_data(member) for member in members if member is not None}
+
+        if config.settings.statistics_bulk_updates:
+            try:
+                if users:
+                    await self.post_statistics(f'{config.settings.statistics_endpoint}/v1/users', {str(id): data for id, data in users.items()})
+
+                await self.post_statistics(
+                    self.submissions_link(),
+                    {str(user_id): approved_submissions.get(user_id, []) for user_id in user_ids},
+                )
+            except Exception:
+                log.exception('Failed to bulk update statistics.')
+                return user_ids
+
+            return set()
+
+        failed: set[int] = set()
+        for user_id in user_ids:
+            try:
+                if user_id in users:
+                    await self.post_statistics(f'{config.settings.statistics_endpoint}/v1/users/{user_id}', users[user_id])
+
+                await self.post_statistics(f'{self.submissions_link()}/{user_id}', approved_submissions.get(user_id, []))
+            except Exception:
+                log.exception(f'Failed to update statistics for user {user_id}.')
+                failed.add(user_id)
+
+        return failed
+
+    def submissions_link(self) -> str:
+        return f'{config.settings.statistics_endpoint}/v1/events/drawfest/{config.settings.start_day.year}/submissions'
+
+    def user_data(self, user: discord.Member) -> UserData:
+        return {
+            "username": user.name,
+            "discriminator": user.discriminator,
+            "avatar": user.avatar and user.avatar.key,  # type: ignore
+        }
+
+    @STAGE_DURATION.time(stage='statistics_post')
+    async def post_statistics(self, link: str, data: Any) -> None:
+        headers: dict = {
+            'Authorization': config.settings.statistics_authorization,
+        }
+
+        async with self.bot.http_client.request('statistics', 'POST', link, headers=headers, json=data) as resp:
+            text: str = await resp.text()
+            log.info(f'Updated statistics: {resp.status} - {text}.')
+
+            resp.raise_for_status()
+
+
+setup = Statistics.setup
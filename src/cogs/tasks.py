@@ -1,54 +1,110 @@
 import asyncio
-import datetime
+import hashlib
+import logging
 
 import discord
 from discord.ext import commands, tasks
 
 from .. import Artemis, ArtemisCog, config
+from ..timeline import TimelineSnapshot
 from .prompts import Prompts
 
 
+log = logging.getLogger(__name__)
+
+# Editing is skipped when nothing changed, so the channel can be refreshed often enough to keep its countdowns accurate
+UPDATE_INTERVAL_MINUTES: float = 5
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
 class Tasks(ArtemisCog):
     def __init__(self, bot: Artemis) -> None:
         super().__init__(bot)
 
+        # Content hash of each managed message as last seen or set, None for messages which weren't sent by the bot
+        self.message_hashes: dict[int, str | None] = {}
+
         self.update_submission_channel.start()
-        self.announce_new_day.start()
-        asyncio.create_task(self.run_first_iteration())
+        self.day_task: asyncio.Task = asyncio.create_task(self.run_days())
+        self.day_task.add_done_callback(self._log_day_task_exit)
 
     def cog_unload(self) -> None:
         self.update_submission_channel.cancel()
+        self.day_task.cancel()
 
-    async def run_first_iteration(self) -> None:
-        await self.bot.wait_until_ready()
+    async def edit_message(self, message_id: int, content: str) -> None:
+        channel: discord.TextChannel = self.bot.submission_channel
+
+        if message_id not in self.message_hashes:
+            message: discord.Message = await channel.fetch_message(message_id)
+            self.message_hashes[message_id] = content_hash(message.content) if message.author == self.bot.user else None
+
+        current_hash: str | None = self.message_hashes[message_id]
+        new_hash: str = content_hash(content)
+
+        if current_hash is None or current_hash == new_hash:
+            return
 
-        await self.update_submission_channel()
+        await channel.get_partial_message(message_id).edit(content=content)
+        self.message_hashes[message_id] = new_hash
 
-    @tasks.loop(time=datetime.time(0, 0, 0, 0))
+    @tasks.loop(minutes=UPDATE_INTERVAL_MINUTES)
     async def update_submission_channel(self) -> None:
         prompts: Prompts = self.bot.get_cog(Prompts)
+        snapshot: TimelineSnapshot = prompts.snapshot()
 
-        await self.bot.submission_channel.edit(topic=prompts.get_topic())
+        topic: str = prompts.get_topic(snapshot)
+        if self.bot.submission_channel.topic != topic:
+            await self.bot.submission_channel.edit(topic=topic)
 
-        info_message: discord.Message = await self.bot.submission_channel.fetch_message(config.info_message_id)
-        if info_message.author == self.bot.user:
-            await info_message.edit(content=prompts.get_info_message())
+        await self.edit_message(config.settings.info_message_id, prompts.get_info_message(snapshot))
 
-        if not prompts.has_new_prompt:
+        if not snapshot.has_new_prompt:
             return
 
-        prompt_message: discord.Message = await self.bot.submission_channel.fetch_message(config.current_prompts_message_id)
-        if prompt_message.author == self.bot.user:
-            await prompt_message.edit(content=config.prompts_image_links[prompts.current_day])
+        if snapshot.current_day >= len(config.settings.prompts_image_links):
+            log.warning(f'There is no prompts image link for day {snapshot.current_day + 1}.')
+            return
+
+        await self.edit_message(config.settings.current_prompts_message_id, config.settings.prompts_image_links[snapshot.current_day])
+
+    async def run_days(self) -> None:
+        """Refreshes the submission channel and announces the new day at the start of every day, as scheduled by the timeline."""
+
+        await self.bot.wait_until_ready()
+
+        prompts: Prompts = self.bot.get_cog(Prompts)
+
+        while prompts.snapshot().has_new_prompt:
+            await discord.utils.sleep_until(prompts.timeline.next_day_start())
+
+            # Neither step depends on the other, and a failed day mustn't stop the announcements of the following days
+            try:
+                await self.update_submission_channel()
+            except Exception:
+                log.exception('Failed to refresh the submission channel for the new day.')
+
+            try:
+                await self.announce_new_day()
+            except Exception:
+                log.exception('Failed to announce the new day.')
+
+    @staticmethod
+    def _log_day_task_exit(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            log.error('The daily announcements stopped.', exc_info=task.exception())
 
-    @tasks.loop(time=datetime.time(0, 0, 0, 0))
     async def announce_new_day(self) -> None:
         prompts: Prompts = self.bot.get_cog(Prompts)
+        snapshot: TimelineSnapshot = prompts.snapshot()
 
-        if not prompts.has_new_prompt:
+        if not snapshot.has_new_prompt:
             return
 
-        await self.bot.submission_channel.send(f"It's a new day! The current prompt is {prompts.prompt_text(prompts.current_prompt_id)}")
+        await self.bot.submission_channel.send(f"It's a new day! The current prompt is {prompts.prompt_text(snapshot.current_prompt_id)}")
 
     @update_submission_channel.before_loop
     async def ensure_ready(self) -> None:
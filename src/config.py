@@ -1,55 +1,208 @@
+import dataclasses
 import datetime
+import os
+import zoneinfo
 from typing import Any, TypeVar
 
 import discord
 from discord.ext import commands
 from ruamel.yaml import YAML
 
-from .errors import ConfiguredResourceNotFound
+from .errors import ConfiguredResourceNotFound, InvalidConfig
 
 
-with YAML(typ='safe', pure=True) as yaml:
-    with open('config.yaml', encoding='utf-8') as file:
-        data: dict = yaml.load(file)
+T = TypeVar('T')
 
-# Bot
-token: str = data['bot']['token']
+CONFIG_PATH: str = os.environ.get('ARTEMIS_CONFIG', 'config.yaml')
 
-# Event Guild & Channels
-event_guild_id: int = data['discord']['guild_id']
-queue_channel_id: int = data['discord']['queue_channel_id']
-submission_channel_id: int = data['discord']['submission_channel_id']
-gallery_channel_id: int = data['discord']['gallery_channel_id']
+MISSING: Any = object()
 
-# Event Info
-event_name: str = data['discord']['event_name']
 
-# Event Info Messages
-info_message_id: int = data['discord']['info_message_id']
-current_prompts_message_id: int = data['discord']['current_prompts_message_id']
+def _get(data: dict, path: str, expected: type[T], default: T = MISSING) -> T:
+    """Looks up a dotted path in the loaded YAML, validating its type. A default of None also allows the value to be null."""
 
-# Event Role
-event_role_id: int = data['discord']['event_role_id']
-event_role_requirement: int = data['event_role_requirement']
+    value: Any = data
 
-# Event Embed Color
-embed_color: int = data['discord']['embed_color']
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            if default is not MISSING:
+                return default
 
-# Event Schedule Info
-start_day: datetime.date = data['start_day']
-end_day: datetime.date = data['end_day']
-days_per_prompt: int = data['days_per_prompt']
+            raise InvalidConfig(path, 'is missing')
 
-# Event Prompts
-prompts: list[str] = data['prompts']
-prompts_image_links: list[str] = data['prompts_image_links']
+        value = value[key]
 
-# API endpoints for sharing the event data with blobs.gg
-image_uploading_endpoint: str = data['image_uploading_endpoint']
-image_uploading_authorization: str | None = data['image_uploading_authorization']
+    if value is None and default is None:
+        return None  # type: ignore
 
-statistics_endpoint: str = data['statistics_endpoint']
-statistics_authorization: str | None = data['statistics_authorization']
+    if not isinstance(value, expected):
+        raise InvalidConfig(path, f'has to be of type {expected.__name__}, got {type(value).__name__}')
+
+    return value
+
+
+@dataclasses.dataclass(frozen=True)
+class Config:
+    # Bot
+    token: str
+
+    # Event Guild & Channels
+    event_guild_id: int
+    queue_channel_id: int
+    submission_channel_id: int
+    gallery_channel_id: int
+
+    # Whether to skip chunking the event guild at startup and fetch members when they are needed instead
+    lazy_members: bool
+
+    # Event Info
+    event_name: str
+
+    # Event Info Messages
+    info_message_id: int
+    current_prompts_message_id: int
+
+    # Event Role
+    event_role_id: int
+    event_role_requirement: int
+
+    # Event Embed Color
+    embed_color: int
+
+    # Event Schedule Info
+    start_day: datetime.date
+    end_day: datetime.date
+    days_per_prompt: int
+
+    # IANA name of the timezone whose midnight starts each event day
+    timezone: str
+
+    # Event Prompts
+    prompts: list[str]
+    prompts_image_links: list[str]
+
+    # Largest file which will be downloaded for reuploading
+    max_download_size: int
+
+    # Whether the CDN receives the original artwork, or only the version attached to the gallery post when it had to be shrunk
+    keep_original_uploads: bool
+
+    # Longest side in pixels of the artwork thumbnails uploaded to the CDN
+    thumbnail_size: int
+
+    # Where exports of the event data are written, relative to the working directory unless absolute
+    export_directory: str
+
+    # API endpoints for sharing the event data with blobs.gg
+    image_uploading_endpoint: str
+    image_uploading_authorization: str | None
+
+    statistics_endpoint: str
+    statistics_authorization: str | None
+    statistics_bulk_updates: bool
+
+    # Where the Prometheus metrics endpoint listens, it is disabled without a port
+    metrics_host: str
+    metrics_port: int | None
+
+    @classmethod
+    def from_data(cls, data: dict) -> 'Config':
+        config: Config = cls(
+            token=_get(data, 'bot.token', str),
+            event_guild_id=_get(data, 'discord.guild_id', int),
+            queue_channel_id=_get(data, 'discord.queue_channel_id', int),
+            submission_channel_id=_get(data, 'discord.submission_channel_id', int),
+            gallery_channel_id=_get(data, 'discord.gallery_channel_id', int),
+            lazy_members=_get(data, 'discord.lazy_members', bool, False),
+            event_name=_get(data, 'discord.event_name', str),
+            info_message_id=_get(data, 'discord.info_message_id', int),
+            current_prompts_message_id=_get(data, 'discord.current_prompts_message_id', int),
+            event_role_id=_get(data, 'discord.event_role_id', int),
+            event_role_requirement=_get(data, 'event_role_requirement', int),
+            embed_color=_get(data, 'discord.embed_color', int),
+            start_day=_get(data, 'start_day', datetime.date),
+            end_day=_get(data, 'end_day', datetime.date),
+            days_per_prompt=_get(data, 'days_per_prompt', int),
+            timezone=_get(data, 'timezone', str, 'UTC'),
+            prompts=_get(data, 'prompts', list),
+            prompts_image_links=_get(data, 'prompts_image_links', list),
+            max_download_size=_get(data, 'max_download_size', int, 25 * 1024 * 1024),
+            keep_original_uploads=_get(data, 'keep_original_uploads', bool, True),
+            thumbnail_size=_get(data, 'thumbnail_size', int, 512),
+            export_directory=_get(data, 'export_directory', str, 'exports'),
+            image_uploading_endpoint=_get(data, 'image_uploading_endpoint', str),
+            image_uploading_authorization=_get(data, 'image_uploading_authorization', str, None),
+            statistics_endpoint=_get(data, 'statistics_endpoint', str),
+            statistics_authorization=_get(data, 'statistics_authorization', str, None),
+            statistics_bulk_updates=_get(data, 'statistics_bulk_updates', bool, False),
+            metrics_host=_get(data, 'metrics.host', str, '127.0.0.1'),
+            metrics_port=_get(data, 'metrics.port', int, None),
+        )
+
+        config.validate()
+        return config
+
+    def validate(self) -> None:
+        if self.end_day < self.start_day:
+            raise InvalidConfig('end_day', 'has to be after start_day')
+
+        if self.days_per_prompt < 1:
+            raise InvalidConfig('days_per_prompt', 'has to be at least 1')
+
+        if not self.prompts or not all(isinstance(prompt, str) for prompt in self.prompts):
+            raise InvalidConfig('prompts', 'has to be a non-empty list of strings')
+
+        if not all(isinstance(link, str) for link in self.prompts_image_links):
+            raise InvalidConfig('prompts_image_links', 'has to be a list of strings')
+
+        if self.max_download_size < 1:
+            raise InvalidConfig('max_download_size', 'has to be positive')
+
+        if self.thumbnail_size < 1:
+            raise InvalidConfig('thumbnail_size', 'has to be positive')
+
+        if self.metrics_port is not None and not 0 < self.metrics_port < 65536:
+            raise InvalidConfig('metrics.port', 'has to be a valid port number')
+
+        try:
+            zoneinfo.ZoneInfo(self.timezone)
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            raise InvalidConfig('timezone', f'{self.timezone!r} is not a known timezone')
+
+
+def load(path: str = CONFIG_PATH) -> Config:
+    with YAML(typ='safe', pure=True) as yaml:
+        with open(path, encoding='utf-8') as file:
+            data: Any = yaml.load(file)
+
+    if not isinstance(data, dict):
+        raise InvalidConfig(path, 'has to contain a mapping')
+
+    return Config.from_data(data)
+
+
+# The active configuration, always read it through this module so reloads are picked up
+settings: Config = load()
+
+
+def reload(path: str = CONFIG_PATH) -> tuple[Config, Config]:
+    """
+    Loads and validates the configuration file again and swaps it in as the active configuration.
+
+    Nothing is changed if the new configuration is invalid.
+
+    Returns
+    -------
+    tuple[Config, Config]
+        The previous and the new configuration.
+    """
+
+    global settings
+
+    old: Config = settings
+    settings = load(path)
+
+    return old, settings
 
 
 class EventBot(commands.Bot):
@@ -63,21 +216,21 @@ class EventBot(commands.Bot):
 
     @property
     def event_guild(self) -> discord.Guild:
-        guild: discord.Guild | None = self.get_guild(event_guild_id)
+        guild: discord.Guild | None = self.get_guild(settings.event_guild_id)
 
         if guild is None:
-            raise ConfiguredResourceNotFound('event_guild_id', event_guild_id)
+            raise ConfiguredResourceNotFound('event_guild_id', settings.event_guild_id)
 
         return guild
 
     @property
     def queue_channel(self) -> discord.TextChannel:
-        return self.__get_text_channel('queue_channel', queue_channel_id)
+        return self.__get_text_channel('queue_channel', settings.queue_channel_id)
 
     @property
     def submission_channel(self) -> discord.TextChannel:
-        return self.__get_text_channel('submission_channel', submission_channel_id)
+        return self.__get_text_channel('submission_channel', settings.submission_channel_id)
 
     @property
     def gallery_channel(self) -> discord.TextChannel:
-        return self.__get_text_channel('gallery_channel', gallery_channel_id)
+        return self.__get_text_channel('gallery_channel', settings.gallery_channel_id)
@@ -9,6 +9,26 @@ class FilesizeLimitException(Exception):
     pass
 
 
+class DownloadRejected(Exception):
+    def __init__(self, url: str, reason: str):
+        super().__init__(f'Refused to download {url}: {reason}.')
+
+
+class UploadFailed(Exception):
+    def __init__(self, reason: str):
+        super().__init__(f'The CDN upload failed: {reason}.')
+
+
+class CircuitOpen(Exception):
+    def __init__(self, endpoint: str):
+        super().__init__(f'Not sending requests to the {endpoint} endpoint, it failed too often recently.')
+
+
 class ConfiguredResourceNotFound(Exception):
     def __init__(self, field_name: str, value: Any):
         super().__init__(f'Failed to find the resource with ID `{value}` for {field_name}.')
+
+
+class InvalidConfig(Exception):
+    def __init__(self, field_name: str, reason: str):
+        super().__init__(f'Invalid configuration, {field_name} {reason}.')
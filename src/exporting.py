@@ -0,0 +1,74 @@
+import asyncio
+import datetime
+import enum
+import gzip
+import json
+import pathlib
+from types import TracebackType
+from typing import Any, BinaryIO, Mapping
+
+
+# Output is collected up to this size before it is written, so the event loop hands off to a thread once per block
+WRITE_BUFFER_SIZE: int = 1024 * 1024
+
+# Exports are mostly repetitive URLs and IDs, higher levels barely shrink them further but take much longer
+COMPRESSION_LEVEL: int = 6
+
+
+class ExportFormat(enum.Enum):
+    CSV = 'csv'
+    NDJSON = 'ndjson'
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def ndjson_line(record: Mapping[str, Any]) -> bytes:
+    return json.dumps(dict(record), default=json_default, separators=(',', ':')).encode() + b'\n'
+
+
+class ExportFile:
+    """
+    Writes an export to disk as it is produced, optionally compressed with gzip.
+
+    Writes are buffered and handed to a thread, so neither the export's size nor the disk hold up the event loop.
+    Used as context manager, the file is removed if the export fails, so it can't be mistaken for a complete one.
+    """
+
+    def __init__(self, path: pathlib.Path, compress: bool) -> None:
+        self.path: pathlib.Path = path
+
+        self.file: BinaryIO = gzip.open(path, 'wb', compresslevel=COMPRESSION_LEVEL) if compress else open(path, 'wb')
+        self.buffer: bytearray = bytearray()
+
+    async def write(self, data: bytes) -> None:
+        self.buffer += data
+
+        if len(self.buffer) >= WRITE_BUFFER_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        data: bytes = bytes(self.buffer)
+        self.buffer.clear()
+
+        await asyncio.to_thread(self.file.write, data)
+
+    async def close(self) -> None:
+        try:
+            await self.flush()
+        finally:
+            await asyncio.to_thread(self.file.close)
+
+    async def __aenter__(self) -> 'ExportFile':
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, traceback: TracebackType | None) -> None:
+        try:
+            await self.close()
+        finally:
+            if exc_type is not None:
+                self.path.unlink(missing_ok=True)
@@ -0,0 +1,27 @@
+from typing import IO
+
+from PIL import Image
+
+
+# Width of the difference hash grid, one more column than bits per row as adjacent pixels are compared
+HASH_SIZE: int = 8
+
+
+def perceptual_hash(file: IO[bytes]) -> int:
+    """
+    Computes the difference hash of an image, which stays stable when the image is re-encoded, resized or slightly altered.
+
+    The hash is returned as a signed 64 bit integer so it fits into a BIGINT column.
+    """
+
+    with Image.open(file) as image:
+        image.draft('L', (HASH_SIZE * 4, HASH_SIZE * 4))
+        pixels: bytes = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS).tobytes()
+
+    value: int = 0
+    for row in range(HASH_SIZE):
+        for column in range(HASH_SIZE):
+            offset: int = row * (HASH_SIZE + 1) + column
+            value = value << 1 | (pixels[offset] > pixels[offset + 1])
+
+    return value - (1 << 64) if value >= 1 << 63 else value
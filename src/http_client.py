@@ -0,0 +1,282 @@
+import asyncio
+import collections
+import contextlib
+import dataclasses
+import logging
+import random
+import statistics
+import time
+from typing import Any, AsyncIterator, Callable, TypedDict
+
+import aiohttp
+
+from .errors import CircuitOpen
+from .metrics import HTTP_REQUEST_DURATION, HTTP_RETRIES
+
+
+log = logging.getLogger(__name__)
+
+# Responses which are worth sending the request again for, any other response is handed to the caller
+RETRY_STATUSES: frozenset[int] = frozenset({408, 429, 500, 502, 503, 504})
+
+# Requests which can be sent again without changing their effect, others are only retried if they never reached the server
+IDEMPOTENT_METHODS: frozenset[str] = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+# Everything a request can fail with besides its response status, for callers which fall back to something else
+REQUEST_ERRORS: tuple[type[Exception], ...] = (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpen)
+
+# Seconds for which resolved host names are reused
+DNS_CACHE_TTL: int = 300
+
+# Recent request durations kept per endpoint for the runtime stats, the metrics histogram covers the whole uptime
+LATENCY_SAMPLES: int = 256
+
+
+@dataclasses.dataclass(frozen=True)
+class EndpointPolicy:
+    # Requests sent at once, further requests wait for one of them to finish
+    concurrency: int
+
+    connect_timeout: float
+    # Longest pause while reading a response
+    read_timeout: float
+    # Bound on a whole request including its body, None to only rely on the other timeouts
+    total_timeout: float | None
+
+    # Including the first one
+    attempts: int = 3
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 10
+
+    # Consecutive failures which stop requests from being sent, None to never stop sending
+    breaker_threshold: int | None = None
+    # How long requests are rejected once the circuit opened, before a single trial request is let through
+    breaker_reset: float = 30
+
+
+POLICIES: dict[str, EndpointPolicy] = {
+    # Artwork and avatars come from many hosts, one of them failing says nothing about the others, so there is no circuit breaker
+    'download': EndpointPolicy(concurrency=8, connect_timeout=10, read_timeout=30, total_timeout=120),
+    'cdn': EndpointPolicy(concurrency=4, connect_timeout=10, read_timeout=60, total_timeout=300, breaker_threshold=5),
+    'statistics': EndpointPolicy(concurrency=2, connect_timeout=10, read_timeout=30, total_timeout=60, breaker_threshold=5),
+}
+
+
+class EndpointStats(TypedDict):
+    in_flight: int
+    waiting: int
+    concurrency: int
+    circuit: str
+    consecutive_failures: int
+    latency_p50: float | None
+    latency_p95: float | None
+
+
+class CircuitBreaker:
+    """
+    Rejects requests after `threshold` consecutive failures, so callers fail fast instead of waiting on a broken endpoint.
+
+    After `reset_after` seconds a single trial request is let through, which closes the circuit again if it succeeds.
+    """
+
+    def __init__(self, threshold: int, reset_after: float) -> None:
+        self.threshold: int = threshold
+        self.reset_after: float = reset_after
+
+        self.failures: int = 0
+        self.opened_at: float | None = None
+        self.trial: bool = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+
+        return 'half_open' if time.monotonic() - self.opened_at >= self.reset_after else 'open'
+
+    def allow(self) -> bool:
+        state: str = self.state
+
+        if state == 'half_open' and not self.trial:
+            self.trial = True
+            return True
+
+        return state == 'closed'
+
+    def record(self, success: bool) -> None:
+        if success:
+            self.failures = 0
+            self.opened_at = None
+        else:
+            self.failures += 1
+
+            if self.trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+        self.trial = False
+
+
+class Endpoint:
+    """A connection pool with its own limits, timeouts, retries and circuit breaker for one kind of outgoing request."""
+
+    def __init__(self, name: str, policy: EndpointPolicy, headers: dict[str, str]) -> None:
+        self.name: str = name
+        self.policy: EndpointPolicy = policy
+
+        self.session: aiohttp.ClientSession = aiohttp.ClientSession(
+            headers=headers,
+            connector=aiohttp.TCPConnector(limit=policy.concurrency, ttl_dns_cache=DNS_CACHE_TTL),
+            timeout=aiohttp.ClientTimeout(total=policy.total_timeout, connect=policy.connect_timeout, sock_read=policy.read_timeout),
+        )
+
+        self.slots: asyncio.Semaphore = asyncio.Semaphore(policy.concurrency)
+        self.in_flight: int = 0
+        self.waiting: int = 0
+
+        self.breaker: CircuitBreaker | None = None
+        if policy.breaker_threshold is not None:
+            self.breaker = CircuitBreaker(policy.breaker_threshold, policy.breaker_reset)
+
+        self.latencies: collections.deque[float] = collections.deque(maxlen=LATENCY_SAMPLES)
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        self.waiting += 1
+
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+
+    def retry_delay(self, attempt: int, response: aiohttp.ClientResponse | None) -> float:
+        retry_after: str | None = response.headers.get('Retry-After') if response is not None else None
+
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.policy.retry_max_delay)
+
+        # Full jitter keeps callers which failed together from retrying together
+        return random.uniform(0, min(self.policy.retry_base_delay * 2 ** (attempt - 1), self.policy.retry_max_delay))
+
+    async def send(self, method: str, url: str, data: Callable[[], Any] | None, kwargs: dict[str, Any]) -> aiohttp.ClientResponse:
+        # A request which timed out or got an error response may still have been processed, sending it again could repeat it
+        idempotent: bool = method.upper() in IDEMPOTENT_METHODS
+        retried_errors: tuple[type[Exception], ...] = (
+            (aiohttp.ClientConnectionError, asyncio.TimeoutError) if idempotent else (aiohttp.ClientConnectorError,)
+        )
+
+        attempt: int = 0
+
+        while True:
+            attempt += 1
+
+            if self.breaker is not None and not self.breaker.allow():
+                raise CircuitOpen(self.name)
+
+            response: aiohttp.ClientResponse | None = None
+            start: float = time.perf_counter()
+
+            try:
+                response = await self.session.request(method, url, data=data and data(), **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == self.policy.attempts or not isinstance(e, retried_errors):
+                    raise
+
+                reason: str = str(e) or type(e).__name__
+            else:
+                reason = f'status {response.status}'
+            finally:
+                elapsed: float = time.perf_counter() - start
+
+                self.latencies.append(elapsed)
+                HTTP_REQUEST_DURATION.observe(elapsed, endpoint=self.name, status=response.status if response is not None else 'error')
+
+                # Cancelled requests count as failures as well, which also ends the trial of a half open circuit
+                if self.breaker is not None:
+                    self.breaker.record(response is not None and response.status not in RETRY_STATUSES)
+
+            if response is not None and (response.status not in RETRY_STATUSES or not idempotent or attempt == self.policy.attempts):
+                return response
+
+            delay: float = self.retry_delay(attempt, response)
+
+            if response is not None:
+                response.release()
+
+            HTTP_RETRIES.inc(endpoint=self.name)
+            log.info(f'Retrying {method} {url} in {delay:.2f} seconds after {reason}.')
+
+            # The slot is kept while waiting, so a struggling endpoint isn't sent even more requests
+            await asyncio.sleep(delay)
+
+    @contextlib.asynccontextmanager
+    async def request(
+        self, method: str, url: str, *, data: Callable[[], Any] | None = None, **kwargs: Any
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        async with self.slot():
+            response: aiohttp.ClientResponse = await self.send(method, url, data, kwargs)
+
+            try:
+                yield response
+            finally:
+                response.release()
+
+    def stats(self) -> EndpointStats:
+        quantiles: list[float] | None = None
+        if len(self.latencies) >= 2:
+            quantiles = statistics.quantiles(self.latencies, n=20, method='inclusive')
+
+        return {
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'concurrency': self.policy.concurrency,
+            'circuit': self.breaker.state if self.breaker is not None else 'none',
+            'consecutive_failures': self.breaker.failures if self.breaker is not None else 0,
+            'latency_p50': quantiles[9] if quantiles is not None else None,
+            'latency_p95': quantiles[18] if quantiles is not None else None,
+        }
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+class HTTPClient:
+    """
+    Makes the bot's HTTP requests besides those to Discord, through one `Endpoint` per kind of request.
+
+    Requests are made with `request`, which retries connection errors, timeouts and responses with a status in `RETRY_STATUSES`.
+    Requests with a method outside of `IDEMPOTENT_METHODS` are only retried if connecting failed.
+    A request body has to be passed as callable returning it, so it can be created again for each attempt.
+    """
+
+    def __init__(self, headers: dict[str, str], policies: dict[str, EndpointPolicy] = POLICIES) -> None:
+        self.endpoints: dict[str, Endpoint] = {name: Endpoint(name, policy, headers) for name, policy in policies.items()}
+
+    def request(
+        self, endpoint: str, method: str, url: str, *, data: Callable[[], Any] | None = None, **kwargs: Any
+    ) -> contextlib.AbstractAsyncContextManager[aiohttp.ClientResponse]:
+        """
+        Sends a request through the given endpoint, returning a context manager for the response.
+
+        Raises
+        ------
+        CircuitOpen
+            The endpoint failed too often recently, so the request wasn't sent.
+        aiohttp.ClientError | asyncio.TimeoutError
+            The request failed, see `REQUEST_ERRORS`.
+        """
+
+        return self.endpoints[endpoint].request(method, url, data=data, **kwargs)
+
+    def stats(self) -> dict[str, EndpointStats]:
+        return {name: endpoint.stats() for name, endpoint in self.endpoints.items()}
+
+    async def close(self) -> None:
+        await asyncio.gather(*(endpoint.close() for endpoint in self.endpoints.values()))
@@ -0,0 +1,40 @@
+import asyncio
+import contextlib
+from typing import AsyncIterator, Generic, Hashable, TypeVar
+
+
+K = TypeVar('K', bound=Hashable)
+
+
+class KeyedLock(Generic[K]):
+    """
+    A registry of asyncio locks, one per key.
+
+    Locks only exist while a task holds or waits for them, so the registry never grows beyond the keys currently in use.
+    """
+
+    def __init__(self) -> None:
+        self._locks: dict[K, asyncio.Lock] = {}
+        self._users: dict[K, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def locked(self, key: K) -> bool:
+        lock: asyncio.Lock | None = self._locks.get(key)
+        return lock is not None and lock.locked()
+
+    @contextlib.asynccontextmanager
+    async def __call__(self, key: K) -> AsyncIterator[None]:
+        lock: asyncio.Lock = self._locks.setdefault(key, asyncio.Lock())
+        self._users[key] = self._users.get(key, 0) + 1
+
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
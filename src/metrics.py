@@ -0,0 +1,197 @@
+import bisect
+import functools
+import time
+from typing import Any, Awaitable, Callable, Iterator, ParamSpec, TypeVar
+
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+LabelValues = tuple[str, ...]
+
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = '') -> str:
+    labels: list[str] = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+
+    if extra:
+        labels.append(extra)
+
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    type: str
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.label_names: tuple[str, ...] = labels
+
+        registry.append(self)
+
+    def _label_values(self, labels: dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f'{self.name} expects the labels {self.label_names}, got {tuple(labels)}.')
+
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        return '\n'.join([f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}', *self.samples()])
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key: LabelValues = self._label_values(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self.values.items():
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+
+class Gauge(Metric):
+    """A gauge whose values are read from a callback whenever the metrics are collected."""
+
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+
+        self.callback: Callable[[], dict[LabelValues, float]] | None = None
+
+    def set_callback(self, callback: Callable[[], dict[LabelValues, float]] | None) -> None:
+        self.callback = callback
+
+    def samples(self) -> Iterator[str]:
+        if self.callback is None:
+            return
+
+        for key, value in self.callback().items():
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        errors: Counter | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+
+        self.buckets: tuple[float, ...] = buckets
+
+        # Counts timed operations which raised, needs the same labels as the histogram
+        self.errors: Counter | None = errors
+
+        # Per label set: the (non-cumulative) count of each bucket plus +Inf, and the sum of all observations
+        self.counts: dict[LabelValues, list[int]] = {}
+        self.sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key: LabelValues = self._label_values(labels)
+
+        counts: list[int] = self.counts.setdefault(key, [0] * (len(self.buckets) + 1))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+
+        self.sums[key] = self.sums.get(key, 0) + value
+
+    def time(self, **labels: Any) -> 'Timer':
+        return Timer(self, labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, counts in self.counts.items():
+            cumulative: int = 0
+
+            for bound, count in zip([*map(_format_value, self.buckets), '+Inf'], counts):
+                cumulative += count
+                bucket_label: str = f'le="{bound}"'
+
+                yield f'{self.name}_bucket{_format_labels(self.label_names, key, bucket_label)} {cumulative}'
+
+            yield f'{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(self.sums[key])}'
+            yield f'{self.name}_count{_format_labels(self.label_names, key)} {cumulative}'
+
+
+class Timer:
+    """Observes how long a block or coroutine function takes, usable as context manager and as decorator."""
+
+    def __init__(self, histogram: Histogram, labels: dict[str, Any]) -> None:
+        self.histogram: Histogram = histogram
+        self.labels: dict[str, Any] = labels
+
+        self.start: float = 0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+        if exc_info[0] is not None and self.histogram.errors is not None:
+            self.histogram.errors.inc(**self.labels)
+
+    def __call__(self, func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with Timer(self.histogram, self.labels):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+
+def render() -> str:
+    return '\n'.join(metric.render() for metric in registry) + '\n'
+
+
+registry: list[Metric] = []
+
+STAGE_ERRORS = Counter('artemis_stage_errors_total', 'Stages of the submission pipeline which raised an exception.', ('stage',))
+STAGE_DURATION = Histogram(
+    'artemis_stage_duration_seconds', 'Duration of the stages of the submission pipeline.', ('stage',), errors=STAGE_ERRORS
+)
+
+QUERY_ERRORS = Counter('artemis_query_errors_total', 'Database queries made through EventData which raised an exception.', ('query',))
+QUERY_DURATION = Histogram(
+    'artemis_query_duration_seconds', 'Duration of database queries made through EventData.', ('query',), errors=QUERY_ERRORS
+)
+
+LOCK_WAIT = Histogram('artemis_lock_wait_seconds', 'Time spent waiting for the keyed submission locks.')
+EVENT_LOOP_LAG = Histogram('artemis_event_loop_lag_seconds', 'How late the event loop ran a callback scheduled for a known time.')
+
+POOL_CONNECTIONS = Gauge('artemis_pool_connections', 'Connections of the database pool by state.', ('state',))
+
+HTTP_REQUEST_DURATION = Histogram(
+    'artemis_http_request_duration_seconds',
+    'Time until the response headers of outgoing non-Discord HTTP requests arrived, per attempt.',
+    ('endpoint', 'status'),
+)
+HTTP_RETRIES = Counter('artemis_http_retries_total', 'Outgoing HTTP requests which were sent again after failing.', ('endpoint',))
+HTTP_REQUESTS = Gauge(
+    'artemis_http_requests', 'Outgoing HTTP requests by endpoint and whether they are sent or wait for a slot.', ('endpoint', 'state')
+)
+HTTP_CIRCUIT = Gauge('artemis_http_circuit', 'Circuit breaker state of the HTTP endpoints, 1 for the current state.', ('endpoint', 'state'))
@@ -0,0 +1,88 @@
+import logging
+import pathlib
+import re
+
+import asyncpg
+
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_DIRECTORY: pathlib.Path = pathlib.Path(__file__).parent.parent / 'schema' / 'migrations'
+
+# Arbitrary key used to make sure only one process applies migrations at a time
+MIGRATION_LOCK_ID: int = 0x4152_5445
+
+
+class Migration:
+    version: int
+    name: str
+    path: pathlib.Path
+
+    def __init__(self, path: pathlib.Path) -> None:
+        match = re.fullmatch(r'(\d+)_(\w+)\.sql', path.name)
+
+        if match is None:
+            raise ValueError(f'Migration file name {path.name!r} does not match "<version>_<name>.sql".')
+
+        self.version = int(match.group(1))
+        self.name = match.group(2)
+        self.path = path
+
+    def read(self) -> str:
+        return self.path.read_text(encoding='utf-8')
+
+
+def find_migrations(directory: pathlib.Path = MIGRATIONS_DIRECTORY) -> list[Migration]:
+    migrations: list[Migration] = sorted(map(Migration, directory.glob('*.sql')), key=lambda migration: migration.version)
+
+    versions: list[int] = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f'Duplicate migration versions found in {directory}.')
+
+    return migrations
+
+
+async def apply_migrations(pool: asyncpg.Pool, directory: pathlib.Path = MIGRATIONS_DIRECTORY) -> None:
+    """
+    Applies every migration in the migrations directory which has not been applied to the database yet.
+
+    Each migration runs in its own transaction together with the bookkeeping in the `schema_migrations` table,
+    so a failing migration leaves the database at the previous version.
+
+    Parameters
+    ----------
+    pool : asyncpg.Pool
+        The pool to acquire the connection running the migrations from.
+    directory : pathlib.Path
+        The directory containing the `<version>_<name>.sql` migration files.
+    """
+
+    migrations: list[Migration] = find_migrations(directory)
+
+    async with pool.acquire() as conn:
+        await conn.execute('SELECT pg_advisory_lock($1)', MIGRATION_LOCK_ID)
+
+        try:
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+
+            applied: set[int] = {record['version'] for record in await conn.fetch('SELECT version FROM schema_migrations')}
+
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+
+                log.info(f'Applying migration {migration.version} ({migration.name}).')
+
+                async with conn.transaction():
+                    await conn.execute(migration.read())
+                    await conn.execute('INSERT INTO schema_migrations (version, name) VALUES ($1, $2)', migration.version, migration.name)
+        finally:
+            await conn.execute('SELECT pg_advisory_unlock($1)', MIGRATION_LOCK_ID)
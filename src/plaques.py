@@ -1,5 +1,12 @@
+import asyncio
+import concurrent.futures
+import io
+
 from PIL import Image, ImageDraw, ImageFont
 
+from .cache import LRUCache
+from .metrics import STAGE_DURATION
+
 
 Color = tuple[int, int, int]
 
@@ -14,6 +21,16 @@ BOLD_FONT = ImageFont.truetype('/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf', si
 
 TRIANGLE_SLOPE: float = 3
 
+# Everything besides the text which influences how a plaque looks, part of the cache key so style changes never serve stale plaques
+STYLE: tuple = (MAIN_BACKGROUND, SECONDARY_BACKGROUND, TEXT, TEXT_HEIGHT, FONT.path, BOLD_FONT.path, TRIANGLE_SLOPE)
+
+PLAQUE_CACHE_SIZE: int = 16 * 1024 * 1024
+
+plaque_cache: LRUCache[tuple, bytes] = LRUCache(PLAQUE_CACHE_SIZE, weigher=len)
+
+# FreeType fonts must not be used from several threads at once, so all plaques are rendered on a single worker
+renderer: concurrent.futures.ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='plaques')
+
 
 def create_plaque(lines: list[str], bold_lines: list[int] = []) -> Image.Image:
     image: Image.Image = Image.new('RGB', (int(max(map(FONT.getlength, lines)) + 100), (len(lines) + 2) * TEXT_HEIGHT), color=MAIN_BACKGROUND)
@@ -37,3 +54,33 @@ def create_plaque(lines: list[str], bold_lines: list[int] = []) -> Image.Image:
         draw.text((image.width / 2, y_pos), text, fill=TEXT, anchor='mm', font=font)
 
     return image
+
+
+def encode_plaque(lines: list[str], bold_lines: list[int]) -> bytes:
+    data: io.BytesIO = io.BytesIO()
+    create_plaque(lines, bold_lines).save(data, format='png')
+
+    return data.getvalue()
+
+
+async def render_plaque(lines: list[str], bold_lines: list[int] = []) -> bytes:
+    """
+    Returns the PNG encoded plaque for the given lines, rendering it off the event loop if it isn't cached yet.
+
+    Parameters
+    ----------
+    lines : list[str]
+        The lines of text on the plaque.
+    bold_lines : list[int]
+        The indices of the lines which should be drawn in bold.
+    """
+
+    key: tuple = (tuple(lines), tuple(sorted(set(bold_lines))), STYLE)
+
+    data: bytes | None = plaque_cache.get(key)
+    if data is None:
+        with STAGE_DURATION.time(stage='plaque_render'):
+            data = await asyncio.get_running_loop().run_in_executor(renderer, encode_plaque, lines, bold_lines)
+        plaque_cache[key] = data
+
+    return data
@@ -0,0 +1,110 @@
+import dataclasses
+import hashlib
+import heapq
+from typing import AsyncIterable, NamedTuple
+
+
+class Ticket(NamedTuple):
+    user_id: int
+    submission_id: int
+
+
+class Winner(NamedTuple):
+    user_id: int
+    # The user's ticket with the highest key, which is the one that won
+    submission_id: int
+    tickets: int
+
+
+@dataclasses.dataclass
+class RaffleResult:
+    # Ordered by place
+    winners: list[Winner]
+    entrants: int
+    tickets: int
+    # SHA-256 over every counted ticket, a draw repeated with the same seed and digest has the same winners
+    digest: str
+
+
+def ticket_key(seed_key: bytes, submission_id: int) -> int:
+    """A uniformly distributed 64 bit number for a ticket, which anyone knowing the seed can compute again."""
+
+    return int.from_bytes(hashlib.blake2b(submission_id.to_bytes(8, 'big'), digest_size=8, key=seed_key).digest(), 'big')
+
+
+async def draw(tickets: AsyncIterable[Ticket], winners: int, seed: str, cap: int | None = None) -> RaffleResult:
+    """
+    Draws distinct users, each with a chance proportional to their tickets, in a single pass over the tickets.
+
+    Every ticket gets a random key derived from the seed and the user's key is the highest key of their tickets.
+    The maximum of n uniform keys is distributed like the key u^(1/n) weighted reservoir sampling assigns to an item of weight n,
+    so keeping the users with the highest keys is weighted sampling without replacement, using memory for the winners only.
+
+    Parameters
+    ----------
+    tickets : AsyncIterable[Ticket]
+        The tickets, ordered by user and then by submission, so the same tickets are counted when a cap applies.
+    winners : int
+        How many users to draw, fewer are drawn if there are fewer users with tickets.
+    seed : str
+        Determines the result together with the tickets.
+    cap : int | None
+        The most tickets counted per user, their earliest submissions are counted.
+    """
+
+    if winners < 1:
+        raise ValueError('At least one winner has to be drawn.')
+
+    seed_key: bytes = hashlib.sha256(seed.encode()).digest()
+    digest = hashlib.sha256()
+
+    # Min heap of (key, user ID, submission ID, tickets) holding the leading users
+    leaders: list[tuple[int, int, int, int]] = []
+    entrants: int = 0
+    counted: int = 0
+
+    user_id: int | None = None
+    best_key: int = 0
+    best_submission: int = 0
+    user_tickets: int = 0
+
+    def finish_user() -> None:
+        entry: tuple[int, int, int, int] = (best_key, user_id, best_submission, user_tickets)  # type: ignore
+
+        if len(leaders) < winners:
+            heapq.heappush(leaders, entry)
+        elif entry > leaders[0]:
+            heapq.heapreplace(leaders, entry)
+
+    async for ticket in tickets:
+        if ticket.user_id != user_id:
+            if user_id is not None:
+                if ticket.user_id < user_id:
+                    raise ValueError('Tickets have to be ordered by user.')
+
+                finish_user()
+
+            user_id = ticket.user_id
+            best_key = -1
+            user_tickets = 0
+            entrants += 1
+        elif cap is not None and user_tickets >= cap:
+            continue
+
+        key: int = ticket_key(seed_key, ticket.submission_id)
+        if key > best_key:
+            best_key, best_submission = key, ticket.submission_id
+
+        user_tickets += 1
+        counted += 1
+        digest.update(f'{ticket.user_id}:{ticket.submission_id}\n'.encode())
+
+    if user_id is not None:
+        finish_user()
+
+    return RaffleResult(
+        winners=[Winner(user_id, submission_id, tickets) for _, user_id, submission_id, tickets in sorted(leaders, reverse=True)],
+        entrants=entrants,
+        tickets=counted,
+        digest=digest.hexdigest(),
+    )
@@ -0,0 +1,100 @@
+import bisect
+import datetime
+import zoneinfo
+from typing import NamedTuple
+
+from . import config
+
+
+class TimelineSnapshot(NamedTuple):
+    now: datetime.datetime
+
+    current_day: int
+    current_prompt_id: int
+    has_new_prompt: bool
+
+    # When the prompt after the current one is revealed, capped at the end of the event
+    next_prompt_timestamp: int
+
+    before_event: bool
+    during_event: bool
+    after_event: bool
+
+
+class Timeline:
+    """
+    The schedule of an event, computed once so every lookup is a bisection over the prompt reveal instants.
+
+    All instants are stored in UTC, days start at midnight in the event's timezone.
+    """
+
+    timezone: datetime.tzinfo
+    start_day: datetime.date
+    end_day: datetime.date
+
+    reveals: list[datetime.datetime]
+
+    def __init__(self, start_day: datetime.date, end_day: datetime.date, days_per_prompt: int, prompt_count: int, timezone: datetime.tzinfo):
+        self.timezone = timezone
+        self.start_day = start_day
+        self.end_day = end_day
+
+        self.reveals = [self.day_start(start_day + datetime.timedelta(days=days_per_prompt * i)) for i in range(prompt_count)]
+
+        # Reveal of the prompt after the final one, which is never shown but ends the final prompt's period
+        self.prompts_end: datetime.datetime = self.day_start(start_day + datetime.timedelta(days=days_per_prompt * prompt_count))
+
+        self.event_start: datetime.datetime = self.day_start(start_day)
+        self.end: datetime.datetime = self.day_start(end_day)
+        self.event_end: datetime.datetime = self.day_start(end_day + datetime.timedelta(days=1))
+
+    @classmethod
+    def from_config(cls) -> 'Timeline':
+        return cls(
+            config.settings.start_day,
+            config.settings.end_day,
+            config.settings.days_per_prompt,
+            len(config.settings.prompts),
+            zoneinfo.ZoneInfo(config.settings.timezone),
+        )
+
+    def day_start(self, day: datetime.date) -> datetime.datetime:
+        return datetime.datetime.combine(day, datetime.time(), tzinfo=self.timezone).astimezone(datetime.timezone.utc)
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    def snapshot(self, now: datetime.datetime | None = None) -> TimelineSnapshot:
+        now = now or self.now()
+
+        current_day: int = (now.astimezone(self.timezone).date() - self.start_day).days
+        current_prompt_id: int = self.prompt_at(now)
+
+        next_prompt: datetime.datetime = self.reveals[current_prompt_id + 1] if current_prompt_id + 1 < len(self.reveals) else self.prompts_end
+
+        return TimelineSnapshot(
+            now=now,
+            current_day=current_day,
+            current_prompt_id=current_prompt_id,
+            has_new_prompt=now < self.prompts_end,
+            next_prompt_timestamp=int(min(next_prompt, self.end).timestamp()),
+            before_event=now < self.event_start,
+            during_event=self.event_start <= now < self.event_end,
+            after_event=self.event_end <= now,
+        )
+
+    def prompt_at(self, instant: datetime.datetime) -> int:
+        """The ID of the newest prompt revealed at `instant`, the first prompt before the event and the final one after it."""
+
+        return max(bisect.bisect_right(self.reveals, instant) - 1, 0)
+
+    def next_reveal(self, now: datetime.datetime | None = None) -> datetime.datetime | None:
+        now = now or self.now()
+        index: int = bisect.bisect_right(self.reveals, now)
+
+        return self.reveals[index] if index < len(self.reveals) else None
+
+    def next_day_start(self, now: datetime.datetime | None = None) -> datetime.datetime:
+        now = now or self.now()
+
+        return self.day_start(now.astimezone(self.timezone).date() + datetime.timedelta(days=1))
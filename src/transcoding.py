@@ -0,0 +1,131 @@
+import asyncio
+import concurrent.futures
+import io
+import math
+import multiprocessing
+import os
+from typing import NamedTuple
+
+from PIL import Image, ImageOps, features
+
+from .metrics import STAGE_DURATION
+
+
+# WebP keeps transparency and is much smaller than JPEG for artwork, JPEG is only used if Pillow was built without WebP
+FORMAT: str = 'webp' if features.check('webp') else 'jpeg'
+
+QUALITY: int = 85
+THUMBNAIL_QUALITY: int = 80
+
+# WebP can't store images with a longer side
+MAX_DIMENSION: int = 16383
+
+# How often an image is scaled down and encoded again before giving up on fitting it under a size limit
+MAX_ATTEMPTS: int = 8
+
+# Every attempt shrinks the image at least this much, so a bad estimate of the required scale still converges
+MAX_SCALE_STEP: float = 0.9
+
+TRANSCODE_WORKERS: int = max(1, (os.cpu_count() or 1) // 2)
+
+
+class Rendition(NamedTuple):
+    data: bytes
+    extension: str
+
+
+class Renditions(NamedTuple):
+    # Fits under the requested size, None if none was requested or no encoding is small enough
+    fitted: Rendition | None
+    thumbnail: Rendition | None
+
+
+def encode(image: Image.Image, quality: int) -> bytes:
+    data: io.BytesIO = io.BytesIO()
+    image.save(data, format=FORMAT, quality=quality)
+
+    return data.getvalue()
+
+
+def fit(image: Image.Image, max_size: int) -> Rendition | None:
+    scale: float = min(1, MAX_DIMENSION / max(image.size))
+
+    for _ in range(MAX_ATTEMPTS):
+        size: tuple[int, int] = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        data: bytes = encode(image if size == image.size else image.resize(size, Image.Resampling.LANCZOS), QUALITY)
+
+        if len(data) <= max_size:
+            return Rendition(data, FORMAT)
+
+        # The encoded size grows about linearly with the pixel count, so each side shrinks with the root of the overshoot
+        scale *= min(math.sqrt(max_size / len(data)), MAX_SCALE_STEP)
+
+    return None
+
+
+def thumbnail(image: Image.Image, size: int) -> Rendition:
+    image = image.copy()
+    image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+    return Rendition(encode(image, THUMBNAIL_QUALITY), FORMAT)
+
+
+def create_renditions(data: bytes, max_size: int | None, thumbnail_size: int | None) -> Renditions:
+    with Image.open(io.BytesIO(data)) as original:
+        # Only the first frame would survive re-encoding, which is worse than posting animated artwork as a link
+        animated: bool = getattr(original, 'is_animated', False)
+
+        # Phones store the orientation as EXIF data, which is dropped when encoding again
+        image: Image.Image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if FORMAT == 'webp' and image.has_transparency_data else 'RGB')
+
+    return Renditions(
+        fit(image, max_size) if max_size is not None and not animated else None,
+        thumbnail(image, thumbnail_size) if thumbnail_size is not None else None,
+    )
+
+
+class Transcoder:
+    """
+    Encodes images again in worker processes, as encoding is CPU bound and holds the GIL, which would block the event loop.
+
+    The workers are started on first use and have to be stopped with `shutdown` by the owner of the transcoder.
+    """
+
+    def __init__(self, workers: int = TRANSCODE_WORKERS) -> None:
+        self.workers: int = workers
+        self.executor: concurrent.futures.ProcessPoolExecutor | None = None
+
+    async def transcode(self, data: bytes, max_size: int | None, thumbnail_size: int | None) -> Renditions:
+        """
+        Encodes an image again in a worker process.
+
+        Parameters
+        ----------
+        data : bytes
+            The encoded image.
+        max_size : int | None
+            The size in bytes the fitted rendition has to stay below, by lowering the resolution as far as needed.
+            No fitted rendition is created if this is None.
+        thumbnail_size : int | None
+            The longest side of the thumbnail in pixels, no thumbnail is created if this is None.
+        """
+
+        if self.executor is None:
+            # Workers are spawned instead of forked, forking copies the locks of the bot's threads in whatever state they are in
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+        with STAGE_DURATION.time(stage='transcode'):
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self.executor, create_renditions, data, max_size, thumbnail_size)
+            except concurrent.futures.process.BrokenProcessPool:
+                # A worker died, for example by running out of memory, which leaves the pool unusable until it is started again
+                self.shutdown()
+                raise
+
+    def shutdown(self) -> None:
+        """Stops the worker processes without waiting for queued work, they are started again if the transcoder is used again."""
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
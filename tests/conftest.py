@@ -0,0 +1,74 @@
+import asyncio
+import contextlib
+import os
+import pathlib
+import secrets
+from typing import AsyncIterator, Awaitable, Callable, cast
+
+import asyncpg
+import pytest
+
+
+ROOT: pathlib.Path = pathlib.Path(__file__).parent.parent
+
+# The bot's modules read the configuration when imported
+os.environ.setdefault('ARTEMIS_CONFIG', str(ROOT / 'example_config.yaml'))
+
+from src import Artemis  # noqa: E402
+from src.cogs.event_data import EventData  # noqa: E402
+from src.migrations import apply_migrations  # noqa: E402
+
+
+DatabaseTest = Callable[[EventData], Awaitable[None]]
+
+
+class StandInBot:
+    """Carries the resources EventData reads from the bot, so it can be tested without connecting to Discord."""
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool: asyncpg.Pool = pool
+
+
+@contextlib.asynccontextmanager
+async def temporary_database(dsn: str) -> AsyncIterator[asyncpg.Pool]:
+    """Yields a pool whose connections use a new schema with the bot's tables, dropping the schema afterwards."""
+
+    schema: str = f'test_{secrets.token_hex(4)}'
+
+    admin: asyncpg.Connection = await asyncpg.connect(dsn)
+    await admin.execute(f'CREATE SCHEMA {schema}')
+
+    try:
+        pool: asyncpg.Pool = await asyncpg.create_pool(dsn, server_settings={'search_path': schema})  # type: ignore
+
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute((ROOT / 'schema' / 'calendar.sql').read_text(encoding='utf-8'))
+
+            await apply_migrations(pool)
+
+            yield pool
+        finally:
+            await pool.close()
+    finally:
+        await admin.execute(f'DROP SCHEMA {schema} CASCADE')
+        await admin.close()
+
+
+@pytest.fixture
+def database() -> Callable[[DatabaseTest], None]:
+    """
+    Runs a test against EventData on a temporary schema in the PostgreSQL database given by `ARTEMIS_TEST_DSN`.
+
+    Tests using it are skipped without a database. Each test runs in its own event loop, which the schema is created from.
+    """
+
+    dsn: str | None = os.environ.get('ARTEMIS_TEST_DSN')
+    if dsn is None:
+        pytest.skip('ARTEMIS_TEST_DSN is not set')
+
+    async def run(test: DatabaseTest) -> None:
+        async with temporary_database(dsn) as pool:
+            await test(EventData(cast(Artemis, StandInBot(pool))))
+
+    return lambda test: asyncio.run(run(test))
@@ -0,0 +1,93 @@
+import copy
+import pathlib
+from typing import Any
+
+import pytest
+from ruamel.yaml import YAML
+
+from src import config
+from src.errors import InvalidConfig
+
+
+EXAMPLE_CONFIG: pathlib.Path = pathlib.Path(__file__).parent.parent / 'example_config.yaml'
+
+
+def example() -> dict[str, Any]:
+    with YAML(typ='safe', pure=True) as yaml:
+        return yaml.load(EXAMPLE_CONFIG.read_text(encoding='utf-8'))
+
+
+def write(path: pathlib.Path, data: dict[str, Any]) -> str:
+    YAML(typ='safe', pure=True).dump(data, path)
+
+    return str(path)
+
+
+def changed(path: str, value: Any) -> dict[str, Any]:
+    """The example configuration with the value at the dotted `path` replaced, or removed if `value` is None."""
+
+    data: dict[str, Any] = copy.deepcopy(example())
+    *parents, key = path.split('.')
+
+    parent: dict[str, Any] = data
+    for name in parents:
+        parent = parent[name]
+
+    if value is None:
+        del parent[key]
+    else:
+        parent[key] = value
+
+    return data
+
+
+def test_example_config_is_valid():
+    assert config.Config.from_data(example()).prompts
+
+
+@pytest.mark.parametrize(
+    'path, value',
+    [
+        ('bot.token', None),
+        ('discord.guild_id', 'not an ID'),
+        ('days_per_prompt', 0),
+        ('end_day', example()['start_day'].replace(year=2000)),
+        ('prompts', []),
+        ('prompts_image_links', [1, 2]),
+        ('max_download_size', 0),
+        ('timezone', 'Mars/Olympus_Mons'),
+        ('metrics', {'port': 70000}),
+    ],
+)
+def test_invalid_values_are_rejected(path, value):
+    with pytest.raises(InvalidConfig):
+        config.Config.from_data(changed(path, value))
+
+
+def test_failed_reload_keeps_the_active_config(tmp_path, monkeypatch):
+    active: config.Config = config.Config.from_data(example())
+    monkeypatch.setattr(config, 'settings', active)
+
+    with pytest.raises(InvalidConfig):
+        config.reload(write(tmp_path / 'invalid.yaml', changed('days_per_prompt', 0)))
+
+    (tmp_path / 'list.yaml').write_text('- not a mapping\n', encoding='utf-8')
+    with pytest.raises(InvalidConfig):
+        config.reload(str(tmp_path / 'list.yaml'))
+
+    with pytest.raises(OSError):
+        config.reload(str(tmp_path / 'missing.yaml'))
+
+    assert config.settings is active
+
+
+def test_valid_reload_replaces_the_active_config(tmp_path, monkeypatch):
+    active: config.Config = config.Config.from_data(example())
+    monkeypatch.setattr(config, 'settings', active)
+
+    old, new = config.reload(write(tmp_path / 'config.yaml', changed('discord.event_name', 'Blobfest')))
+
+    assert old is active
+    assert config.settings is new
+    assert new.event_name == 'Blobfest'
+    assert new.prompts == active.prompts
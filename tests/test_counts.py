@@ -0,0 +1,58 @@
+import asyncpg
+
+from src.cogs.event_data import EventData, SubmissionStatus
+
+
+# Recounts the submissions, the way the triggers are supposed to keep `{key}_submission_counts` up to date
+GROUND_TRUTH: str = """
+SELECT {key},
+       count(*) FILTER (WHERE status = 'pending'),
+       count(*) FILTER (WHERE status = 'approved'),
+       count(*) FILTER (WHERE status = 'denied'),
+       count(*) FILTER (WHERE status = 'dismissed')
+FROM submissions
+GROUP BY {key}
+"""
+
+MAINTAINED: str = 'SELECT {key}, pending, approved, denied, dismissed FROM {key_name}_submission_counts'
+
+
+async def assert_counts_match(pool: asyncpg.Pool) -> None:
+    for key, key_name in (('user_id', 'user'), ('prompt_id', 'prompt')):
+        expected: dict[int, tuple] = {row[0]: tuple(row[1:]) for row in await pool.fetch(GROUND_TRUTH.format(key=key))}
+        # Rows whose submissions were all deleted may linger with zero counts
+        maintained: dict[int, tuple] = {
+            row[0]: tuple(row[1:]) for row in await pool.fetch(MAINTAINED.format(key=key, key_name=key_name)) if any(row[1:])
+        }
+
+        assert maintained == expected, key
+
+
+def test_counts_follow_status_changes(database):
+    async def run(data: EventData) -> None:
+        ids: list[int] = [(await data.insert_submission(i % 4, f'https://example.com/{i}.png', i % 3, i, 1000 + i))['id'] for i in range(30)]
+        await assert_counts_match(data.pool)
+
+        for submission in ids[:12]:
+            await data.approve_submission(submission)
+
+        # Approving twice must not count twice
+        await data.approve_submission(ids[0])
+        await assert_counts_match(data.pool)
+
+        await data.update_status(ids[13], SubmissionStatus.DENIED)
+        await data.bulk_update_status(SubmissionStatus.DISMISSED, user_id=3)
+        await data.bulk_update_status(SubmissionStatus.APPROVED, prompt_id=2)
+        await assert_counts_match(data.pool)
+
+        await data.update_prompt(ids[1], 2)
+        await data.pool.execute("UPDATE submissions SET image_url = image_url || '?'")
+        await data.pool.execute('DELETE FROM submissions WHERE id = ANY($1)', ids[20:25])
+        await assert_counts_match(data.pool)
+
+        assert await data.approved_count(0) == await data.pool.fetchval(
+            "SELECT count(*) FROM submissions WHERE user_id = 0 AND status = 'approved'"
+        )
+        assert sum((await data.prompt_counts(2)).values()) == await data.pool.fetchval('SELECT count(*) FROM submissions WHERE prompt_id = 2')
+
+    database(run)
@@ -0,0 +1,103 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+import asyncpg
+
+from src.cogs.event_data import EventData, ExportResult, SubmissionStatus
+from src.exporting import ExportFile, ExportFormat
+
+
+class Collector:
+    def __init__(self) -> None:
+        self.data: bytearray = bytearray()
+
+    async def write(self, data: bytes) -> None:
+        self.data += data
+
+
+async def export_ids(event_data: EventData, **kwargs) -> tuple[list[int], ExportResult]:
+    collector: Collector = Collector()
+    result: ExportResult = await event_data.export('submissions', ExportFormat.CSV, collector.write, **kwargs)
+
+    return [int(row['id']) for row in csv.DictReader(io.StringIO(collector.data.decode()))], result
+
+
+async def incremental_export(event_data: EventData) -> list[int]:
+    ids, result = await export_ids(event_data, after_transaction=await event_data.export_mark('submissions'))
+    await event_data.advance_export_mark('submissions', result.high_water)
+
+    return ids
+
+
+def test_export_filters(database):
+    async def run(data: EventData) -> None:
+        for i in range(12):
+            await data.insert_submission(i % 3, f'https://example.com/{i}.png', i % 4, 1000 + i, 2000 + i)
+
+        approved: list[int] = [submission['id'] for submission in await data.bulk_update_status(SubmissionStatus.APPROVED, user_id=1)]
+
+        ids, result = await export_ids(data)
+        assert len(ids) == result.rows == 12
+
+        ids, _ = await export_ids(data, status=SubmissionStatus.APPROVED)
+        assert sorted(ids) == sorted(approved)
+
+        ids, _ = await export_ids(data, prompt_id=2, after_message_id=1003, before_message_id=1010)
+        assert ids == [7]
+
+        collector: Collector = Collector()
+        await data.export('submissions', ExportFormat.NDJSON, collector.write, prompt_id=0)
+        rows: list[dict] = [json.loads(line) for line in collector.data.decode().splitlines()]
+        assert [row['message_id'] for row in rows] == [1000, 1004, 1008]
+
+    database(run)
+
+
+def test_incremental_export_covers_rows_committed_out_of_order(database):
+    async def run(data: EventData) -> None:
+        await data.insert_submission(1, 'https://example.com/first.png', 0, 1, 1)
+        assert len(await incremental_export(data)) == 1
+
+        # The earlier transaction takes the lower ID, but commits only after the later one was exported.
+        # They are by different users for different prompts, so they don't wait for each other's submission counts.
+        slow: asyncpg.Connection
+        async with data.pool.acquire() as slow:
+            transaction = slow.transaction()
+            await transaction.start()
+
+            early: int = (await data.insert_submission(2, 'https://example.com/early.png', 1, 2, 2, conn=slow))['id']
+            late: int = (await data.insert_submission(3, 'https://example.com/late.png', 2, 3, 3))['id']
+            assert early < late
+
+            exported: list[int] = await incremental_export(data)
+
+            await transaction.commit()
+
+        exported += await incremental_export(data)
+        assert sorted(exported) == [early, late]
+
+        assert await incremental_export(data) == []
+
+    database(run)
+
+
+def test_export_file_is_compressed_and_removed_on_failure(tmp_path):
+    async def run() -> None:
+        async with ExportFile(tmp_path / 'export.csv.gz', True) as file:
+            await file.write(b'id\n1\n')
+
+        assert gzip.decompress((tmp_path / 'export.csv.gz').read_bytes()) == b'id\n1\n'
+
+        try:
+            async with ExportFile(tmp_path / 'failed.csv', False) as file:
+                await file.write(b'id\n')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        assert not (tmp_path / 'failed.csv').exists()
+
+    asyncio.run(run())
@@ -0,0 +1,32 @@
+from src.cogs.event_data import EventData
+
+
+NEXT_ATTEMPT: str = 'SELECT attempts, EXTRACT(EPOCH FROM next_attempt_at - now())::FLOAT FROM gallery_outbox WHERE submission_id = $1'
+
+
+def test_every_retry_counts_and_backs_off(database):
+    async def run(data: EventData) -> None:
+        submission: int = (await data.insert_submission(1, 'https://example.com/1.png', 0, 1, 1))['id']
+        await data.approve_submission(submission)
+
+        delays: list[float] = []
+        for attempt in range(1, 6):
+            # Failures before an attempt started are counted as well
+            if attempt % 2:
+                await data.start_gallery_attempt(submission)
+
+            await data.retry_gallery_post(submission, 5, 60)
+
+            attempts, delay = await data.pool.fetchrow(NEXT_ATTEMPT, submission)
+            assert attempts == attempt
+            delays.append(round(delay))
+
+        assert delays == [5, 10, 20, 40, 60]
+
+        # An attempt which might have posted stays started, so the next one looks for its message
+        await data.start_gallery_attempt(submission)
+        await data.retry_gallery_post(submission, 5, 60, may_have_posted=True)
+        assert await data.due_gallery_posts(1) == []
+        assert await data.pool.fetchval('SELECT attempt_started_at IS NOT NULL FROM gallery_outbox WHERE submission_id = $1', submission)
+
+    database(run)
@@ -0,0 +1,76 @@
+import io
+import random
+
+from PIL import Image, ImageDraw
+
+from src.cogs.event_data import EventData
+from src.cogs.queue import NEAR_DUPLICATE_DISTANCE
+from src.hashing import perceptual_hash
+
+
+def artwork(seed: int, size: tuple[int, int] = (640, 480)) -> Image.Image:
+    generator: random.Random = random.Random(seed)
+    image: Image.Image = Image.new('RGB', size, 'white')
+    draw: ImageDraw.ImageDraw = ImageDraw.Draw(image)
+
+    for _ in range(30):
+        x, y = generator.randrange(size[0]), generator.randrange(size[1])
+        radius: int = generator.randrange(20, 120)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=tuple(generator.randrange(256) for _ in range(3)))
+
+    return image
+
+
+def encode(image: Image.Image, format: str = 'PNG', **kwargs) -> io.BytesIO:
+    data: io.BytesIO = io.BytesIO()
+    image.save(data, format=format, **kwargs)
+    data.seek(0)
+
+    return data
+
+
+def distance(a: int, b: int) -> int:
+    return ((a ^ b) & (1 << 64) - 1).bit_count()
+
+
+def test_hash_fits_a_signed_bigint():
+    for seed in range(20):
+        assert -(1 << 63) <= perceptual_hash(encode(artwork(seed))) < 1 << 63
+
+
+def test_hash_survives_reencoding_and_resizing():
+    original: Image.Image = artwork(1)
+    reference: int = perceptual_hash(encode(original))
+
+    assert distance(perceptual_hash(encode(original, 'JPEG', quality=60)), reference) <= NEAR_DUPLICATE_DISTANCE
+    assert distance(perceptual_hash(encode(original.resize((320, 240)))), reference) <= NEAR_DUPLICATE_DISTANCE
+    assert distance(perceptual_hash(encode(original.resize((1280, 960)), 'WEBP')), reference) <= NEAR_DUPLICATE_DISTANCE
+
+
+def test_different_artwork_is_beyond_the_threshold():
+    hashes: list[int] = [perceptual_hash(encode(artwork(seed))) for seed in range(20)]
+
+    for i, a in enumerate(hashes):
+        for b in hashes[i + 1 :]:
+            assert distance(a, b) > NEAR_DUPLICATE_DISTANCE
+
+
+def test_similar_submissions_threshold_and_window(database):
+    async def run(data: EventData) -> None:
+        reference: int = 0x0123_4567_89AB_CDEF
+
+        # Flips the lowest `bits` bits, so every submission is exactly that far from the reference
+        for bits in (0, NEAR_DUPLICATE_DISTANCE, NEAR_DUPLICATE_DISTANCE + 1, 64):
+            flipped: int = (reference ^ ((1 << bits) - 1)) & (1 << 64) - 1
+            signed: int = flipped - (1 << 64) if flipped >= 1 << 63 else flipped
+
+            await data.insert_submission(bits, f'https://example.com/{bits}.png', 0, bits, bits, None, signed)
+
+        similar = await data.similar_submissions(reference, NEAR_DUPLICATE_DISTANCE, 100)
+        assert sorted(submission['user_id'] for submission in similar) == [0, NEAR_DUPLICATE_DISTANCE]
+
+        # Only the newest submissions are compared against
+        assert await data.similar_submissions(reference, NEAR_DUPLICATE_DISTANCE, 2) == []
+        assert [submission['user_id'] for submission in await data.similar_submissions(reference, 64, 1)] == [64]
+
+    database(run)
@@ -0,0 +1,153 @@
+import asyncio
+from typing import Any
+
+import aiohttp
+import pytest
+
+from src.errors import CircuitOpen
+from src.http_client import CircuitBreaker, Endpoint, EndpointPolicy
+
+
+class StubResponse:
+    def __init__(self, status: int, headers: dict[str, str] | None = None) -> None:
+        self.status: int = status
+        self.headers: dict[str, str] = headers or {}
+        self.released: bool = False
+
+    def release(self) -> None:
+        self.released = True
+
+
+class StubSession:
+    """Answers requests with the given statuses in order, raising exceptions given in their place."""
+
+    def __init__(self, *outcomes: int | Exception) -> None:
+        self.outcomes: list[int | Exception] = list(outcomes)
+        self.requests: list[tuple[str, str]] = []
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> StubResponse:
+        self.requests.append((method, url))
+        outcome: int | Exception = self.outcomes.pop(0)
+
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        return StubResponse(outcome)
+
+    async def close(self) -> None:
+        pass
+
+
+def send(session: StubSession, method: str = 'GET', **policy: Any) -> int:
+    """Sends a request through an endpoint using `session`, returning the final response status."""
+
+    async def run() -> int:
+        endpoint: Endpoint = Endpoint(
+            'test', EndpointPolicy(concurrency=1, connect_timeout=1, read_timeout=1, total_timeout=None, **policy), {}
+        )
+        await endpoint.session.close()
+        endpoint.session = session  # type: ignore
+
+        try:
+            async with endpoint.request(method, 'https://example.com') as response:
+                return response.status
+        finally:
+            await endpoint.close()
+
+    return asyncio.run(run())
+
+
+def test_retries_server_errors_and_rate_limits():
+    session: StubSession = StubSession(503, 429, 200)
+
+    assert send(session, retry_base_delay=0) == 200
+    assert len(session.requests) == 3
+
+
+def test_returns_the_last_response_once_attempts_are_used_up():
+    session: StubSession = StubSession(500, 502, 504)
+
+    assert send(session, retry_base_delay=0) == 504
+    assert len(session.requests) == 3
+
+
+def test_doesnt_retry_client_errors():
+    session: StubSession = StubSession(404, 200)
+
+    assert send(session, retry_base_delay=0) == 404
+    assert len(session.requests) == 1
+
+
+def test_only_retries_connection_failures_of_non_idempotent_requests():
+    session: StubSession = StubSession(503, 200)
+    assert send(session, 'POST', retry_base_delay=0) == 503
+    assert len(session.requests) == 1
+
+    session = StubSession(aiohttp.ServerDisconnectedError(), 200)
+    with pytest.raises(aiohttp.ServerDisconnectedError):
+        send(session, 'POST', retry_base_delay=0)
+
+    session = StubSession(asyncio.TimeoutError(), 200)
+    assert send(session, 'GET', retry_base_delay=0) == 200
+    assert len(session.requests) == 2
+
+
+def test_retry_delay_backs_off_and_respects_retry_after():
+    async def run() -> None:
+        endpoint: Endpoint = Endpoint(
+            'test',
+            EndpointPolicy(concurrency=1, connect_timeout=1, read_timeout=1, total_timeout=None, retry_base_delay=1, retry_max_delay=8),
+            {},
+        )
+
+        try:
+            for attempt, bound in ((1, 1), (2, 2), (3, 4), (4, 8), (10, 8)):
+                assert all(0 <= endpoint.retry_delay(attempt, None) <= bound for _ in range(100))
+
+            assert endpoint.retry_delay(1, StubResponse(429, {'Retry-After': '3'})) == 3  # type: ignore
+            assert endpoint.retry_delay(1, StubResponse(429, {'Retry-After': '120'})) == 8  # type: ignore
+        finally:
+            await endpoint.close()
+
+    asyncio.run(run())
+
+
+def test_open_circuit_rejects_requests_without_sending_them():
+    session: StubSession = StubSession(500, 500)
+
+    with pytest.raises(CircuitOpen):
+        send(session, attempts=3, retry_base_delay=0, breaker_threshold=2)
+
+    assert len(session.requests) == 2
+
+
+def test_circuit_breaker_opens_after_threshold_and_half_opens_after_cooldown(monkeypatch):
+    now: list[float] = [1000]
+    monkeypatch.setattr('src.http_client.time.monotonic', lambda: now[0])
+
+    breaker: CircuitBreaker = CircuitBreaker(3, 30)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(False)
+
+    assert breaker.state == 'closed'
+
+    breaker.record(False)
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    now[0] += 30
+    assert breaker.state == 'half_open'
+
+    # Only a single trial request is let through, its failure opens the circuit again right away
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == 'open'
+
+    now[0] += 30
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == 'closed'
+    assert breaker.failures == 0
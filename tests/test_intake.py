@@ -0,0 +1,89 @@
+import asyncio
+from typing import Any, cast
+
+import discord
+
+from src import Artemis
+from src.cogs import queue
+from src.cogs.event_data import EventData
+from src.cogs.file_utils import FileUtils, ImageFingerprint
+from src.locks import KeyedLock
+
+
+URL: str = 'https://example.com/a.png'
+
+
+class StandInEventData:
+    def __init__(self) -> None:
+        self.stored: set[str] = set()
+
+    async def submission_by_image(self, url: str) -> dict | None:
+        return {'image_url': url} if url in self.stored else None
+
+    async def submission_by_content(self, content_hash: str) -> None:
+        return None
+
+
+class StandInFileUtils:
+    """Fingerprints files only once `release` is set, recording whether the URL's lock was held meanwhile."""
+
+    def __init__(self, locks: KeyedLock[str]) -> None:
+        self.locks: KeyedLock[str] = locks
+        self.release: asyncio.Event = asyncio.Event()
+        self.locked_while_fingerprinting: list[bool] = []
+
+    async def fingerprint(self, url: str) -> ImageFingerprint:
+        await self.release.wait()
+        self.locked_while_fingerprinting.append(self.locks.locked(url))
+
+        return {'content_hash': 'hash', 'perceptual_hash': None}
+
+
+class StandInBot:
+    def __init__(self, locks: KeyedLock[str]) -> None:
+        self.cogs: dict[type, Any] = {EventData: StandInEventData(), FileUtils: StandInFileUtils(locks)}
+
+    def get_cog(self, cog: type) -> Any:
+        return self.cogs[cog]
+
+
+def intake_cog() -> tuple[queue.Queue, StandInBot, list[int]]:
+    """A Queue cog which records the submissions it would enqueue, storing their URLs."""
+
+    cog: queue.Queue = queue.Queue.__new__(queue.Queue)
+    cog.locks = KeyedLock()
+    bot: StandInBot = StandInBot(cog.locks)
+    cog.bot = cast(Artemis, bot)
+
+    enqueued: list[int] = []
+
+    async def enqueue_submission(author: discord.User, message_id: int, url: str, fingerprint: ImageFingerprint | None) -> None:
+        bot.cogs[EventData].stored.add(url)
+        enqueued.append(message_id)
+
+    cog._enqueue_submission = enqueue_submission  # type: ignore
+    return cog, bot, enqueued
+
+
+def test_fingerprinting_doesnt_hold_the_url_lock():
+    async def run() -> None:
+        cog, bot, enqueued = intake_cog()
+        author: discord.User = cast(discord.User, object())
+
+        first: asyncio.Task = asyncio.create_task(cog.process_submission(author, 1, URL))
+        second: asyncio.Task = asyncio.create_task(cog.process_submission(author, 2, URL))
+        await asyncio.sleep(0.01)
+
+        # Both submissions are being fingerprinted at the same time, neither holds the lock while doing so
+        assert not cog.locks.locked(URL)
+
+        bot.cogs[FileUtils].release.set()
+        await asyncio.gather(first, second)
+
+        assert bot.cogs[FileUtils].locked_while_fingerprinting == [False, False]
+
+        # The URL is checked again under the lock, so only one of them is enqueued
+        assert enqueued == [1]
+        assert len(cog.locks) == 0
+
+    asyncio.run(run())
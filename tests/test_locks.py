@@ -0,0 +1,73 @@
+import asyncio
+
+from src.locks import KeyedLock
+
+
+def test_same_key_is_mutually_exclusive():
+    async def run() -> None:
+        locks: KeyedLock[str] = KeyedLock()
+        holders: list[str] = []
+        overlaps: int = 0
+
+        async def hold(key: str) -> None:
+            nonlocal overlaps
+
+            async with locks(key):
+                holders.append(key)
+                overlaps = max(overlaps, holders.count(key))
+
+                await asyncio.sleep(0.001)
+                holders.remove(key)
+
+        await asyncio.gather(*(hold('a') for _ in range(20)))
+        assert overlaps == 1
+
+    asyncio.run(run())
+
+
+def test_different_keys_dont_wait_for_each_other():
+    async def run() -> None:
+        locks: KeyedLock[str] = KeyedLock()
+
+        async with locks('a'):
+            assert locks.locked('a')
+            assert not locks.locked('b')
+
+            # Would never finish if 'b' waited for 'a'
+            async with asyncio.timeout(1):
+                async with locks('b'):
+                    assert locks.locked('b')
+
+    asyncio.run(run())
+
+
+def test_unused_keys_are_removed():
+    async def run() -> None:
+        locks: KeyedLock[int] = KeyedLock()
+
+        async def hold(key: int) -> None:
+            async with locks(key):
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(hold(key % 5) for key in range(50)))
+        assert len(locks) == 0
+
+        # Also when the holder fails, or a waiter is cancelled before acquiring the lock
+        try:
+            async with locks(1):
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        async with locks(2):
+            waiter: asyncio.Task = asyncio.create_task(hold(2))
+            await asyncio.sleep(0)
+            waiter.cancel()
+
+            assert len(locks) == 1
+
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert len(locks) == 0
+        assert not locks.locked(2)
+
+    asyncio.run(run())
@@ -0,0 +1,44 @@
+import asyncio
+
+from src.cogs.event_data import EventData, SubmissionStatus
+
+
+OUTBOX: str = 'SELECT array_agg(submission_id ORDER BY submission_id) FROM gallery_outbox'
+
+
+def test_moderation_only_acts_on_pending_submissions(database):
+    async def run(data: EventData) -> None:
+        approved: int = (await data.insert_submission(1, 'https://example.com/approved.png', 0, 1, 1))['id']
+        denied: int = (await data.insert_submission(2, 'https://example.com/denied.png', 0, 2, 2))['id']
+
+        assert await data.approve_submission(approved)
+        assert not await data.update_status(approved, SubmissionStatus.DENIED)
+        assert not await data.update_status(approved, SubmissionStatus.DISMISSED)
+        assert not await data.approve_submission(approved)
+
+        assert await data.update_status(denied, SubmissionStatus.DENIED)
+        assert not await data.approve_submission(denied)
+
+        assert (await data.submission_by_id(approved))['status'] == 'approved'
+        assert (await data.submission_by_id(denied))['status'] == 'denied'
+        assert await data.pool.fetchval(OUTBOX) == [approved]
+
+    database(run)
+
+
+def test_concurrent_approve_and_reject_have_one_winner(database):
+    async def run(data: EventData) -> None:
+        for i in range(50):
+            submission: int = (await data.insert_submission(i, f'https://example.com/{i}.png', 0, i, i))['id']
+
+            approved, rejected = await asyncio.gather(
+                data.approve_submission(submission), data.update_status(submission, SubmissionStatus.DENIED)
+            )
+            assert approved != rejected
+
+            status: str = (await data.submission_by_id(submission))['status']
+            queued: bool = await data.pool.fetchval('SELECT EXISTS (SELECT 1 FROM gallery_outbox WHERE submission_id = $1)', submission)
+
+            assert (status, queued) == (('approved', True) if approved else ('denied', False))
+
+    database(run)
@@ -0,0 +1,112 @@
+import asyncio
+import types
+from typing import Any, cast
+
+import discord
+
+from src import Artemis, config
+from src.cache import LRUCache
+from src.cogs import queue
+from src.cogs.event_data import EventData
+
+
+class StandInEventData:
+    def __init__(self, existing: set[str]) -> None:
+        self.existing: set[str] = existing
+
+    async def existing_image_urls(self, urls: list[str]) -> set[str]:
+        return self.existing.intersection(urls)
+
+
+class StandInBot:
+    def __init__(self, existing: set[str]) -> None:
+        self.event_data: StandInEventData = StandInEventData(existing)
+        self.author: types.SimpleNamespace = types.SimpleNamespace(id=1, bot=False)
+
+    def get_cog(self, cog: type) -> Any:
+        assert cog is EventData
+        return self.event_data
+
+    def get_user(self, user_id: int) -> types.SimpleNamespace:
+        return self.author
+
+
+def edits_cog(existing: frozenset[str] = frozenset()) -> tuple[queue.Queue, list[tuple[int, str]]]:
+    """A Queue cog which records the submissions it would process instead of processing them."""
+
+    cog: queue.Queue = queue.Queue.__new__(queue.Queue)
+    cog.bot = cast(Artemis, StandInBot(set(existing)))
+    cog.seen_urls = LRUCache(queue.SEEN_MESSAGES_CACHE_SIZE)
+    cog.pending_edits = {}
+    cog.edit_tasks = {}
+
+    processed: list[tuple[int, str]] = []
+
+    async def process_submission(author: discord.User, message_id: int, url: str) -> None:
+        processed.append((message_id, url))
+
+    cog.process_submission = process_submission  # type: ignore
+    return cog, processed
+
+
+def edit(message_id: int, content: str | None, *, attachments: tuple[str, ...] = ()) -> discord.RawMessageUpdateEvent:
+    data: dict[str, Any] = {'id': str(message_id), 'author': {'id': '1'}, 'attachments': [{'url': url} for url in attachments]}
+    if content is not None:
+        data['content'] = content
+
+    return cast(
+        discord.RawMessageUpdateEvent,
+        types.SimpleNamespace(message_id=message_id, channel_id=config.settings.submission_channel_id, data=data, cached_message=None),
+    )
+
+
+def test_edits_only_process_new_urls():
+    async def run() -> None:
+        cog, processed = edits_cog()
+        cog.seen_urls[1] = frozenset({'https://example.com/a.png'})
+
+        # Unchanged, reordered and embed-only updates don't add anything
+        await cog._process_edit(edit(1, 'https://example.com/a.png'))
+        await cog._process_edit(edit(1, 'look https://example.com/a.png'))
+        await cog._process_edit(edit(1, None))
+        assert processed == []
+
+        await cog._process_edit(edit(1, 'https://example.com/a.png https://example.com/b.png'))
+        assert processed == [(1, 'https://example.com/b.png')]
+
+        # The same edit arriving again is unchanged now
+        await cog._process_edit(edit(1, 'https://example.com/a.png https://example.com/b.png'))
+        assert processed == [(1, 'https://example.com/b.png')]
+
+    asyncio.run(run())
+
+
+def test_edits_of_unknown_messages_skip_stored_urls():
+    async def run() -> None:
+        cog, processed = edits_cog(frozenset({'https://example.com/a.png'}))
+
+        await cog._process_edit(edit(2, 'https://example.com/a.png', attachments=('https://cdn.example.com/c.png',)))
+        assert processed == [(2, 'https://cdn.example.com/c.png')]
+
+    asyncio.run(run())
+
+
+def test_burst_of_edits_is_processed_once(monkeypatch):
+    monkeypatch.setattr(queue, 'EDIT_DEBOUNCE_DELAY', 0.05)
+
+    async def run() -> None:
+        cog, processed = edits_cog()
+        cog.seen_urls[3] = frozenset()
+
+        for i in range(5):
+            await cog.on_raw_message_edit(edit(3, f'https://example.com/{i}.png'))
+            await asyncio.sleep(0.005)
+
+        assert len(cog.edit_tasks) == 1
+        await asyncio.gather(*cog.edit_tasks.values())
+
+        # Only the latest version of the message is processed
+        assert processed == [(3, 'https://example.com/4.png')]
+        assert cog.edit_tasks == {} and cog.pending_edits == {}
+
+    asyncio.run(run())
@@ -0,0 +1,84 @@
+import asyncio
+import collections
+from typing import AsyncIterator, Iterable
+
+import pytest
+
+from src.cogs.event_data import EventData, RaffleDraw, SubmissionStatus
+from src.raffle import RaffleResult, Ticket, draw
+
+
+async def stream(tickets: Iterable[Ticket]) -> AsyncIterator[Ticket]:
+    for ticket in tickets:
+        yield ticket
+
+
+def tickets(users: int, per_user: int) -> list[Ticket]:
+    return [Ticket(user_id, user_id * 1000 + i) for user_id in range(users) for i in range(per_user)]
+
+
+def run_draw(tickets: list[Ticket], winners: int, seed: str, cap: int | None = None) -> RaffleResult:
+    return asyncio.run(draw(stream(tickets), winners, seed, cap))
+
+
+def test_same_seed_draws_the_same_winners():
+    first: RaffleResult = run_draw(tickets(50, 3), 5, 'seed')
+
+    assert run_draw(tickets(50, 3), 5, 'seed') == first
+    assert run_draw(tickets(50, 3), 5, 'another seed').winners != first.winners
+
+
+def test_winners_are_distinct_and_ordered_by_place():
+    result: RaffleResult = run_draw(tickets(50, 3), 10, 'seed')
+
+    assert len({winner.user_id for winner in result.winners}) == 10
+    assert (result.entrants, result.tickets) == (50, 150)
+
+    # Fewer users than winners draws every user
+    assert len(run_draw(tickets(3, 2), 10, 'seed').winners) == 3
+
+
+def test_cap_counts_the_earliest_submissions():
+    uncapped: list[Ticket] = [Ticket(1, i) for i in range(10)] + [Ticket(2, 100)]
+    capped: RaffleResult = run_draw(uncapped, 2, 'seed', cap=3)
+
+    assert capped.tickets == 4
+    assert {winner.user_id: winner.tickets for winner in capped.winners} == {1: 3, 2: 1}
+    assert capped.digest == run_draw([Ticket(1, 0), Ticket(1, 1), Ticket(1, 2), Ticket(2, 100)], 2, 'seed').digest
+    assert next(winner for winner in capped.winners if winner.user_id == 1).submission_id in range(3)
+
+
+def test_chances_are_proportional_to_tickets():
+    # One user has as many tickets as the other nine together, so they should win about half of the single-winner draws
+    weighted: list[Ticket] = [Ticket(0, i) for i in range(9)] + [Ticket(user_id, 100 + user_id) for user_id in range(1, 10)]
+    wins: collections.Counter[int] = collections.Counter(run_draw(weighted, 1, str(seed)).winners[0].user_id for seed in range(2000))
+
+    assert 0.45 < wins[0] / 2000 < 0.55
+
+
+def test_invalid_draws_are_rejected():
+    with pytest.raises(ValueError):
+        run_draw(tickets(3, 1), 0, 'seed')
+
+    with pytest.raises(ValueError):
+        run_draw([Ticket(2, 1), Ticket(1, 2)], 1, 'seed')
+
+
+def test_recorded_draw_can_be_verified(database):
+    async def run(data: EventData) -> None:
+        for i in range(40):
+            await data.insert_submission(i % 7, f'https://example.com/{i}.png', i % 3, i, i)
+
+        await data.bulk_update_status(SubmissionStatus.APPROVED)
+        result: RaffleResult = await draw(data.approved_tickets(), 3, 'seed', 4)
+
+        draw_id: int = await data.record_raffle_draw('seed', 3, 4, result, 1)
+        recorded: RaffleDraw | None = await data.raffle_draw(draw_id)
+        assert recorded is not None
+
+        repeated: RaffleResult = await draw(data.approved_tickets(), recorded['winner_count'], recorded['seed'], recorded['ticket_cap'])
+
+        assert repeated.digest == recorded['tickets_digest']
+        assert repeated.winners == await data.raffle_winners(draw_id) == result.winners
+
+    database(run)
@@ -0,0 +1,64 @@
+import asyncio
+import dataclasses
+from typing import Any, cast
+
+from src import Artemis, config
+from src.cogs import statistics
+from src.cogs.event_data import EventData
+from src.cogs.members import Members
+
+
+class StandInEventData:
+    def __init__(self) -> None:
+        self.queries: list[list[int]] = []
+
+    async def approved_submissions_for_users(self, user_ids: list[int]) -> dict[int, list]:
+        self.queries.append(sorted(user_ids))
+        return {}
+
+
+class StandInMembers:
+    async def resolve(self, user_id: int) -> None:
+        return None
+
+
+class StandInBot:
+    def __init__(self) -> None:
+        self.cogs: dict[type, Any] = {EventData: StandInEventData(), Members: StandInMembers()}
+
+    async def wait_until_ready(self) -> None:
+        pass
+
+    def get_cog(self, cog: type) -> Any:
+        return self.cogs[cog]
+
+
+def test_concurrent_refreshes_are_coalesced_into_one_query(monkeypatch):
+    monkeypatch.setattr(config, 'settings', dataclasses.replace(config.settings, statistics_authorization='token'))
+    monkeypatch.setattr(statistics, 'PUBLISH_DELAY', 0.05)
+
+    async def run() -> None:
+        bot: StandInBot = StandInBot()
+        posted: list[str] = []
+
+        async def post_statistics(link: str, data: Any) -> None:
+            posted.append(link)
+
+        cog: statistics.Statistics = statistics.Statistics(cast(Artemis, bot))
+        cog.post_statistics = post_statistics  # type: ignore
+
+        async def refresh(user_id: int) -> None:
+            await asyncio.sleep(0)
+            cog.mark_dirty(user_id)
+
+        try:
+            await asyncio.gather(*(refresh(user_id % 5) for user_id in range(50)))
+            await asyncio.sleep(0.2)
+        finally:
+            cog.cog_unload()
+
+        assert bot.cogs[EventData].queries == [[0, 1, 2, 3, 4]]
+        assert len(posted) == 5
+        assert cog.dirty == set()
+
+    asyncio.run(run())
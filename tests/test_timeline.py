@@ -0,0 +1,45 @@
+import datetime
+import zoneinfo
+
+from src.timeline import Timeline
+
+
+NEW_YORK: zoneinfo.ZoneInfo = zoneinfo.ZoneInfo('America/New_York')
+UTC: datetime.timezone = datetime.timezone.utc
+
+MICROSECOND: datetime.timedelta = datetime.timedelta(microseconds=1)
+
+
+def timeline() -> Timeline:
+    # Daylight saving time ends on 2021-11-07, the event has a prompt per day across it
+    return Timeline(datetime.date(2021, 11, 5), datetime.date(2021, 11, 9), 1, 4, NEW_YORK)
+
+
+def test_day_start_is_local_midnight_across_daylight_saving_time():
+    assert timeline().day_start(datetime.date(2021, 11, 7)) == datetime.datetime(2021, 11, 7, 4, tzinfo=UTC)
+    assert timeline().day_start(datetime.date(2021, 11, 8)) == datetime.datetime(2021, 11, 8, 5, tzinfo=UTC)
+
+
+def test_prompt_at_reveal_boundaries():
+    events: Timeline = timeline()
+
+    for prompt_id, reveal in enumerate(events.reveals):
+        assert events.prompt_at(reveal) == prompt_id
+
+        if prompt_id > 0:
+            assert events.prompt_at(reveal - MICROSECOND) == prompt_id - 1
+
+
+def test_prompt_at_outside_of_the_event():
+    events: Timeline = timeline()
+
+    assert events.prompt_at(events.event_start - datetime.timedelta(days=30)) == 0
+    assert events.prompt_at(events.event_end + datetime.timedelta(days=30)) == 3
+
+
+def test_snapshot_agrees_with_prompt_at():
+    events: Timeline = timeline()
+    now: datetime.datetime = events.reveals[2] + datetime.timedelta(hours=5)
+
+    assert events.snapshot(now).current_prompt_id == events.prompt_at(now) == 2
+    assert events.snapshot(now).next_prompt_timestamp == int(events.reveals[3].timestamp())